@@ -0,0 +1,44 @@
+"""add user scan count
+
+Per-user counter of rewarded scans, which the badge rules read instead of
+loading the user's whole point ledger. Existing users are backfilled from
+their point transactions.
+
+The tables themselves are created by `Base.metadata.create_all` at startup,
+which already adds this column on new databases; hence the inspector check.
+
+Revision ID: 134495920c04
+Revises: 7962462ea4a5
+Create Date: 2026-10-18 08:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '134495920c04'
+down_revision: Union[str, Sequence[str], None] = '7962462ea4a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}
+    if 'scan_count' in columns:
+        return
+    op.add_column('users', sa.Column('scan_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE users SET scan_count = ("
+        "SELECT COUNT(*) FROM point_transactions WHERE point_transactions.user_id = users.id"
+        ")"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('scan_count')
@@ -0,0 +1,42 @@
+"""add metric snapshot updated_at
+
+When each business metric snapshot was last written, which /analytics/metrics
+sends as Last-Modified. Existing snapshots are stamped with the upgrade time.
+
+The tables themselves are created by `Base.metadata.create_all` at startup,
+which already adds this column on new databases; hence the inspector check.
+
+Revision ID: 5c1d7e0a9b42
+Revises: 9eb942666ff0
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d7e0a9b42'
+down_revision: Union[str, Sequence[str], None] = '9eb942666ff0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('business_metric_snapshots')}
+    if 'updated_at' in columns:
+        return
+    # SQLite cannot ALTER TABLE ADD COLUMN with a non-constant default; it copies the table instead.
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    with op.batch_alter_table('business_metric_snapshots', recreate=recreate) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()))
+    op.execute("UPDATE business_metric_snapshots SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('business_metric_snapshots') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,45 @@
+"""add alert feed indexes
+
+Composite indexes matching the alerts feed's keyset pagination
+(ORDER BY timestamp DESC, id DESC, optionally filtered by status).
+
+The tables themselves are created by `Base.metadata.create_all` at startup,
+which also creates these indexes on new databases; hence `if_not_exists`.
+On PostgreSQL the indexes are built concurrently so the alerts table stays writable.
+
+Revision ID: 7962462ea4a5
+Revises:
+Create Date: 2026-10-18 07:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7962462ea4a5'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_alerts_status_timestamp_id', 'alerts', ['status', 'timestamp', 'id'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_alerts_timestamp_id', 'alerts', ['timestamp', 'id'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_alerts_timestamp_id', table_name='alerts', if_exists=True, postgresql_concurrently=True)
+        op.drop_index('ix_alerts_status_timestamp_id', table_name='alerts', if_exists=True, postgresql_concurrently=True)
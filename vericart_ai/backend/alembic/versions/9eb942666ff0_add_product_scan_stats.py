@@ -0,0 +1,47 @@
+"""add product scan stats
+
+Running scan counters per product, kept in step with every scan insert, so a
+product's verification stats are read without counting its scans. Existing
+scans are counted in when the table is empty.
+
+The tables themselves are created by `Base.metadata.create_all` at startup,
+which also creates this one on new databases; hence `if_not_exists`.
+
+Revision ID: 9eb942666ff0
+Revises: afcef22f4c70
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9eb942666ff0'
+down_revision: Union[str, Sequence[str], None] = 'afcef22f4c70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_scan_stats',
+        sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), primary_key=True),
+        sa.Column('total_scans', sa.Integer(), nullable=False),
+        sa.Column('authentic_scans', sa.Integer(), nullable=False),
+        if_not_exists=True
+    )
+    op.execute(
+        "INSERT INTO product_scan_stats (product_id, total_scans, authentic_scans) "
+        "SELECT product_id, COUNT(*), SUM(CASE WHEN is_authentic THEN 1 ELSE 0 END) FROM scans "
+        "WHERE NOT EXISTS (SELECT 1 FROM product_scan_stats) "
+        "GROUP BY product_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('product_scan_stats', if_exists=True)
@@ -0,0 +1,43 @@
+"""add reward intents
+
+Rewards owed for authentic scans when rewards are deferred
+(REWARDS_MODE="deferred"), applied in batches by the gamification service.
+
+The tables themselves are created by `Base.metadata.create_all` at startup,
+which also creates this one on new databases; hence `if_not_exists`.
+
+Revision ID: afcef22f4c70
+Revises: e6862161d38c
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'afcef22f4c70'
+down_revision: Union[str, Sequence[str], None] = 'e6862161d38c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'reward_intents',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('scan_id', sa.Integer(), sa.ForeignKey('scans.id'), nullable=False, unique=True),
+        sa.Column('points', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        if_not_exists=True
+    )
+    op.create_index('ix_reward_intents_id', 'reward_intents', ['id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reward_intents', if_exists=True)
@@ -0,0 +1,63 @@
+"""add scan rollups
+
+Pre-aggregated scan counts per minute, hour and day (`scan_rollups`), the
+watermark recording how far the incremental rollup job has read the scans
+(`rollup_watermarks`), and an index on `scans.timestamp` for that job's
+time-range reads.
+
+The tables themselves are created by `Base.metadata.create_all` at startup,
+which also creates these on new databases; hence `if_not_exists`.
+On PostgreSQL the index is built concurrently so the scans table stays writable.
+
+Revision ID: e6862161d38c
+Revises: 134495920c04
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6862161d38c'
+down_revision: Union[str, Sequence[str], None] = '134495920c04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'scan_rollups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('resolution', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('scans', sa.Integer(), nullable=False),
+        sa.Column('authentic_scans', sa.Integer(), nullable=False),
+        sa.Column('alerts', sa.Integer(), nullable=False),
+        sa.UniqueConstraint('resolution', 'dimension', 'key', 'bucket_start', name='uq_scan_rollups_bucket'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'rollup_watermarks',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('processed_until', sa.DateTime(timezone=True), nullable=False),
+        if_not_exists=True
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_scans_timestamp', 'scans', ['timestamp'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_scans_timestamp', table_name='scans', if_exists=True, postgresql_concurrently=True)
+    op.drop_table('rollup_watermarks', if_exists=True)
+    op.drop_table('scan_rollups', if_exists=True)
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import date, timedelta
+from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
 from app.db import crud, models
 from app.core import schemas
+from app.core.config import settings
+from app.core.http_cache import conditional_json_response, make_etag
+from app.core.metrics_cache import CachedMetricsResponse, metrics_cache
 from app.db.database import get_db
+from app.services.rollup_service import RESOLUTIONS, floor_to
 
 router = APIRouter(
     prefix="/analytics",
@@ -12,22 +17,145 @@ router = APIRouter(
     
 )
 
+_metric_snapshots_json = TypeAdapter(List[schemas.BusinessMetricSnapshot])
+_breakdown_json = TypeAdapter(List[schemas.TimeseriesBreakdownItem])
+
+# Snapshots of days before yesterday are final once the nightly run is done; only a backfill rewrites them.
+SETTLED_METRICS_CACHE_CONTROL = "public, max-age=3600"
+# Recent ranges may still change tonight: clients must revalidate, which is a cheap 304 when nothing changed.
+RECENT_METRICS_CACHE_CONTROL = "no-cache"
+
 @router.get("/metrics", response_model=List[schemas.BusinessMetricSnapshot])
 def get_business_metrics(
+    request: Request,
     start_date: date = None,
-    end_date: date = date.today(),
+    end_date: date = None,
     db: Session = Depends(get_db)
 ):
     """
     Retrieve pre-calculated business impact metrics for a date range.
     Defaults to the last 30 days.
+
+    Responses are cached per range until a snapshot in the range is rewritten, and
+    carry ETag/Last-Modified validators so unchanged ranges are answered with a 304.
+    Both are derived from the snapshots, so every worker sends the same ones.
     """
+    today = date.today()
+    if end_date is None:
+        end_date = today
     if start_date is None:
         start_date = end_date - timedelta(days=30)
-        
-    query = db.query(models.BusinessMetricSnapshot).filter(
-        models.BusinessMetricSnapshot.snapshot_date >= start_date,
-        models.BusinessMetricSnapshot.snapshot_date <= end_date
-    ).order_by(models.BusinessMetricSnapshot.snapshot_date.desc())
-    
-    return query.all()
+
+    cached = metrics_cache.get(start_date, end_date)
+    if cached is None:
+        generation = metrics_cache.generation
+        query = db.query(models.BusinessMetricSnapshot).filter(
+            models.BusinessMetricSnapshot.snapshot_date >= start_date,
+            models.BusinessMetricSnapshot.snapshot_date <= end_date
+        ).order_by(models.BusinessMetricSnapshot.snapshot_date.desc())
+
+        snapshots = query.all()
+        body = _metric_snapshots_json.dump_json(snapshots)
+        # SQLite returns naive datetimes for timezone-aware columns; they are UTC.
+        write_times = [
+            s.updated_at if s.updated_at.tzinfo else s.updated_at.replace(tzinfo=timezone.utc)
+            for s in snapshots if s.updated_at is not None
+        ]
+        cached = CachedMetricsResponse(body=body, etag=make_etag(body), last_modified=max(write_times, default=None))
+        metrics_cache.put(start_date, end_date, generation, cached)
+
+    cache_control = SETTLED_METRICS_CACHE_CONTROL if end_date < today - timedelta(days=1) else RECENT_METRICS_CACHE_CONTROL
+    return conditional_json_response(
+        request, cached.body, cache_control, etag=cached.etag, last_modified=cached.last_modified
+    )
+
+
+
+# Chart ranges offered by the dashboard, with the resolution used when none is requested.
+TIME_RANGES = {
+    "24h": (timedelta(hours=24), "hour"),
+    "7d": (timedelta(days=7), "hour"),
+    "30d": (timedelta(days=30), "day"),
+    "90d": (timedelta(days=90), "day"),
+    "1y": (timedelta(days=365), "day"),
+}
+
+def _resolve_window(time_range: str, resolution: Optional[str]):
+    """Returns the resolution and the bucket-aligned [start, end) window of a chart, ending with the current bucket."""
+    if time_range not in TIME_RANGES:
+        raise HTTPException(status_code=400, detail=f"Invalid range. Must be one of: {list(TIME_RANGES)}")
+    span, default_resolution = TIME_RANGES[time_range]
+    resolution = resolution or default_resolution
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid resolution. Must be one of: {list(RESOLUTIONS)}")
+
+    retention_days = {"minute": settings.ROLLUP_MINUTE_RETENTION_DAYS, "hour": settings.ROLLUP_HOUR_RETENTION_DAYS}
+    if resolution in retention_days and span > timedelta(days=retention_days[resolution]):
+        raise HTTPException(
+            status_code=400,
+            detail=f"{resolution} rollups are only kept for {retention_days[resolution]} days; use a coarser resolution."
+        )
+
+    end = floor_to(datetime.now(timezone.utc), resolution) + RESOLUTIONS[resolution]
+    return resolution, end - span, end
+
+@router.get("/timeseries", response_model=schemas.Timeseries)
+def get_timeseries(
+    request: Request,
+    time_range: str = Query("30d", alias="range", description="One of 24h, 7d, 30d, 90d, 1y"),
+    resolution: Optional[str] = Query(None, description="minute, hour or day; defaults to a resolution suited to the range"),
+    product_id: Optional[str] = None,
+    category: Optional[str] = None,
+    supplier_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Scans, authentic scans and alerts over time, read from the pre-aggregated rollups.
+    Covers all products, or the single product, category or supplier given.
+    Buckets without any scan are returned with zero counts.
+    Carries an ETag, so polling an unchanged series costs a 304.
+    """
+    filters = {"product": product_id, "category": category, "supplier": str(supplier_id) if supplier_id is not None else None}
+    selected = [(dimension, key) for dimension, key in filters.items() if key is not None]
+    if len(selected) > 1:
+        raise HTTPException(status_code=400, detail="Filter by at most one of product_id, category and supplier_id.")
+    dimension, key = selected[0] if selected else ("all", "")
+
+    resolution, start, end = _resolve_window(time_range, resolution)
+    rollups = {crud.parse_bucket(r.bucket_start): r for r in crud.get_scan_rollups(db, resolution, dimension, key, start, end)}
+
+    step = RESOLUTIONS[resolution]
+    points = []
+    bucket = start
+    while bucket < end:
+        rollup = rollups.get(bucket)
+        points.append(
+            schemas.TimeseriesPoint(bucket_start=bucket, scans=rollup.scans, authentic_scans=rollup.authentic_scans, alerts=rollup.alerts)
+            if rollup else schemas.TimeseriesPoint(bucket_start=bucket)
+        )
+        bucket += step
+
+    timeseries = schemas.Timeseries(resolution=resolution, dimension=dimension, key=key, start=start, end=end, points=points)
+    return conditional_json_response(request, timeseries.model_dump_json().encode(), "no-cache")
+
+@router.get("/timeseries/breakdown", response_model=List[schemas.TimeseriesBreakdownItem])
+def get_timeseries_breakdown(
+    request: Request,
+    by: str = Query(..., description="product, category or supplier"),
+    time_range: str = Query("30d", alias="range", description="One of 24h, 7d, 30d, 90d, 1y"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Total scans, authentic scans and alerts per product, category or supplier over a range,
+    most alerts first, read from the pre-aggregated rollups.
+    """
+    if by not in ("product", "category", "supplier"):
+        raise HTTPException(status_code=400, detail="Invalid breakdown. Must be one of: product, category, supplier")
+    resolution, start, end = _resolve_window(time_range, None)
+    rows = crud.get_scan_rollup_breakdown(db, resolution, by, start, end, limit)
+    breakdown = [
+        schemas.TimeseriesBreakdownItem(key=key, scans=scans, authentic_scans=authentic or 0, alerts=alerts or 0)
+        for key, scans, authentic, alerts in rows
+    ]
+    return conditional_json_response(request, _breakdown_json.dump_json(breakdown), "no-cache")
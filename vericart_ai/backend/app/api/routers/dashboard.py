@@ -1,15 +1,20 @@
 
-from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+import base64
+import binascii
+import struct
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
 
 from app.core import schemas
-from app.db import models, crud
-from app.db.database import get_db
+from app.db import models, crud, async_crud
+from app.db.database import get_db, get_async_db
 from app.core.security import get_api_key
 from app.core.websocket_manager import manager 
+from app.core.kpi_engine import kpi_engine
 from ...core.security import get_api_key_ws
 
 router = APIRouter(
@@ -20,44 +25,63 @@ router = APIRouter(
 
 
 @router.get("/summary", response_model=schemas.DashboardAnalyticsSummary)
-def get_analytics_summary(db: Session = Depends(get_db), api_key: str = Depends(get_api_key) ):
+async def get_analytics_summary(api_key: str = Depends(get_api_key) ):
     """
     Provides key performance indicators (KPIs) for the main dashboard overview.
+    Answered from the in-memory 24 hour window; the same figures are pushed to the
+    live feed as "kpi_update" messages.
     """
-    stats = crud.get_dashboard_stats(db)
-    
-    total_scans_24h = db.query(func.count(models.Scan.id)).filter(models.Scan.timestamp >= twenty_four_hours_ago).scalar()
-    
-    
+    return kpi_engine.summary()
+
 
-    return {
-        "total_scans_24h": total_scans_24h or 0,
-        "total_anomalies_24h": stats["total_alerts"],
-        "highest_risk_products": stats["highest_risk_products"],
-        "highest_risk_regions": [] 
-    }
+# Alert cursors are opaque to clients: the base64url (unpadded) of the last alert's
+# timestamp, in microseconds since the epoch, and its ID, as two big-endian int64s.
+# They are safe in a query string as-is.
+_CURSOR_FORMAT = struct.Struct(">qq")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def encode_alert_cursor(alert: schemas.Alert) -> str:
+    # SQLite returns naive datetimes for timezone-aware columns; they are UTC.
+    timestamp = alert.timestamp if alert.timestamp.tzinfo else alert.timestamp.replace(tzinfo=timezone.utc)
+    packed = _CURSOR_FORMAT.pack((timestamp - _EPOCH) // timedelta(microseconds=1), alert.id)
+    return base64.urlsafe_b64encode(packed).rstrip(b"=").decode("ascii")
+
+def decode_alert_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        packed = base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True)
+        microseconds, alert_id = _CURSOR_FORMAT.unpack(packed)
+        return _EPOCH + timedelta(microseconds=microseconds), alert_id
+    except (ValueError, binascii.Error, struct.error, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor. Pass the X-Next-Cursor of the previous page.")
 
 
 @router.get("/alerts", response_model=List[schemas.Alert])
-def get_all_alerts(
+async def get_all_alerts(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by status: new, investigating, resolved, dismissed"),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = Query(None, description="The X-Next-Cursor header of the previous page"),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(get_api_key) 
 ):
     """
     Retrieves a paginated and filterable list of all fraud alerts for the Alerts Management Center.
+
+    Pages can be walked with `after` (keyset pagination): its cost does not grow with
+    the page number and new alerts do not shift the following pages. When the page is
+    full, the cursor of the next page is returned in the `X-Next-Cursor` header.
+    `skip` still works for offset pagination.
     """
     '''query = db.query(models.Alert)
     if status:
         query = query.filter(models.Alert.status == status)
     alerts = query.order_by(models.Alert.timestamp.desc()).offset(skip).limit(limit).all()
     return alerts'''
-    db_alerts = crud.get_alerts(db, status=status, skip=skip, limit=limit)
-    
-    
-    safe_alerts = [crud.create_alert_schema(db_alert) for db_alert in db_alerts]
+    cursor = decode_alert_cursor(after) if after else None
+    safe_alerts = await async_crud.get_alert_schemas(db, status=status, skip=skip, limit=limit, after=cursor)
+    if safe_alerts and len(safe_alerts) == limit:
+        response.headers["X-Next-Cursor"] = encode_alert_cursor(safe_alerts[-1])
     
     
     return safe_alerts
@@ -80,20 +104,18 @@ def get_alert_details(alert_id: int, db: Session = Depends(get_db), api_key: str
     return {"alert_details": alert, "triggering_scan": triggering_scan, "previous_scan": previous_good_scan}
 
 @router.put("/alerts/{alert_id}/status", response_model=schemas.Alert)
-def update_alert_status(alert_id: int, status_update: schemas.AlertStatusUpdate, db: Session = Depends(get_db), api_key: str = Depends(get_api_key) ):
+async def update_alert_status(alert_id: int, status_update: schemas.AlertStatusUpdate, db: AsyncSession = Depends(get_async_db), api_key: str = Depends(get_api_key) ):
     """
     Allows an analyst to update the status of an alert (e.g., from 'new' to 'investigating').
     """
-    alert = crud.update_alert_status(db, alert_id=alert_id, status_update=status_update)
-    if not alert:
-        raise HTTPException(status_code=404, detail="Alert not found")
-        
     allowed_statuses = {"new", "investigating", "resolved", "dismissed"}
     if status_update.new_status not in allowed_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {allowed_statuses}")
 
-    alert.status = status_update.new_status
-    db.commit(); db.refresh(alert)
+    alert = await async_crud.update_alert_status(db, alert_id=alert_id, status_update=status_update)
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+        
     safe_updated_alert = crud.create_alert_schema(alert)
     return safe_updated_alert 
 
@@ -107,7 +129,7 @@ async def websocket_endpoint(websocket: WebSocket, api_key: str = Depends(get_ap
     await manager.connect(websocket)
     try:
         while True:
-            await websocket.receive_text() e
+            await websocket.receive_text()
     except WebSocketDisconnect:
         manager.disconnect(websocket)
         print(f"Client disconnected from live feed.")
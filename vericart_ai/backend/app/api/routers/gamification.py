@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+
+from app.core import schemas, security
+from app.core.leaderboard import leaderboard
+from app.core.user_cache import CachedUser
+
+router = APIRouter(
+    prefix="/gamification",
+    tags=["Gamification"]
+)
+
+
+@router.get("/leaderboard", response_model=List[schemas.LeaderboardEntry])
+def read_leaderboard(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: CachedUser = Depends(security.get_current_active_user)
+):
+    """
+    A page of the points leaderboard, best first.
+    Served from the in-memory leaderboard, so deep pages are as cheap as the first.
+    """
+    return [entry._asdict() for entry in leaderboard.page(skip=skip, limit=limit)]
+
+
+@router.get("/rank/me", response_model=schemas.LeaderboardRank)
+def read_my_rank(current_user: CachedUser = Depends(security.get_current_active_user)):
+    """
+    The current user's rank on the points leaderboard, based on their points
+    from the user cache (refreshed whenever their points change).
+    """
+    return schemas.LeaderboardRank(
+        rank=leaderboard.rank_for_points(current_user.points),
+        user_id=current_user.id,
+        points=current_user.points,
+        total_users=leaderboard.size()
+    )
@@ -20,7 +20,7 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
     - Validates that the specified supplier exists before creation.
     """
     
-    db_product = crud.get_product_by_id_str(db, product_id_str=product.product_id_str)
+    db_product = crud.get_cached_product(db, product_id_str=product.product_id_str)
     if db_product:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -51,7 +51,7 @@ def read_product(product_id_str: str, db: Session = Depends(get_db)):
     Retrieves details for a single product by its unique public-facing string ID,
     now including social proof verification statistics.
     """
-    db_product = crud.get_product_by_id_str(db, product_id_str=product_id_str)
+    db_product = crud.get_cached_product(db, product_id_str=product_id_str)
     
     if db_product is None:
         raise HTTPException(
@@ -76,16 +76,7 @@ def read_product(product_id_str: str, db: Session = Depends(get_db)):
     )
 
     
-    product_response = schemas.Product(
-        
-        id=db_product.product_id_str, 
-        name=db_product.name,
-        category=db_product.category,
-        
-        supplier=schemas.Supplier.from_orm(db_product.supplier) if db_product.supplier else None,
-        
-        verification_stats=verification_stats_obj
-    )
+    product_response = db_product.to_schema(verification_stats=verification_stats_obj)
     
     return product_response
 
@@ -94,5 +85,5 @@ def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
     """
     Retrieves a paginated list of all products in the system.
     """
-    products = crud.get_products(db, skip=skip, limit=limit)
+    products = crud.get_product_schemas(db, skip=skip, limit=limit)
     return products
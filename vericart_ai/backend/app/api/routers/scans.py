@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from app.core import schemas
+from app.core.config import settings
+from app.core.security import get_api_key
 from app.db import crud
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.services.scan_processor import ScanProcessor
-from app.services.vision_service import VisionService
+from app.services.vision_service import VisionService, vision_service
 
 router = APIRouter(
     prefix="/scans",
@@ -15,29 +18,63 @@ router = APIRouter(
 
 
 def get_vision_service() -> VisionService:
-    try:
-        return VisionService()
-    except HTTPException as e:
-        
-        raise e
+    """The worker's long-lived vision service, if the vision model is loaded."""
+    if not vision_service.available:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Image verification is not available.")
+    return vision_service
+
+
+def wants_provenance(
+    include: Optional[str] = Query(
+        None,
+        description="Comma-separated response extras. Pass 'provenance' to embed the product's journey in authentic results."
+    )
+) -> bool:
+    """Parses the `include` opt-in shared by the verify endpoints."""
+    if not include:
+        return False
+    return "provenance" in {part.strip() for part in include.split(",")}
 
 @router.post("/verify/nfc", response_model=schemas.VerificationResponse)
 async def verify_product_by_nfc(
     request: schemas.NFCVerificationRequest,
-    db: Session = Depends(get_db)
+    include_provenance: bool = Depends(wants_provenance),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Primary endpoint for NFC/QR scans. It delegates all business logic
     to the ScanProcessor service for analysis and response generation.
+    Clients that need the Digital Passport opt in with `?include=provenance`.
     """
     processor = ScanProcessor(db=db)
-    response_data = await processor.process_scan(request)
+    response_data = await processor.process_scan(request, include_provenance=include_provenance)
     return response_data
 
+@router.post("/verify/nfc/batch", response_model=List[schemas.VerificationResponse])
+async def verify_products_by_nfc_batch(
+    requests: List[schemas.NFCVerificationRequest],
+    include_provenance: bool = Depends(wants_provenance),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Batch endpoint for store readers and returns desks that send scans in bursts.
+    The whole batch is verified with one model call and one commit, and a
+    response is returned for every scan, in the order they were sent.
+    """
+    if len(requests) > settings.NFC_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"A batch may contain at most {settings.NFC_BATCH_MAX_SIZE} scans."
+        )
+
+    processor = ScanProcessor(db=db)
+    return await processor.process_scan_batch(requests, include_provenance=include_provenance)
+
 @router.post("/verify/image", response_model=schemas.VerificationResponse)
 async def verify_product_by_image(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     file: UploadFile = File(...),
+    include_provenance: bool = Depends(wants_provenance),
     vision_service: VisionService = Depends(get_vision_service)
 ):
     """
@@ -61,14 +98,14 @@ async def verify_product_by_image(
     
     
     nfc_style_request = schemas.NFCVerificationRequest(
-        product_id=product_id,
+        id=product_id,
         latitude=0.0,
         longitude=0.0
     )
 
     
     processor = ScanProcessor(db=db)
-    response_data = await processor.process_scan(nfc_style_request)
+    response_data = await processor.process_scan(nfc_style_request, include_provenance=include_provenance)
     return response_data
 
 @router.get("/product/{product_id}/journey", response_model=List[schemas.ProvenanceEntry])
@@ -77,7 +114,24 @@ def get_product_journey(product_id: str, db: Session = Depends(get_db)):
     Provides the full provenance (journey) of a specific product ID.
     This powers the "Digital Passport" feature in the mobile app.
     """
-    journey = crud.get_provenance_for_product(db, product_id=product_id)
+    product = crud.get_cached_product(db, product_id_str=product_id)
+    journey = crud.get_cached_provenance(db, product_id=product.id) if product else []
     if not journey:
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"No verified history for Product ID {product_id}")
     return journey
+
+@router.post("/product/{product_id}/journey", response_model=schemas.ProvenanceEntry, status_code=status.HTTP_201_CREATED)
+def add_product_journey_step(
+    product_id: str,
+    entry: schemas.ProvenanceEntryCreate,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Records a new step (e.g. shipped, received in store) in a product's journey.
+    Cached journeys of the product are outdated in every worker once it is saved.
+    """
+    product = crud.get_cached_product(db, product_id_str=product_id)
+    if product is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Product with ID '{product_id}' not found.")
+    return crud.create_provenance_entry(db, product_id=product.id, entry=entry)
@@ -34,5 +34,5 @@ def read_all_suppliers(skip: int = 0, limit: int = 100, db: Session = Depends(ge
     This powers the supplier list view in the Brand Protection Dashboard,
     showing their names, locations, and calculated risk scores.
     """
-    suppliers = crud.get_suppliers(db, skip=skip, limit=limit)
+    suppliers = crud.get_supplier_schemas(db, skip=skip, limit=limit)
     return suppliers
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 
 from app.db import crud, models
 from app.core import schemas, security
+from app.core.config import settings
+from app.core.user_cache import CachedUser
 from app.db.database import get_db
 
 router = APIRouter(
@@ -26,8 +28,31 @@ def create_new_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return crud.create_user(db=db, user=user)
 
 
+@router.post("/token", response_model=schemas.Token)
+def issue_access_token(
+    request: schemas.TokenRequest,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(security.get_api_key)
+):
+    """
+    Issue a signed access token for a customer.
+    Called server-to-server by the Walmart app backend (hence the API key) once
+    it has authenticated the customer; the app then sends the token as a Bearer token.
+    """
+    user = crud.get_cached_user(db, walmart_id=request.walmart_customer_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found."
+        )
+    return schemas.Token(
+        access_token=security.create_access_token(user),
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    )
+
+
 @router.get("/me", response_model=schemas.User)
-def read_current_user(current_user: models.User = Depends(security.get_current_active_user)):
+def read_current_user(current_user: CachedUser = Depends(security.get_current_active_user)):
     """
     Get the profile for the currently authenticated user.
     This endpoint is used by the mobile app to display user-specific
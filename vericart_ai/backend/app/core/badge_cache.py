@@ -0,0 +1,41 @@
+from typing import Dict, NamedTuple, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+_ALL_BADGES = "all"
+
+
+class CachedBadge(NamedTuple):
+    """A detached snapshot of a master badge definition."""
+    id: int
+    name: str
+
+
+class BadgeCatalogCache:
+    """
+    The master badge table, keyed by badge name.
+
+    It is a handful of rows that only change when an admin seeds a badge, yet
+    it is consulted on every rewarded scan, so it is read in full once and kept
+    for BADGE_CACHE_TTL_SECONDS. `crud.create_badge` clears it; the TTL bounds
+    how long another worker's new badge can take to show up.
+    """
+    def __init__(self, ttl_seconds: float):
+        self._badges = TTLCache(max_size=1, ttl_seconds=ttl_seconds)
+
+    def get(self) -> Optional[Dict[str, CachedBadge]]:
+        return self._badges.get(_ALL_BADGES)
+
+    def put(self, badges: Dict[str, CachedBadge]) -> Dict[str, CachedBadge]:
+        self._badges.set(_ALL_BADGES, badges)
+        return badges
+
+    def clear(self) -> None:
+        self._badges.clear()
+
+    def stats(self) -> dict:
+        return self._badges.stats()
+
+
+badge_cache = BadgeCatalogCache(ttl_seconds=settings.BADGE_CACHE_TTL_SECONDS)
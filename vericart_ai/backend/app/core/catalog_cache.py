@@ -0,0 +1,81 @@
+from typing import NamedTuple, Optional
+
+from app.core import schemas
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db import models
+
+
+class CachedProduct(NamedTuple):
+    """
+    A detached, read-only snapshot of a product and its supplier.
+    Safe to share between sessions and requests, unlike the ORM object.
+    """
+    id: int
+    product_id_str: str
+    name: str
+    category: Optional[str]
+    supplier_id: int
+    supplier: Optional[schemas.Supplier]
+
+    def to_schema(self, **extra) -> schemas.Product:
+        return schemas.Product(
+            id=self.product_id_str,
+            name=self.name,
+            category=self.category,
+            supplier=self.supplier,
+            **extra
+        )
+
+
+def snapshot_product(db_product: models.Product) -> CachedProduct:
+    """Builds a cache snapshot from a product whose supplier is already loaded."""
+    return CachedProduct(
+        id=db_product.id,
+        product_id_str=db_product.product_id_str,
+        name=db_product.name,
+        category=db_product.category,
+        supplier_id=db_product.supplier_id,
+        supplier=schemas.Supplier.model_validate(db_product.supplier) if db_product.supplier else None
+    )
+
+
+class ProductCatalogCache:
+    """
+    Read-through cache of the product catalog, keyed by public product ID.
+
+    The catalog changes rarely but is read on every scan, so snapshots are kept
+    for PRODUCT_CACHE_TTL_SECONDS and invalidated by the crud write functions.
+    Each worker has its own cache; the TTL bounds how long another worker's
+    writes can take to show up. Unknown IDs are never cached, so a newly
+    created product is visible everywhere immediately.
+    """
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._products = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+    def get(self, product_id_str: str) -> Optional[CachedProduct]:
+        return self._products.get(product_id_str)
+
+    def put(self, db_product: models.Product) -> CachedProduct:
+        snapshot = snapshot_product(db_product)
+        self._products.set(snapshot.product_id_str, snapshot)
+        return snapshot
+
+    def invalidate_product(self, product_id_str: str) -> None:
+        self._products.invalidate(product_id_str)
+
+    def invalidate_supplier(self, supplier_id: int) -> None:
+        """Drops every product snapshot that embeds the given supplier."""
+        self._products.invalidate_where(lambda _, product: product.supplier_id == supplier_id)
+
+    def clear(self) -> None:
+        self._products.clear()
+
+    def stats(self) -> dict:
+        return self._products.stats()
+
+
+catalog_cache = ProductCatalogCache(
+    max_size=settings.PRODUCT_CACHE_SIZE,
+    ttl_seconds=settings.PRODUCT_CACHE_TTL_SECONDS
+)
@@ -1,15 +1,17 @@
 from celery import Celery
 from celery.schedules import crontab
 
+from app.core.config import settings
 
-redis_url = "redis://redis:6379/0"
+
+redis_url = settings.REDIS_URL
 
 
 celery = Celery(
     "tasks",
     broker=redis_url,
     backend=redis_url,
-    include=["app.services.analytics_service"] 
+    include=["app.services.analytics_service", "app.services.rollup_service", "app.services.gamification_service"] 
 )
 
 
@@ -21,4 +23,25 @@ celery.conf.beat_schedule = {
         
         'schedule': crontab(hour=0, minute=5),
     },
+
+    'reconcile-product-scan-stats-task': {
+        
+        'task': 'app.services.analytics_service.run_product_scan_stats_reconciliation',
+        
+        'schedule': crontab(hour=3, minute=30),
+    },
+
+    'roll-up-scans-task': {
+        
+        'task': 'app.services.rollup_service.run_scan_rollups',
+        
+        'schedule': crontab(minute='*'),
+    },
+
+    'apply-deferred-rewards-task': {
+        
+        'task': 'app.services.gamification_service.run_deferred_rewards',
+        
+        'schedule': settings.REWARDS_FLUSH_INTERVAL_SECONDS,
+    },
 }
@@ -1,4 +1,5 @@
 import pathlib
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -14,12 +15,70 @@ class Settings(BaseSettings):
 
     
     DATABASE_URL: str
+    # Defaults to DATABASE_URL with its async driver (asyncpg / aiosqlite).
+    ASYNC_DATABASE_URL: Optional[str] = None
     
     
     MODEL_PATH: str = "/app/models/isolation_forest_v1.joblib"
 
-    VISION_MODEL_PATH: str = "ml/models/product_image_classifier.h5"
+    VISION_MODEL_PATH: str = "ml/models/product_image_classifier.onnx" # or the int8 .int8.onnx; a .h5 file for keras
     CLASS_MAP_PATH: str = "ml/models/class_indices.json"
+    VISION_MODEL_BACKEND: str = "onnx" # or "keras" (needs TensorFlow), or "fake": CPU-only stand-in for tests and benchmarks
+    VISION_ONNX_THREADS: int = 0 # threads per forward pass; 0 = every core
+    LOCATIONS_PATH: str = "data/locations.csv"
+
+    
+    PRODUCT_STATE_CACHE_SIZE: int = 50000
+    PRODUCT_STATE_TTL_SECONDS: float = 60.0 # bounds staleness if a cross-worker update is lost
+    PRODUCT_CACHE_SIZE: int = 20000
+    PRODUCT_CACHE_TTL_SECONDS: float = 300.0
+    PROVENANCE_CACHE_SIZE: int = 20000
+    PROVENANCE_CACHE_TTL_SECONDS: float = 600.0
+    BADGE_CACHE_TTL_SECONDS: float = 300.0
+    NFC_BATCH_MAX_SIZE: int = 500
+
+    
+    INFERENCE_BATCH_MAX_WAIT_MS: float = 2.0
+    INFERENCE_BATCH_MAX_SIZE: int = 64
+    VISION_BATCH_MAX_WAIT_MS: float = 10.0
+    VISION_BATCH_MAX_SIZE: int = 16
+    VISION_PREPROCESS_WORKERS: int = 4
+    VISION_CACHE_SIZE: int = 10000 # per level; 0 disables the image result cache
+    VISION_CACHE_MAX_DISTANCE: int = 6 # bits of the 64-bit perceptual hash, at most 16
+
+    
+    WS_SEND_QUEUE_SIZE: int = 100
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest" # or "disconnect"
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
+
+    
+    REDIS_URL: str = "redis://redis:6379/0"
+    MESSAGE_BUS_BACKEND: str = "local" # or "redis" when running several workers
+
+    
+    KPI_PUSH_INTERVAL_SECONDS: float = 5.0
+
+    
+    ROLLUP_LAG_SECONDS: int = 60
+    ROLLUP_MINUTE_RETENTION_DAYS: int = 7
+    ROLLUP_HOUR_RETENTION_DAYS: int = 90
+
+    
+    METRICS_CACHE_SIZE: int = 1000
+    METRICS_CACHE_TTL_SECONDS: float = 3600.0
+
+    
+    REWARDS_MODE: str = "inline" # or "deferred": scans only record a reward intent
+    REWARDS_WORKER: str = "celery" # or "local": apply deferred rewards in the API process
+    REWARDS_FLUSH_INTERVAL_SECONDS: float = 5.0
+    REWARDS_BATCH_SIZE: int = 1000
+    LEADERBOARD_BACKEND: str = "memory" # or "redis": one sorted set shared by every worker
+
+    
+    JWT_SECRET_KEY: Optional[str] = None # HMAC key signing the users' access tokens
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    USER_CACHE_SIZE: int = 100000
+    USER_CACHE_TTL_SECONDS: float = 30.0
     
     
     API_KEY: str
@@ -0,0 +1,56 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(body: bytes) -> str:
+    """Strong validator derived from the response body itself."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Weak comparison, as RFC 9110 requires for If-None-Match.
+    return "*" in candidates or etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_json_response(
+    request: Request,
+    body: bytes,
+    cache_control: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[datetime] = None
+) -> Response:
+    """
+    Sends a pre-serialized JSON body with ETag, Last-Modified and Cache-Control headers,
+    or an empty 304 Not Modified if the client's copy is still current.
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+    """
+    etag = etag or make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        not_modified = last_modified is not None and if_modified_since is not None and _not_modified_since(if_modified_since, last_modified)
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,160 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+
+HASH_BITS = 64
+# Perceptual hashes with fewer set (or unset) bits than this come from flat,
+# low-detail images that all look alike to dHash; they are only cached exactly.
+_MIN_HASH_BITS = 8
+
+
+def _is_informative(phash: int) -> bool:
+    return _MIN_HASH_BITS <= phash.bit_count() <= HASH_BITS - _MIN_HASH_BITS
+
+
+def image_digest(image_bytes: bytes) -> bytes:
+    """Exact content key of an uploaded image."""
+    return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+
+def perceptual_hash(image_bytes: bytes) -> int:
+    """
+    64-bit difference hash (dHash) of an image: a 9x8 grayscale thumbnail, one
+    bit per pair of horizontally adjacent pixels, set where brightness increases.
+    Re-encoding, rescaling and small crops or lighting changes flip few bits.
+    CPU-bound: runs in the vision service's preprocessing pool.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    # JPEG draft mode: decode at 1/8 scale, which is plenty for a 9x8 thumbnail.
+    image.draft("L", (9, 8))
+    pixels = np.asarray(image.convert("L").resize((9, 8), Image.Resampling.BOX), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class ImageResultCache:
+    """
+    Classification results of recently verified images, so repeated photos of
+    the same listing image or packaging skip decoding and inference.
+
+    Two levels, each bounded to `max_size` entries (least recently used first out):
+      - exact: keyed by the digest of the raw bytes; holds every result.
+      - similar: keyed by perceptual hash; holds confident matches only, and
+        answers for any hash within `max_distance` bits (Hamming distance).
+
+    The similar level is a multi-index hash table: the 64 bits are split into
+    `max_distance + 1` chunks and each hash is indexed under every chunk's value.
+    Two hashes within `max_distance` bits must agree exactly on at least one
+    chunk, so a lookup only compares against the hashes sharing a chunk.
+    """
+    def __init__(self, max_size: int, max_distance: int):
+        self.max_size = max_size
+        self.max_distance = max(0, min(max_distance, HASH_BITS // 4))
+        chunk_count = self.max_distance + 1
+        bounds = [HASH_BITS * i // chunk_count for i in range(chunk_count + 1)]
+        self._chunks = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._exact: "OrderedDict[bytes, dict]" = OrderedDict()
+        self._similar: "OrderedDict[int, dict]" = OrderedDict()
+        self._index: List[Dict[int, Set[int]]] = [{} for _ in self._chunks]
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _chunk_keys(self, phash: int):
+        return [(phash >> start) & mask for start, mask in self._chunks]
+
+    def get_exact(self, digest: bytes) -> Optional[dict]:
+        with self._lock:
+            result = self._exact.get(digest)
+            if result is None:
+                return None
+            self._exact.move_to_end(digest)
+            self.exact_hits += 1
+            return dict(result)
+
+    def get_similar(self, phash: int) -> Optional[dict]:
+        """The result cached for the closest hash within `max_distance` bits, counting a miss otherwise."""
+        with self._lock:
+            best, best_distance = None, self.max_distance + 1
+            if _is_informative(phash):
+                for index, key in zip(self._index, self._chunk_keys(phash)):
+                    for candidate in index.get(key, ()):
+                        distance = (candidate ^ phash).bit_count()
+                        if distance < best_distance:
+                            best, best_distance = candidate, distance
+            if best is None:
+                self.misses += 1
+                return None
+            self._similar.move_to_end(best)
+            self.similar_hits += 1
+            return dict(self._similar[best])
+
+    def put(self, digest: bytes, phash: Optional[int], result: dict) -> None:
+        if not self.enabled:
+            return
+        result = dict(result)
+        with self._lock:
+            self._exact[digest] = result
+            self._exact.move_to_end(digest)
+            if len(self._exact) > self.max_size:
+                self._exact.popitem(last=False)
+                self.evictions += 1
+            if phash is None or not _is_informative(phash) or result.get("product_id") is None:
+                return
+            if phash not in self._similar:
+                for index, key in zip(self._index, self._chunk_keys(phash)):
+                    index.setdefault(key, set()).add(phash)
+            self._similar[phash] = result
+            self._similar.move_to_end(phash)
+            if len(self._similar) > self.max_size:
+                evicted, _ = self._similar.popitem(last=False)
+                self._unindex(evicted)
+                self.evictions += 1
+
+    def _unindex(self, phash: int) -> None:
+        for index, key in zip(self._index, self._chunk_keys(phash)):
+            bucket = index[key]
+            bucket.discard(phash)
+            if not bucket:
+                del index[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._exact.clear()
+            self._similar.clear()
+            for index in self._index:
+                index.clear()
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.similar_hits
+        lookups = hits + self.misses
+        return {
+            "exact_size": len(self._exact),
+            "similar_size": len(self._similar),
+            "max_size": self.max_size,
+            "max_distance": self.max_distance,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+image_result_cache = ImageResultCache(
+    max_size=settings.VISION_CACHE_SIZE,
+    max_distance=settings.VISION_CACHE_MAX_DISTANCE
+)
@@ -0,0 +1,173 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.message_bus import MessageBus, message_bus
+from app.core.region_index import RegionIndex, region_index
+from app.core.websocket_manager import ConnectionManager, encode_frame
+
+logger = logging.getLogger(__name__)
+
+# Message bus channel carrying scan outcomes between the workers.
+KPI_CHANNEL = "kpi"
+
+WINDOW_MINUTES = 24 * 60
+TOP_ITEMS = 5
+
+
+class _MinuteBucket:
+    """Everything recorded during one minute of the window."""
+    __slots__ = ("minute", "scans", "anomalies", "product_alerts", "region_alerts")
+
+    def __init__(self):
+        self.reset(-1)
+
+    def reset(self, minute: int):
+        self.minute = minute
+        self.scans = 0
+        self.anomalies = 0
+        self.product_alerts: Counter = Counter()
+        self.region_alerts: Counter = Counter()
+
+
+class KPIEngine:
+    """
+    Sliding 24 hour window of the dashboard KPIs, kept in memory.
+
+    The window is a ring of per-minute buckets plus running totals: recording a
+    scan touches one bucket, and buckets are subtracted from the totals as they
+    fall out of the window, so the summary never scans the database.
+
+    Each gunicorn worker has its own engine. Scan outcomes are `publish`ed on
+    the message bus once and recorded by every worker's engine, so all of them
+    count all of the traffic. The window is bootstrapped from the database at
+    startup by `load`.
+
+    Alerts are counted per product and per region, the region being the city
+    nearest to the triggering scan according to the `RegionIndex`.
+    """
+    def __init__(self, bus: MessageBus, regions: RegionIndex, window_minutes: int = WINDOW_MINUTES):
+        self.window_minutes = window_minutes
+        self._buckets = [_MinuteBucket() for _ in range(window_minutes)]
+        self._current_minute = self._minute_of(time.time())
+        self.total_scans = 0
+        self.total_anomalies = 0
+        self.product_alerts: Counter = Counter()
+        self.region_alerts: Counter = Counter()
+        self.regions = regions
+        self._summary: Optional[dict] = None
+        self.bus = bus
+        self.bus.subscribe(KPI_CHANNEL, self._on_bus_message)
+
+    @staticmethod
+    def _minute_of(timestamp: float) -> int:
+        return int(timestamp // 60)
+
+    def _advance(self, minute: int):
+        """Expires every bucket that is older than the window ending at `minute`."""
+        if minute <= self._current_minute:
+            return
+        oldest = minute - self.window_minutes
+        if minute - self._current_minute >= self.window_minutes:
+            expiring = self._buckets
+        else:
+            expiring = (self._buckets[m % self.window_minutes] for m in range(self._current_minute + 1, minute + 1))
+        for bucket in expiring:
+            if bucket.minute > oldest or bucket.minute < 0:
+                continue
+            self.total_scans -= bucket.scans
+            self.total_anomalies -= bucket.anomalies
+            self.product_alerts.subtract(bucket.product_alerts)
+            self.region_alerts.subtract(bucket.region_alerts)
+            bucket.reset(-1)
+        # Drops the products and regions that reached zero
+        self.product_alerts = +self.product_alerts
+        self.region_alerts = +self.region_alerts
+        self._current_minute = minute
+        self._summary = None
+
+    def record(self, minute: int, scans: int, anomalies: int, product_alerts: Dict[str, int], region_alerts: Dict[str, int]):
+        """Adds the scans seen in a given minute to the window; minutes outside the window are ignored."""
+        self._advance(self._minute_of(time.time()))
+        if not self._current_minute - self.window_minutes < minute <= self._current_minute:
+            return
+        bucket = self._buckets[minute % self.window_minutes]
+        if bucket.minute != minute:
+            bucket.reset(minute)
+        bucket.scans += scans
+        bucket.anomalies += anomalies
+        bucket.product_alerts.update(product_alerts)
+        bucket.region_alerts.update(region_alerts)
+        self.total_scans += scans
+        self.total_anomalies += anomalies
+        self.product_alerts.update(product_alerts)
+        self.region_alerts.update(region_alerts)
+        self._summary = None
+
+    def load(
+        self,
+        scan_counts: Iterable[Tuple[int, int, int]],
+        alerts: List[Tuple[int, str, float, float]]
+    ):
+        """
+        Fills the window from `(minute, scans, anomalies)` and `(minute, product name, latitude, longitude)`
+        rows, as returned by `async_crud.get_kpi_scan_counts` and `get_kpi_alerts`.
+        """
+        for minute, scans, anomalies in scan_counts:
+            self.record(minute, scans, anomalies, {}, {})
+        regions = self.regions.lookup_many([a[2] for a in alerts], [a[3] for a in alerts])
+        for (minute, product_name, _, _), region in zip(alerts, regions):
+            self.record(minute, 0, 0, {product_name: 1}, {region: 1} if region else {})
+
+    def publish(self, scans: int, alerts: List[Tuple[str, float, float]]):
+        """
+        Sends committed scan outcomes to the engines of every worker, including this one.
+        `alerts` holds the product name and scan coordinates of every anomalous scan.
+        """
+        product_alerts = Counter(product_name for product_name, _, _ in alerts)
+        region_alerts = Counter(region for region in self.regions.lookup_many(
+            [a[1] for a in alerts], [a[2] for a in alerts]
+        ) if region)
+        message = json.dumps({
+            "m": self._minute_of(time.time()), "s": scans, "a": len(alerts),
+            "p": product_alerts, "r": region_alerts
+        })
+        self.bus.publish_nowait(KPI_CHANNEL, message)
+
+    def _on_bus_message(self, message: str):
+        event = json.loads(message)
+        self.record(event["m"], event["s"], event["a"], event["p"], event["r"])
+
+    def summary(self) -> dict:
+        """The current KPIs, in the shape of `schemas.DashboardAnalyticsSummary`."""
+        self._advance(self._minute_of(time.time()))
+        if self._summary is None:
+            self._summary = {
+                "total_scans_24h": self.total_scans,
+                "total_anomalies_24h": self.total_anomalies,
+                "highest_risk_products": self._top(self.product_alerts),
+                "highest_risk_regions": self._top(self.region_alerts)
+            }
+        return self._summary
+
+    @staticmethod
+    def _top(counts: Counter) -> List[dict]:
+        top = heapq.nlargest(TOP_ITEMS, counts.items(), key=lambda item: item[1])
+        return [{"name": name, "count": count} for name, count in top]
+
+    async def push_periodically(self, manager: ConnectionManager, interval_seconds: float):
+        """Broadcasts the KPIs to this worker's dashboards every `interval_seconds`."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                if manager.active_connections:
+                    manager.broadcast(encode_frame("kpi_update", json.dumps(self.summary())))
+            except Exception as e:
+                logger.error(f"Failed to push KPIs to the dashboards: {e!r}")
+
+
+kpi_engine = KPIEngine(message_bus, region_index)
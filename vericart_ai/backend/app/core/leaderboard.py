@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Iterable, List, NamedTuple, Tuple
+
+from sortedcontainers import SortedList
+
+from app.core.config import settings
+from app.core.message_bus import MessageBus, message_bus
+
+logger = logging.getLogger(__name__)
+
+# Message bus channel carrying [user_id, points] pairs whose points changed.
+LEADERBOARD_CHANNEL = "leaderboard"
+
+# User IDs are 32-bit integer primary keys.
+_USER_ID_BITS = 32
+_USER_ID_MASK = (1 << _USER_ID_BITS) - 1
+
+
+class LeaderboardEntry(NamedTuple):
+    rank: int
+    user_id: int
+    points: int
+
+
+class Leaderboard:
+    """
+    Users ordered by points, kept up to date incrementally as points change
+    (see `crud.create_point_transaction`; updates are published once the
+    transaction commits) and loaded from the database at startup.
+
+    Points only ever grow, so a user's entry only moves to a higher total: an
+    update delayed on the bus, or one applied while the startup load was
+    reading the database, never takes it back to an older total.
+
+    Ranks are competition ranks: a user's rank is one more than the number of
+    users with strictly more points, so tied users share a rank.
+    """
+    def load(self, scores: Iterable[Tuple[int, int]]) -> None:
+        """Merges (user_id, points) pairs read from the database into the leaderboard."""
+        raise NotImplementedError
+
+    def set_points(self, user_id: int, points: int) -> None:
+        self.set_points_many([(user_id, points)])
+
+    def set_points_many(self, scores: List[Tuple[int, int]]) -> None:
+        """Records the new point totals of several users. Safe to call inside or outside the event loop."""
+        raise NotImplementedError
+
+    def rank_for_points(self, points: int) -> int:
+        raise NotImplementedError
+
+    def page(self, skip: int, limit: int) -> List[LeaderboardEntry]:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    @staticmethod
+    def _ranked(first_rank: int, skip: int, members: List[Tuple[int, int]]) -> List[LeaderboardEntry]:
+        """Ranks consecutive (user_id, points) members, best first, given the rank of the first one."""
+        entries = []
+        for position, (user_id, points) in enumerate(members, start=skip + 1):
+            if entries and points == entries[-1].points:
+                rank = entries[-1].rank
+            else:
+                rank = first_rank if not entries else position
+            entries.append(LeaderboardEntry(rank, user_id, points))
+        return entries
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "users": self.size()}
+
+
+class MemoryLeaderboard(Leaderboard):
+    """
+    In-memory leaderboard: a sorted list of keys ordering users by points
+    (descending), then user ID, so a rank or an update costs O(log n). Each API
+    worker keeps its own copy; updates are published on the message bus and
+    applied by every worker, Celery included as a publisher.
+
+    Keys pack both into one integer, -points * 2**32 + user_id, which sorts
+    like the (-points, user_id) tuple but about twice as fast to build.
+    """
+    def __init__(self, bus: MessageBus):
+        self._keys = SortedList()
+        self._points = {}
+        self._lock = threading.Lock()
+        self.bus = bus
+        self.bus.subscribe(LEADERBOARD_CHANNEL, self._on_bus_message)
+
+    @staticmethod
+    def _key(user_id: int, points: int) -> int:
+        return (-points << _USER_ID_BITS) + user_id
+
+    @staticmethod
+    def _member(key: int) -> Tuple[int, int]:
+        return key & _USER_ID_MASK, -(key >> _USER_ID_BITS)
+
+    def load(self, scores: Iterable[Tuple[int, int]]) -> None:
+        points = dict(scores)
+        keys = SortedList(self._key(user_id, user_points) for user_id, user_points in points.items())
+        with self._lock:
+            # Updates received from the bus while the database was being read.
+            received = self._points
+            self._points, self._keys = points, keys
+            self._apply(received.items())
+
+    def set_points_many(self, scores: List[Tuple[int, int]]) -> None:
+        if scores:
+            self.bus.publish_soon(LEADERBOARD_CHANNEL, json.dumps(scores))
+
+    def apply(self, scores: Iterable[Tuple[int, int]]) -> None:
+        """Applies point changes to this worker's copy only."""
+        with self._lock:
+            self._apply(scores)
+
+    def _apply(self, scores: Iterable[Tuple[int, int]]) -> None:
+        for user_id, points in scores:
+            previous = self._points.get(user_id)
+            if previous is not None and previous >= points:
+                continue
+            if previous is not None:
+                self._keys.remove(self._key(user_id, previous))
+            self._keys.add(self._key(user_id, points))
+            self._points[user_id] = points
+
+    def _on_bus_message(self, message: str):
+        self.apply(json.loads(message))
+
+    def _rank_for_points(self, points: int) -> int:
+        # The key of user ID 0 sorts before every user with these points: everything left of it has more.
+        return self._keys.bisect_left(self._key(0, points)) + 1
+
+    def rank_for_points(self, points: int) -> int:
+        with self._lock:
+            return self._rank_for_points(points)
+
+    def page(self, skip: int, limit: int) -> List[LeaderboardEntry]:
+        with self._lock:
+            members = [self._member(key) for key in self._keys.islice(skip, skip + limit)]
+            if not members:
+                return []
+            return self._ranked(self._rank_for_points(members[0][1]), skip, members)
+
+    def size(self) -> int:
+        return len(self._keys)
+
+
+class RedisLeaderboard(Leaderboard):
+    """
+    Redis sorted set backend, shared by every API and Celery worker, so updates
+    need no message bus. Member order within equal points follows Redis (by user
+    ID, descending); ranks are still competition ranks.
+
+    Updates made on the event loop (the async scan path commits there) are sent
+    in the background with the asyncio client, as `MessageBus.publish_nowait`
+    does; synchronous callers (the sync routes' threadpool, Celery) block. ZADD GT
+    keeps the higher total, so the order in which updates land does not matter.
+    """
+    KEY = "vericart:leaderboard"
+    LOAD_CHUNK_SIZE = 10000
+
+    def __init__(self, redis_url: str):
+        # Imported lazily: only deployments using this backend need the Redis client.
+        import redis
+
+        self.redis_url = redis_url
+        self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self._async_redis = None
+        self._pending_updates = set()
+
+    def load(self, scores: Iterable[Tuple[int, int]]) -> None:
+        # Built under a temporary key and merged in one command, so readers never see a
+        # partial leaderboard, keeping the higher total of users updated meanwhile.
+        building_key = f"{self.KEY}:loading:{id(self)}"
+        pipeline = self._redis.pipeline(transaction=False)
+        pipeline.delete(building_key)
+        chunk = {}
+        for user_id, points in scores:
+            chunk[user_id] = points
+            if len(chunk) >= self.LOAD_CHUNK_SIZE:
+                pipeline.zadd(building_key, chunk)
+                chunk = {}
+        if chunk:
+            pipeline.zadd(building_key, chunk)
+        pipeline.execute()
+        self._redis.zunionstore(self.KEY, [self.KEY, building_key], aggregate="MAX")
+        self._redis.delete(building_key)
+
+    def set_points_many(self, scores: List[Tuple[int, int]]) -> None:
+        if not scores:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._redis.zadd(self.KEY, dict(scores), gt=True)
+            return
+        if self._async_redis is None:
+            import redis.asyncio as aioredis
+
+            self._async_redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        task = asyncio.ensure_future(self._async_redis.zadd(self.KEY, dict(scores), gt=True))
+        self._pending_updates.add(task)
+        task.add_done_callback(self._update_done)
+
+    def _update_done(self, task: asyncio.Task):
+        self._pending_updates.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # The user's next update, or the next startup load, brings the total back in line.
+            logger.error(f"Failed to update the leaderboard: {task.exception()!r}")
+
+    def rank_for_points(self, points: int) -> int:
+        return self._redis.zcount(self.KEY, f"({points}", "+inf") + 1
+
+    def page(self, skip: int, limit: int) -> List[LeaderboardEntry]:
+        members = [(int(user_id), int(points))
+                   for user_id, points in self._redis.zrevrange(self.KEY, skip, skip + limit - 1, withscores=True)]
+        if not members:
+            return []
+        return self._ranked(self.rank_for_points(members[0][1]), skip, members)
+
+    def size(self) -> int:
+        return self._redis.zcard(self.KEY)
+
+
+def create_leaderboard(backend: str) -> Leaderboard:
+    if backend == "redis":
+        return RedisLeaderboard(settings.REDIS_URL)
+    if backend == "memory":
+        return MemoryLeaderboard(message_bus)
+    raise ValueError(f"Unknown leaderboard backend: {backend}")
+
+
+leaderboard = create_leaderboard(settings.LEADERBOARD_BACKEND)
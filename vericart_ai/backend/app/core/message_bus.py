@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Handlers receive the message text exactly as it was published.
+MessageHandler = Callable[[str], None]
+
+
+class _DeliveryStats:
+    """Publish-to-delivery latency of one channel, as seen by this worker."""
+    def __init__(self):
+        self.delivered = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.last_latency_ms = 0.0
+
+    def record(self, latency_ms: float):
+        self.delivered += 1
+        self.total_latency_ms += latency_ms
+        self.last_latency_ms = latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    def as_dict(self) -> dict:
+        return {
+            "delivered": self.delivered,
+            "mean_latency_ms": round(self.total_latency_ms / self.delivered, 3) if self.delivered else 0.0,
+            "max_latency_ms": round(self.max_latency_ms, 3),
+            "last_latency_ms": round(self.last_latency_ms, 3),
+        }
+
+
+class MessageBus:
+    """
+    Publish/subscribe between the API worker processes.
+
+    Every message is published once and delivered to the handlers subscribed in
+    every worker, including the publishing one. Messages are framed as
+    "<publish time>|<text>" so that each worker can measure delivery latency
+    without decoding or re-encoding the text itself.
+    """
+    def __init__(self):
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+        self._stats: Dict[str, _DeliveryStats] = {}
+        self._pending_publishes = set()
+
+    def subscribe(self, channel: str, handler: MessageHandler):
+        """Registers a local handler for a channel. Call before `start()`."""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, message: str):
+        raise NotImplementedError
+
+    def publish_blocking(self, channel: str, message: str):
+        """
+        Publishes from synchronous code outside the event loop, such as Celery tasks
+        and the sync routes' threadpool.
+        """
+        raise NotImplementedError
+
+    def publish_nowait(self, channel: str, message: str):
+        """Publishes in the background, so callers on the request path never wait on the bus."""
+        task = asyncio.ensure_future(self.publish(channel, message))
+        self._pending_publishes.add(task)
+        task.add_done_callback(self._publish_done)
+
+    def publish_soon(self, channel: str, message: str):
+        """
+        Publishes without waiting on the bus from the event loop, and blocking from
+        synchronous code (the sync routes' threadpool, Celery workers).
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.publish_blocking(channel, message)
+        else:
+            self.publish_nowait(channel, message)
+
+    def _publish_done(self, task: asyncio.Task):
+        self._pending_publishes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to publish to the message bus: {task.exception()!r}")
+
+    @staticmethod
+    def _frame(message: str) -> str:
+        return f"{time.time():.6f}|{message}"
+
+    def _deliver(self, channel: str, frame: str):
+        """Unframes a message, records its latency and hands it to the local handlers."""
+        sent_at, _, message = frame.partition("|")
+        try:
+            latency_ms = (time.time() - float(sent_at)) * 1000.0
+            self._stats.setdefault(channel, _DeliveryStats()).record(latency_ms)
+        except ValueError:
+            logger.warning(f"Dropping malformed message on channel '{channel}'.")
+            return
+
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error(f"Message bus handler for '{channel}' failed: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "channels": {channel: stats.as_dict() for channel, stats in self._stats.items()},
+        }
+
+
+class LocalMessageBus(MessageBus):
+    """
+    In-process stand-in for a single worker, local development and tests.
+    Messages are delivered on the next event loop iteration, like a real backend.
+    """
+    async def publish(self, channel: str, message: str):
+        asyncio.get_running_loop().call_soon(self._deliver, channel, self._frame(message))
+
+    def publish_blocking(self, channel: str, message: str):
+        # There are no other processes to reach: deliver to this one's handlers right away.
+        self._deliver(channel, self._frame(message))
+
+
+class RedisMessageBus(MessageBus):
+    """
+    Redis pub/sub backend, so that a message published by any gunicorn worker
+    reaches the subscribers of every worker. Channel names are prefixed to keep
+    them apart from the Celery keys in the same Redis instance.
+    """
+    CHANNEL_PREFIX = "vericart:"
+
+    def __init__(self, redis_url: str):
+        super().__init__()
+        self.redis_url = redis_url
+        self._redis = None
+        self._sync_redis = None
+        self._pubsub = None
+        self._reader: asyncio.Task = None
+
+    async def start(self):
+        # Imported lazily: only deployments using this backend need the Redis client.
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        if not self._handlers:
+            return
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(*(self.CHANNEL_PREFIX + channel for channel in self._handlers))
+        self._reader = asyncio.create_task(self._read_loop())
+        logger.info(f"Redis message bus subscribed to {list(self._handlers)}.")
+
+    async def stop(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        if self._redis is not None:
+            await self._redis.close()
+
+    async def publish(self, channel: str, message: str):
+        await self._redis.publish(self.CHANNEL_PREFIX + channel, self._frame(message))
+
+    def publish_blocking(self, channel: str, message: str):
+        if self._sync_redis is None:
+            import redis
+
+            self._sync_redis = redis.Redis.from_url(self.redis_url, decode_responses=True)
+        self._sync_redis.publish(self.CHANNEL_PREFIX + channel, self._frame(message))
+
+    async def _read_loop(self):
+        while True:
+            try:
+                async for item in self._pubsub.listen():
+                    if item.get("type") == "message":
+                        channel = item["channel"][len(self.CHANNEL_PREFIX):]
+                        self._deliver(channel, item["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis message bus connection lost, retrying: {e!r}")
+                await asyncio.sleep(1.0)
+
+
+def create_message_bus(backend: str) -> MessageBus:
+    if backend == "redis":
+        return RedisMessageBus(settings.REDIS_URL)
+    if backend == "local":
+        return LocalMessageBus()
+    raise ValueError(f"Unknown message bus backend: {backend}")
+
+
+message_bus = create_message_bus(settings.MESSAGE_BUS_BACKEND)
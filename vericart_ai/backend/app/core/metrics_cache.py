@@ -0,0 +1,83 @@
+import json
+import logging
+import threading
+from datetime import date, datetime
+from typing import Iterable, NamedTuple, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.message_bus import MessageBus, message_bus
+
+logger = logging.getLogger(__name__)
+
+# Message bus channel carrying the dates whose metric snapshots were written.
+METRIC_SNAPSHOTS_CHANNEL = "metric_snapshots"
+
+
+class CachedMetricsResponse(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]  # the latest write of a snapshot in the range, if any
+
+
+class MetricsResponseCache:
+    """
+    Serialized `/analytics/metrics` responses, keyed by their (start_date, end_date) range.
+
+    Snapshots only change when a snapshot is written, so an entry is kept until a
+    write touches a date in its range. Writers call `snapshots_written`, which
+    tells the caches of every process (API workers as well as Celery workers) over
+    the message bus. The TTL is only a safety net for lost messages.
+
+    As in `ProvenanceCache`, readers note the generation before querying and only
+    store their response if no write happened in between.
+    """
+    def __init__(self, bus: MessageBus, max_size: int, ttl_seconds: float):
+        self._responses = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.bus = bus
+        self.bus.subscribe(METRIC_SNAPSHOTS_CHANNEL, self._on_bus_message)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, start_date: date, end_date: date) -> Optional[CachedMetricsResponse]:
+        return self._responses.get((start_date, end_date))
+
+    def put(self, start_date: date, end_date: date, generation: int, response: CachedMetricsResponse) -> None:
+        if generation == self._generation:
+            self._responses.set((start_date, end_date), response)
+
+    def invalidate_dates(self, dates: Iterable[date]) -> None:
+        """Drops every cached range containing one of the dates."""
+        dates = sorted(set(dates))
+        if not dates:
+            return
+        with self._lock:
+            self._generation += 1
+        self._responses.invalidate_where(
+            lambda key, _: key[0] <= dates[-1] and key[1] >= dates[0] and any(key[0] <= d <= key[1] for d in dates)
+        )
+
+    def snapshots_written(self, dates: Iterable[date]) -> None:
+        """Invalidates the ranges containing the written dates in every process."""
+        try:
+            self.bus.publish_blocking(METRIC_SNAPSHOTS_CHANNEL, json.dumps(sorted({d.isoformat() for d in dates})))
+        except Exception as e:
+            # The snapshots are committed either way; stale ranges then expire with the TTL.
+            logger.error(f"Failed to publish metric snapshot invalidation: {e!r}")
+
+    def _on_bus_message(self, message: str):
+        self.invalidate_dates(date.fromisoformat(d) for d in json.loads(message))
+
+    def stats(self) -> dict:
+        return self._responses.stats()
+
+
+metrics_cache = MetricsResponseCache(
+    message_bus,
+    max_size=settings.METRICS_CACHE_SIZE,
+    ttl_seconds=settings.METRICS_CACHE_TTL_SECONDS
+)
@@ -1,8 +1,13 @@
 import os
+import asyncio
 import joblib
+import numpy as np
 import pandas as pd
 import logging
-from typing import Dict, List
+import threading
+import time
+import warnings
+from typing import Dict, List, Optional, Tuple
 import json
 
 
@@ -12,6 +17,103 @@ from app.core.config import settings
 model = None
 logger = logging.getLogger(__name__)
 
+# The column order the fraud model was trained with (see the training notebook).
+MODEL_FEATURES = ('latitude', 'longitude', 'time_diff_seconds', 'distance_km', 'speed_kmh')
+
+
+class VisionModel:
+    """
+    A backend of the product image classifier, selected with VISION_MODEL_BACKEND.
+
+    `predict` maps a (N, 224, 224, 3) float32 batch of RGB pixels in [0, 1] to
+    (N, classes) scores. It is only ever called from the vision service's
+    inference thread, one batch at a time.
+    """
+    # The number of scores per image, when the model declares it.
+    num_classes: Optional[int] = None
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class OnnxVisionModel(VisionModel):
+    """
+    The image classifier exported to ONNX, float32 or int8-quantized (see
+    ml/scripts/convert_vision_model.py), run by ONNX Runtime on the CPU.
+
+    Workers load it without TensorFlow, so they start faster and use far less
+    memory. `intra_op_threads` caps the threads of one forward pass (0 lets the
+    runtime use every core); with several workers per host, cores / workers
+    avoids oversubscription.
+    """
+    def __init__(self, path: str, intra_op_threads: int = 0):
+        # Imported lazily, like TensorFlow: only needed when this backend is used.
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        output = self.session.get_outputs()[0]
+        self.output_name = output.name
+        if isinstance(output.shape[-1], int):
+            self.num_classes = output.shape[-1]
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        inputs = {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)}
+        return self.session.run([self.output_name], inputs)[0]
+
+
+class KerasVisionModel(VisionModel):
+    """The original Keras (.h5) image classifier. Needs TensorFlow, which is not in requirements.txt."""
+    def __init__(self, path: str):
+        # Imported lazily: TensorFlow is only needed when this backend is used.
+        from tensorflow import keras
+
+        self.model = keras.models.load_model(path)
+        self.num_classes = self.model.output_shape[-1]
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict(batch, verbose=0))
+
+
+class FakeVisionModel(VisionModel):
+    """
+    CPU-only stand-in for the image classifier, for tests and benchmarks.
+
+    An image is classified by its mean brightness: a uniform image of gray level
+    g in [0, 1] is class int(g * num_classes), with confidence 1. The cost of a
+    real forward pass can be simulated with a fixed per-batch and a per-image
+    delay (spent sleeping, so it releases the GIL like a real runtime).
+    """
+    def __init__(self, num_classes: int, batch_overhead_ms: float = 0.0, per_image_ms: float = 0.0):
+        self.num_classes = num_classes
+        self.batch_overhead_ms = batch_overhead_ms
+        self.per_image_ms = per_image_ms
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        delay_ms = self.batch_overhead_ms + self.per_image_ms * len(batch)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+        brightness = batch.reshape(len(batch), -1).mean(axis=1)
+        classes = np.minimum((brightness * self.num_classes).astype(np.int64), self.num_classes - 1)
+        scores = np.zeros((len(batch), self.num_classes), dtype=np.float32)
+        scores[np.arange(len(batch)), classes] = 1.0
+        return scores
+
+
+def create_vision_model(backend: str, path: str, num_classes: int) -> VisionModel:
+    if backend == "onnx":
+        return OnnxVisionModel(path, intra_op_threads=settings.VISION_ONNX_THREADS)
+    if backend == "keras":
+        return KerasVisionModel(path)
+    if backend == "fake":
+        return FakeVisionModel(num_classes)
+    raise ValueError(f"Unknown vision model backend: {backend}")
+
+
 class ModelHandler:
     """
     A centralized class to load, manage, and serve all machine learning models.
@@ -19,7 +121,11 @@ class ModelHandler:
     """
     def __init__(self, fraud_model_path: str, vision_model_path: str, class_map_path: str):
         self.fraud_model = self._load_joblib_model(fraud_model_path)
+        self.model_features = self._resolve_model_features(self.fraud_model)
+        # Per-thread scratch matrix for scoring, so no array is allocated per call.
+        self._feature_buffer = threading.local()
         self.vision_class_names = self._load_class_map(class_map_path)
+        self.vision_model = self._load_vision_model(vision_model_path) if self.vision_class_names else None
         logger.info("ModelHandler initialized.")
 
     def _load_joblib_model(self, path: str):
@@ -35,7 +141,47 @@ class ModelHandler:
             logger.error(f"FATAL: An error occurred while loading the fraud model: {e}")
             raise
 
-    
+    @staticmethod
+    def _resolve_model_features(fraud_model) -> tuple:
+        """
+        Returns the fixed column order used to pack feature vectors for the model.
+
+        Models fitted on a DataFrame remember their column names; we pack arrays in
+        exactly that order (see `_predict` for the warning this raises).
+        """
+        fitted_names = getattr(fraud_model, "feature_names_in_", None)
+        if fitted_names is None:
+            return MODEL_FEATURES
+
+        fitted_names = tuple(str(name) for name in fitted_names)
+        if set(fitted_names) != set(MODEL_FEATURES):
+            logger.warning(f"Fraud model was fitted on unexpected features {fitted_names}.")
+        return fitted_names
+
+    def _pack_features(self, feature_rows: List[Dict]) -> np.ndarray:
+        """
+        Packs feature dicts into the first rows of this thread's preallocated
+        (n, n_features) float64 matrix, which only grows when a larger batch comes in.
+        """
+        matrix = getattr(self._feature_buffer, "matrix", None)
+        if matrix is None or len(matrix) < len(feature_rows):
+            size = max(len(feature_rows), settings.INFERENCE_BATCH_MAX_SIZE)
+            matrix = np.empty((size, len(self.model_features)), dtype=np.float64)
+            self._feature_buffer.matrix = matrix
+        for row, features in enumerate(feature_rows):
+            for column, name in enumerate(self.model_features):
+                matrix[row, column] = features[name]
+        return matrix[:len(feature_rows)]
+
+    def _predict(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Scores a packed feature matrix. Its columns are in the fitted order, so the
+        "no valid feature names" warning sklearn raises for arrays is silenced, for
+        this call only.
+        """
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+            return self.fraud_model.predict(feature_matrix)
 
     def _load_class_map(self, path: str) -> List[str]:
         """Loads the vision model's class index to product ID mapping."""
@@ -49,6 +195,27 @@ class ModelHandler:
             logger.info(f"Vision model class map loaded with {len(class_names)} classes.")
             return class_names
 
+    def _load_vision_model(self, path: str) -> Optional[VisionModel]:
+        """Loads the image classifier with the VISION_MODEL_BACKEND backend, or returns None if it is unavailable."""
+        backend = settings.VISION_MODEL_BACKEND
+        if backend != "fake" and not os.path.exists(path):
+            logger.warning(f"Vision model file not found at {path}. Vision features will be disabled.")
+            return None
+        started = time.perf_counter()
+        try:
+            model = create_vision_model(backend, path, num_classes=len(self.vision_class_names))
+        except Exception as e:
+            logger.error(f"Could not load the vision model ({backend}): {e!r}. Vision features will be disabled.")
+            return None
+        if model.num_classes not in (None, len(self.vision_class_names)):
+            logger.error(
+                f"The vision model scores {model.num_classes} classes but the class map has "
+                f"{len(self.vision_class_names)}. Vision features will be disabled."
+            )
+            return None
+        logger.info(f"Vision model loaded with the '{backend}' backend in {time.perf_counter() - started:.2f}s.")
+        return model
+
     def predict_anomaly(self, features: Dict) -> bool:
         """
         Uses the loaded Isolation Forest model to predict if a scan is an anomaly.
@@ -57,12 +224,7 @@ class ModelHandler:
             raise RuntimeError("Fraud detection model is not available.")
         
         try:
-            feature_df = pd.DataFrame([features])
-            
-            model_features = ['latitude', 'longitude', 'time_diff_seconds', 'distance_km', 'speed_kmh']
-            feature_df = feature_df[model_features]
-            
-            prediction = self.fraud_model.predict(feature_df)
+            prediction = self._predict(self._pack_features([features]))
             is_anomaly = bool(prediction[0] == -1)
             logger.info(f"Prediction for features {features}: {'Anomaly' if is_anomaly else 'Normal'}")
             return is_anomaly
@@ -70,9 +232,124 @@ class ModelHandler:
             logger.error(f"An error occurred during anomaly prediction: {e}")
             return True 
 
+    def predict_anomaly_dataframe(self, features: Dict) -> bool:
+        """
+        The original pandas-based scoring path, kept as the reference implementation
+        for parity checks and benchmarks against `predict_anomaly`.
+        """
+        if self.fraud_model is None:
+            raise RuntimeError("Fraud detection model is not available.")
+
+        feature_df = pd.DataFrame([features])
+        feature_df = feature_df[list(self.model_features)]
+        prediction = self.fraud_model.predict(feature_df)
+        return bool(prediction[0] == -1)
+
+    def predict_anomalies(self, feature_rows: List[Dict]) -> List[bool]:
+        """
+        Batch version of `predict_anomaly`: scores every row with a single model call.
+        """
+        if self.fraud_model is None:
+            raise RuntimeError("Fraud detection model is not available.")
+        if not feature_rows:
+            return []
+
+        try:
+            predictions = self._predict(self._pack_features(feature_rows))
+            results = [bool(prediction == -1) for prediction in predictions]
+            logger.info(f"Batch prediction for {len(results)} scans: {sum(results)} anomalies")
+            return results
+        except Exception as e:
+            logger.error(f"An error occurred during batch anomaly prediction: {e}")
+            return [True] * len(feature_rows)
+
+
+class InferenceBatcher:
+    """
+    Collects fraud predictions requested by concurrent coroutines and scores them
+    together with a single `predict_anomalies` call.
+
+    A batch is flushed as soon as `max_batch_size` feature vectors are pending, or
+    `max_wait_ms` after the first one arrived, whichever comes first. Each caller
+    awaits its own future, so under load the per-call sklearn overhead is shared
+    by the whole batch instead of being paid by every scan.
+    """
+    def __init__(self, handler: ModelHandler, max_wait_ms: float, max_batch_size: int):
+        self.handler = handler
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[Tuple[Dict, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.batches_scored = 0
+        self.items_scored = 0
+        self.last_batch_size = 0
+        self.max_batch_size_seen = 0
+
+    async def predict_anomaly(self, features: Dict) -> bool:
+        """Queues a feature vector for the next batch and waits for its prediction."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch = self._pending[:self.max_batch_size]
+        del self._pending[:self.max_batch_size]
+        if self._pending:
+            # Leftovers form the next batch straight away rather than waiting again.
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+        if not batch:
+            return
+
+        try:
+            results = self.handler.predict_anomalies([features for features, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), is_anomaly in zip(batch, results):
+            if not future.done():
+                future.set_result(is_anomaly)
+
+        self.batches_scored += 1
+        self.items_scored += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_size_seen = max(self.max_batch_size_seen, len(batch))
+
+    def stats(self) -> dict:
+        """Queue depth and batch size metrics for monitoring."""
+        return {
+            "queue_depth": len(self._pending),
+            "batches_scored": self.batches_scored,
+            "items_scored": self.items_scored,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size_seen": self.max_batch_size_seen,
+            "mean_batch_size": round(self.items_scored / self.batches_scored, 2) if self.batches_scored else 0.0,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_batch_size": self.max_batch_size,
+        }
+
 
 model_handler = ModelHandler(
     fraud_model_path=settings.MODEL_PATH,
     vision_model_path=settings.VISION_MODEL_PATH,
     class_map_path=settings.CLASS_MAP_PATH
 )
+
+inference_batcher = InferenceBatcher(
+    model_handler,
+    max_wait_ms=settings.INFERENCE_BATCH_MAX_WAIT_MS,
+    max_batch_size=settings.INFERENCE_BATCH_MAX_SIZE
+)
@@ -0,0 +1,178 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.message_bus import MessageBus, message_bus
+from app.db import async_crud, models
+
+logger = logging.getLogger(__name__)
+
+# Message bus channel carrying the new states of products that had an authentic scan committed.
+PRODUCT_STATE_CHANNEL = "product_state"
+
+
+class ProductState(NamedTuple):
+    """The last authentic scan of a product, as needed for feature engineering."""
+    latitude: float
+    longitude: float
+    timestamp: datetime
+    scan_order: int
+
+
+def _utc(timestamp: datetime) -> datetime:
+    # SQLite returns naive datetimes for timezone-aware columns; they are UTC.
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+class ProductStateStore:
+    """
+    An in-memory, LRU-bounded store of the last authentic scan per product.
+
+    Entries are warmed lazily from the database on a miss and replaced whenever
+    a new authentic scan is committed, so the feature engineering step of a scan
+    normally does not need to query the `scans` table at all.
+
+    Each worker process holds its own copy. `scans_committed` publishes new
+    states on the message bus and every worker applies them, so a scan committed
+    by one worker is the reference point of the next scan in all of them.
+    Entries only ever move to a later scan (a database read racing with a bus
+    message cannot bring back an older one) and expire after `ttl_seconds`,
+    which bounds the staleness if a message is lost.
+    """
+
+    # Marker cached for products that have never had an authentic scan,
+    # so that repeated misses on a brand new product do not hit the DB.
+    _NO_SCAN = object()
+
+    def __init__(self, bus: MessageBus, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bus = bus
+        self.bus.subscribe(PRODUCT_STATE_CHANNEL, self._on_bus_message)
+
+    def _lookup(self, product_id: int):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(product_id)
+            if cached is not None and cached[0] > now:
+                self._entries.move_to_end(product_id)
+                self.hits += 1
+                return cached[1]
+            if cached is not None:
+                del self._entries[product_id]
+            self.misses += 1
+            return None
+
+    def _store(self, product_id: int, entry) -> None:
+        """Caches an entry, unless the product already has a state from a later scan."""
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            cached = self._entries.get(product_id)
+            if cached is not None and cached[1] is not self._NO_SCAN and (
+                entry is self._NO_SCAN or _utc(cached[1].timestamp) > _utc(entry.timestamp)
+            ):
+                return
+            self._entries[product_id] = (expires_at, entry)
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def get(self, db: AsyncSession, product_id: int) -> Optional[ProductState]:
+        """
+        Returns the last authentic scan state for a product, falling back to
+        a single database read (and caching the result) on a miss.
+        """
+        entry = self._lookup(product_id)
+        if entry is None:
+            last_scan = await async_crud.get_last_authentic_scan(db, product_id=product_id)
+            entry = self.state_from_scan(last_scan) if last_scan else self._NO_SCAN
+            self._store(product_id, entry)
+        return None if entry is self._NO_SCAN else entry
+
+    async def get_many(self, db: AsyncSession, product_ids: Iterable[int]) -> Dict[int, Optional[ProductState]]:
+        """
+        Batch version of `get`: every miss is warmed with one shared database query.
+        """
+        states = {}
+        missing = []
+        for product_id in set(product_ids):
+            entry = self._lookup(product_id)
+            if entry is None:
+                missing.append(product_id)
+            else:
+                states[product_id] = entry
+
+        if missing:
+            last_scans = await async_crud.get_last_authentic_scans(db, product_ids=missing)
+            for product_id in missing:
+                last_scan = last_scans.get(product_id)
+                entry = self.state_from_scan(last_scan) if last_scan else self._NO_SCAN
+                self._store(product_id, entry)
+                states[product_id] = entry
+
+        return {
+            product_id: (None if entry is self._NO_SCAN else entry)
+            for product_id, entry in states.items()
+        }
+
+    def update(self, product_id: int, state: ProductState) -> None:
+        """Records an authentic scan as the product's latest state, in this worker only."""
+        self._store(product_id, state)
+
+    def scans_committed(self, states: Dict[int, ProductState]) -> None:
+        """
+        Records newly committed authentic scans as their products' latest states,
+        in this worker right away and in the others over the bus.
+        """
+        if not states:
+            return
+        for product_id, state in states.items():
+            self.update(product_id, state)
+        message = json.dumps([
+            [product_id, state.latitude, state.longitude, _utc(state.timestamp).isoformat(), state.scan_order]
+            for product_id, state in states.items()
+        ])
+        try:
+            self.bus.publish_soon(PRODUCT_STATE_CHANNEL, message)
+        except Exception as e:
+            # The other workers' entries then expire with the TTL.
+            logger.error(f"Failed to publish product states: {e!r}")
+
+    def _on_bus_message(self, message: str):
+        for product_id, latitude, longitude, timestamp, scan_order in json.loads(message):
+            self.update(product_id, ProductState(latitude, longitude, datetime.fromisoformat(timestamp), scan_order))
+
+    def invalidate(self, product_id: int) -> None:
+        with self._lock:
+            self._entries.pop(product_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def state_from_scan(scan: models.Scan) -> ProductState:
+        return ProductState(
+            latitude=scan.latitude,
+            longitude=scan.longitude,
+            timestamp=scan.timestamp,
+            scan_order=scan.scan_order or 1
+        )
+
+
+product_state_store = ProductStateStore(
+    message_bus,
+    max_size=settings.PRODUCT_STATE_CACHE_SIZE,
+    ttl_seconds=settings.PRODUCT_STATE_TTL_SECONDS
+)
@@ -0,0 +1,82 @@
+import json
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from app.core import schemas
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.message_bus import MessageBus, message_bus
+
+logger = logging.getLogger(__name__)
+
+# Message bus channel carrying the internal IDs of products whose provenance was written.
+PROVENANCE_CHANNEL = "provenance"
+
+
+class ProvenanceCache:
+    """
+    Per-product cache of the provenance journey (Digital Passport).
+
+    Every product has a version number that is bumped on each provenance write.
+    Readers note the version *before* querying the database and cached entries
+    are only served while their version is still current, so a journey read
+    concurrently with a write can never be cached as the latest one.
+
+    Writers call `products_written` once committed (see
+    `crud.mark_provenance_written`), which bumps the versions in every process
+    over the message bus; the TTL bounds the staleness if a message is lost.
+    """
+    def __init__(self, bus: MessageBus, max_size: int, ttl_seconds: float):
+        self._journeys = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.bus = bus
+        self.bus.subscribe(PROVENANCE_CHANNEL, self._on_bus_message)
+
+    def version(self, product_id: int) -> int:
+        return self._versions.get(product_id, 0)
+
+    def get(self, product_id: int) -> Optional[List[schemas.ProvenanceEntry]]:
+        entry = self._journeys.get(product_id)
+        if entry is None:
+            return None
+        version, journey = entry
+        return journey if version == self.version(product_id) else None
+
+    def put(self, product_id: int, version: int, journey: List[schemas.ProvenanceEntry]) -> None:
+        if version == self.version(product_id):
+            self._journeys.set(product_id, (version, journey))
+
+    def bump(self, product_id: int) -> None:
+        """Marks a product's cached journey as outdated after a provenance write."""
+        with self._lock:
+            self._versions[product_id] = self.version(product_id) + 1
+        self._journeys.invalidate(product_id)
+
+    def products_written(self, product_ids: Iterable[int]) -> None:
+        """Outdates the products' journeys in this process right away, and in the others over the bus."""
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return
+        for product_id in product_ids:
+            self.bump(product_id)
+        try:
+            self.bus.publish_soon(PROVENANCE_CHANNEL, json.dumps(product_ids))
+        except Exception as e:
+            # Other processes' journeys then expire with the TTL.
+            logger.error(f"Failed to publish provenance invalidation: {e!r}")
+
+    def _on_bus_message(self, message: str):
+        for product_id in json.loads(message):
+            self.bump(product_id)
+
+    def stats(self) -> dict:
+        return self._journeys.stats()
+
+
+provenance_cache = ProvenanceCache(
+    message_bus,
+    max_size=settings.PROVENANCE_CACHE_SIZE,
+    ttl_seconds=settings.PROVENANCE_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,79 @@
+import csv
+import logging
+import math
+import os
+from typing import List, Optional
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RegionIndex:
+    """
+    Reverse geocoder mapping coordinates to the nearest known city.
+
+    The cities of `data/locations.csv` are indexed once, at startup, in a
+    KD-tree, so a lookup is a logarithmic tree search instead of a distance
+    computation against every city. Points are indexed as unit vectors on the
+    sphere: the straight-line (chord) distance between two of them grows with
+    their great-circle distance, so the nearest neighbour in the tree is also
+    the nearest city by haversine distance.
+    Regions are labelled "<city>, <country>".
+    """
+    def __init__(self, locations_path: str):
+        self.regions: np.ndarray = np.array([], dtype=object)
+        self._tree: Optional[cKDTree] = None
+        self._load(locations_path)
+
+    @staticmethod
+    def _to_unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        latitudes, longitudes = np.radians(latitudes), np.radians(longitudes)
+        cos_latitudes = np.cos(latitudes)
+        return np.column_stack((cos_latitudes * np.cos(longitudes), cos_latitudes * np.sin(longitudes), np.sin(latitudes)))
+
+    def _load(self, path: str):
+        if not os.path.exists(path):
+            logger.warning(f"Locations file not found at {path}. Region lookups will be disabled.")
+            return
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        if not rows:
+            logger.warning(f"Locations file {path} is empty. Region lookups will be disabled.")
+            return
+        latitudes = np.array([float(row['latitude']) for row in rows])
+        longitudes = np.array([float(row['longitude']) for row in rows])
+        self.regions = np.array([f"{row['name']}, {row['country']}" for row in rows], dtype=object)
+        self._tree = cKDTree(self._to_unit_vectors(latitudes, longitudes))
+        logger.info(f"Region index built over {len(rows)} locations from {path}")
+
+    @property
+    def enabled(self) -> bool:
+        return self._tree is not None
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[str]:
+        """Returns the region nearest to a single point, or None if the index is unavailable."""
+        if self._tree is None:
+            return None
+        latitude, longitude = math.radians(latitude), math.radians(longitude)
+        cos_latitude = math.cos(latitude)
+        point = (cos_latitude * math.cos(longitude), cos_latitude * math.sin(longitude), math.sin(latitude))
+        _, index = self._tree.query(point)
+        return self.regions[index]
+
+    def lookup_many(self, latitudes, longitudes) -> List[Optional[str]]:
+        """Vectorized `lookup`: one tree query for a whole array of points."""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        if self._tree is None:
+            return [None] * len(latitudes)
+        if len(latitudes) == 0:
+            return []
+        _, indices = self._tree.query(self._to_unit_vectors(latitudes, longitudes))
+        return self.regions[indices].tolist()
+
+
+region_index = RegionIndex(settings.LOCATIONS_PATH)
@@ -144,6 +144,16 @@ class ScanReward(BaseModel):
     points_awarded: int
     message: str
 
+class LeaderboardEntry(BaseModel):
+    """A user's position on the points leaderboard. Tied users share a rank."""
+    rank: int
+    user_id: int
+    points: int
+
+class LeaderboardRank(LeaderboardEntry):
+    """The current user's position, out of `total_users`."""
+    total_users: int
+
 
 
 class ProductCreate(BaseModel):
@@ -156,6 +166,15 @@ class ProductCreate(BaseModel):
 class UserCreate(BaseModel):
     walmart_customer_id: str
 
+class TokenRequest(BaseModel):
+    walmart_customer_id: str
+
+class Token(BaseModel):
+    """A signed bearer token for the user-facing endpoints."""
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
 class SupplierCreate(BaseModel):
     name: str
     location: str
@@ -166,6 +185,13 @@ class EducationalContentCreate(BaseModel):
     title: str
     content: str
 
+class ProvenanceEntryCreate(BaseModel):
+    """Schema for recording a new step in a product's journey."""
+    status: str
+    location: str
+    handler: str
+    timestamp: Optional[datetime] = None
+
 class NFCVerificationRequest(BaseModel):
     product_id: str = Field(..., alias="id") 
     latitude: float
@@ -226,3 +252,27 @@ class BusinessMetricSnapshot(BaseModel):
     class Config:
         from_attributes = True
 
+
+class TimeseriesPoint(BaseModel):
+    bucket_start: datetime
+    scans: int = 0
+    authentic_scans: int = 0
+    alerts: int = 0
+
+    class Config:
+        from_attributes = True
+
+class Timeseries(BaseModel):
+    """Scan activity of one product, category, supplier or of everything ("all") over time."""
+    resolution: str
+    dimension: str
+    key: str
+    start: datetime
+    end: datetime
+    points: List[TimeseriesPoint]
+
+class TimeseriesBreakdownItem(BaseModel):
+    key: str
+    scans: int
+    authentic_scans: int
+    alerts: int
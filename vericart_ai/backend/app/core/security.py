@@ -1,9 +1,18 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from typing import NamedTuple, Optional
+
 from fastapi import Security, HTTPException, status, Depends
 from fastapi.security import APIKeyHeader
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.db import crud, models
 from app.db.database import get_db
+from app.core.user_cache import CachedUser
 from starlette.websockets import WebSocket
 from starlette.exceptions import WebSocketException
 from starlette import status
@@ -31,21 +40,77 @@ async def get_api_key(api_key_from_request: str = Security(api_key_header)):
             detail="Invalid or Missing API Key"
         )
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token") 
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token") 
+
+
+# --- Access tokens: HS256 JWTs, verified locally without a database round trip ---
+
+class TokenClaims(NamedTuple):
+    walmart_customer_id: str
+    user_id: int
+    expires_at: int
+
+
+def _b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _json_segment(data: dict) -> str:
+    return _b64url_encode(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+_JWT_HEADER = _json_segment({"alg": "HS256", "typ": "JWT"})
+
+def _sign(signing_input: str) -> str:
+    if not settings.JWT_SECRET_KEY:
+        raise RuntimeError("JWT_SECRET_KEY is not configured.")
+    digest = hmac.new(settings.JWT_SECRET_KEY.encode("utf-8"), signing_input.encode("ascii"), hashlib.sha256).digest()
+    return _b64url_encode(digest)
+
+
+def create_access_token(user: CachedUser) -> str:
+    """Issues a signed access token for a user, valid for ACCESS_TOKEN_EXPIRE_MINUTES."""
+    issued_at = int(time.time())
+    payload = _json_segment({
+        "sub": user.walmart_customer_id,
+        "uid": user.id,
+        "iat": issued_at,
+        "exp": issued_at + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    })
+    signing_input = f"{_JWT_HEADER}.{payload}"
+    return f"{signing_input}.{_sign(signing_input)}"
+
+
+def decode_access_token(token: str) -> Optional[TokenClaims]:
+    """
+    Verifies a token's signature and expiry and returns its claims,
+    or None if the token is malformed, forged or expired.
+    """
+    try:
+        header, payload, signature = token.split(".")
+        if json.loads(_b64url_decode(header)).get("alg") != "HS256":
+            return None
+        if not hmac.compare_digest(signature, _sign(f"{header}.{payload}")):
+            return None
+        claims = json.loads(_b64url_decode(payload))
+        if claims["exp"] <= time.time():
+            return None
+        return TokenClaims(walmart_customer_id=claims["sub"], user_id=claims["uid"], expires_at=claims["exp"])
+    except (ValueError, KeyError, TypeError, AttributeError, binascii.Error, UnicodeError):
+        return None
+
 
 def get_current_active_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> models.User:
+) -> CachedUser:
     """
-    Dependency to get the current user from a token.
-    In a real application, this would decode a JWT token to get the user ID.
-    For this example, we'll assume the token *is* the walmart_customer_id.
+    Dependency to get the current user from a signed access token.
+    The token is verified locally; the user's fields come from the user cache,
+    so a cache hit costs no database round trip.
     """
-    
-    walmart_id = token  
-    
-
-    user = crud.get_user_by_walmart_id(db, walmart_id=walmart_id)
+    claims = decode_access_token(token)
+    user = crud.get_cached_user(db, walmart_id=claims.walmart_customer_id) if claims else None
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,99 @@
+import json
+import logging
+import threading
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.message_bus import MessageBus, message_bus
+from app.db import models
+
+logger = logging.getLogger(__name__)
+
+# Message bus channel carrying the Walmart customer IDs of users whose row was written.
+USERS_CHANNEL = "users"
+
+
+class CachedUser(NamedTuple):
+    """
+    A detached, read-only snapshot of the user fields that requests touch
+    (authentication, profile, scan rewards). Safe to share between sessions.
+    """
+    id: int
+    walmart_customer_id: str
+    role: str
+    points: int
+    scan_count: int
+
+
+# Only these columns are selected when a user is loaded into the cache.
+USER_COLUMNS = tuple(getattr(models.User, field) for field in CachedUser._fields)
+
+
+class UserCache:
+    """
+    Read-through cache of user snapshots, keyed by Walmart customer ID, shared by
+    the auth dependency and the scan processor.
+
+    Writers of a user's points or profile call `users_written` once committed
+    (see `crud.mark_users_written`), which drops the snapshot in every process
+    over the message bus; the short TTL bounds the staleness if a message is
+    lost. Unknown IDs are never cached.
+
+    As in `MetricsResponseCache`, readers note the generation before querying
+    and only store their snapshot if no invalidation happened in between.
+    """
+    def __init__(self, bus: MessageBus, max_size: int, ttl_seconds: float):
+        self._users = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.bus = bus
+        self.bus.subscribe(USERS_CHANNEL, self._on_bus_message)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, walmart_id: str) -> Optional[CachedUser]:
+        return self._users.get(walmart_id)
+
+    def put(self, row: Sequence, generation: int) -> CachedUser:
+        """Caches a row of USER_COLUMNS, unless a user was invalidated since `generation` was read."""
+        snapshot = CachedUser(*row)
+        if generation == self._generation:
+            self._users.set(snapshot.walmart_customer_id, snapshot)
+        return snapshot
+
+    def invalidate(self, walmart_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+        for walmart_id in walmart_ids:
+            self._users.invalidate(walmart_id)
+
+    def users_written(self, walmart_ids: Iterable[str]) -> None:
+        """Drops the written users' snapshots in this process right away, and in the others over the bus."""
+        walmart_ids = sorted(set(walmart_ids))
+        if not walmart_ids:
+            return
+        self.invalidate(walmart_ids)
+        try:
+            self.bus.publish_soon(USERS_CHANNEL, json.dumps(walmart_ids))
+        except Exception as e:
+            # Other processes' snapshots then expire with the TTL.
+            logger.error(f"Failed to publish user cache invalidation: {e!r}")
+
+    def _on_bus_message(self, message: str):
+        self.invalidate(json.loads(message))
+
+    def clear(self) -> None:
+        self._users.clear()
+
+    def stats(self) -> dict:
+        return self._users.stats()
+
+
+user_cache = UserCache(
+    message_bus,
+    max_size=settings.USER_CACHE_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS
+)
@@ -1,61 +1,151 @@
 from fastapi import WebSocket
-from typing import List
-import logging
-from sqlalchemy.orm import Session, joinedload 
+from typing import Dict
+import asyncio
 import json
-import traceback
-from app.db import models, crud
+import logging
+
+from app.core.config import settings
+from app.core.message_bus import MessageBus, message_bus
 
 logger = logging.getLogger(__name__)
 
+# What to do when a client's outbound queue is full.
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+# Message bus channel carrying dashboard messages between the workers.
+DASHBOARD_CHANNEL = "dashboard"
+
+
+def encode_frame(message_type: str, payload_json: str) -> str:
+    """
+    Builds a dashboard frame around an already JSON-encoded payload, e.g. the output
+    of `model_dump_json`, so the payload is never decoded and re-encoded.
+    """
+    return f'{{"type":{json.dumps(message_type)},"payload":{payload_json}}}'
+
+
+class _Subscriber:
+    """One connected dashboard: its bounded outbound queue and the task draining it."""
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: asyncio.Task = None
+        self.dropped = 0
+
+
 class ConnectionManager:
     """
     Manages active WebSocket connections for the real-time dashboard.
     This class follows a singleton-like pattern where a single instance
     is created and imported throughout the application.
+
+    Broadcasting never waits on a client: every connection has a bounded
+    outbound queue drained by its own writer task, so the sends to different
+    clients run concurrently and a slow client only ever delays itself.
+
+    Each gunicorn worker has its own manager and its own clients, so messages
+    are `publish`ed on the message bus once and every worker's manager
+    `broadcast`s them to its local connections.
+
+    Messages are pre-encoded text frames: a frame is serialized once, where it
+    is created, and that same string is queued for and sent to every client.
     """
-    
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+
+    def __init__(self, bus: MessageBus, queue_size: int, slow_consumer_policy: str, send_timeout: float):
+        if slow_consumer_policy not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.active_connections: Dict[WebSocket, _Subscriber] = {}
+        self.bus = bus
+        self.bus.subscribe(DASHBOARD_CHANNEL, self._on_bus_message)
 
     async def connect(self, websocket: WebSocket):
-        """Accepts a new WebSocket connection and adds it to the active list."""
+        """Accepts a new WebSocket connection and starts its writer task."""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        subscriber = _Subscriber(websocket, self.queue_size)
+        subscriber.writer = asyncio.create_task(self._write_loop(subscriber))
+        self.active_connections[websocket] = subscriber
         logger.info(f"New WebSocket connection: {websocket.client}. Total connections: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
-        """Removes a WebSocket connection from the active list."""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(f"WebSocket disconnected: {websocket.client}. Total connections: {len(self.active_connections)}")
-
-    '''async def broadcast(self, message: str):
-        """Sends a JSON message to all active WebSocket connections."""
-        if not self.active_connections:
+        """Removes a WebSocket connection and stops its writer task."""
+        subscriber = self.active_connections.pop(websocket, None)
+        if subscriber is None:
             return
+        if subscriber.writer is not None and subscriber.writer is not asyncio.current_task():
+            subscriber.writer.cancel()
+        logger.info(f"WebSocket disconnected: {websocket.client}. Total connections: {len(self.active_connections)}")
 
-        # Create a list of connections to iterate over, in case of disconnections during broadcast.
-        connections = list(self.active_connections)
-        logger.info(f"Broadcasting message to {len(connections)} clients.")
-        
-        for connection in connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                # This can happen if a client disconnects abruptly.
-                logger.warning(f"Failed to send message to {connection.client}: {e}")
-                # The disconnect logic in main.py will handle final cleanup.'''
-    async def broadcast(self, payload: dict):
-        """Broadcasts a simple dictionary payload to all connected clients."""
-        for connection in self.active_connections:
+    def publish(self, frame: str):
+        """
+        Sends a text frame to the dashboards connected to every worker.
+        Returns immediately; delivery happens in the background.
+        """
+        self.bus.publish_nowait(DASHBOARD_CHANNEL, frame)
+
+    def _on_bus_message(self, frame: str):
+        self.broadcast(frame)
+
+    def broadcast(self, frame: str):
+        """
+        Queues a text frame for every client connected to this worker and returns immediately.
+        Clients whose queue is full are handled according to the slow consumer policy.
+        """
+        for subscriber in list(self.active_connections.values()):
             try:
-                await connection.send_json(payload)
-            except Exception as e:
-                
-                print(f"Error sending to a client: {e}")
-                traceback.print_exc()
+                subscriber.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                subscriber.dropped += 1
+                if self.slow_consumer_policy == DISCONNECT:
+                    logger.warning(f"Disconnecting slow WebSocket client {subscriber.websocket.client}.")
+                    self._evict(subscriber)
+                else:
+                    subscriber.queue.get_nowait()
+                    subscriber.queue.put_nowait(frame)
+
+    async def _write_loop(self, subscriber: _Subscriber):
+        """Sends queued frames to one client until it fails or is disconnected."""
+        try:
+            while True:
+                frame = await subscriber.queue.get()
+                await asyncio.wait_for(subscriber.websocket.send_text(frame), timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to send to {subscriber.websocket.client}, evicting it: {e!r}")
+            self._evict(subscriber)
+
+    def _evict(self, subscriber: _Subscriber):
+        """Drops a dead or too slow client and closes its socket in the background."""
+        if self.active_connections.get(subscriber.websocket) is not subscriber:
+            return
+        self.disconnect(subscriber.websocket)
+        asyncio.ensure_future(self._close_quietly(subscriber.websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        """Per-worker fan-out metrics for monitoring."""
+        return {
+            "connections": len(self.active_connections),
+            "queued_messages": sum(s.queue.qsize() for s in self.active_connections.values()),
+            "dropped_messages": sum(s.dropped for s in self.active_connections.values()),
+            "slow_consumer_policy": self.slow_consumer_policy,
+        }
 
 
 
-manager = ConnectionManager()
+manager = ConnectionManager(
+    message_bus,
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    slow_consumer_policy=settings.WS_SLOW_CONSUMER_POLICY,
+    send_timeout=settings.WS_SEND_TIMEOUT_SECONDS
+)
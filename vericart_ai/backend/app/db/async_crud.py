@@ -0,0 +1,269 @@
+from sqlalchemy import Integer, case, cast, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import models, serializers
+from .crud import alerts_after, product_scan_stats_increment
+from app.core import schemas
+from app.core.catalog_cache import CachedProduct, catalog_cache
+from app.core.provenance_cache import provenance_cache
+from app.core.user_cache import USER_COLUMNS, CachedUser, user_cache
+
+# Async counterparts of the `crud` functions used on the scan and dashboard hot paths.
+# Relationships are always loaded up front: lazy loading is not available on an AsyncSession.
+
+
+
+async def get_product_by_id_str(db: AsyncSession, product_id_str: str) -> Optional[models.Product]:
+    """Fetches a product (with its supplier) by its public string ID (e.g., SKU/GTIN)."""
+    result = await db.execute(
+        select(models.Product)
+        .options(joinedload(models.Product.supplier))
+        .filter(models.Product.product_id_str == product_id_str)
+    )
+    return result.scalars().first()
+
+async def get_cached_product(db: AsyncSession, product_id_str: str) -> Optional[CachedProduct]:
+    """Read-through lookup of a product snapshot in the catalog cache; see `crud.get_cached_product`."""
+    cached = catalog_cache.get(product_id_str)
+    if cached is not None:
+        return cached
+
+    db_product = await get_product_by_id_str(db, product_id_str=product_id_str)
+    return catalog_cache.put(db_product) if db_product else None
+
+async def get_cached_products(db: AsyncSession, product_id_strs: Iterable[str]) -> Dict[str, CachedProduct]:
+    """Batch read-through lookup: every cache miss is loaded with one shared query."""
+    products = {}
+    missing = []
+    for product_id_str in set(product_id_strs):
+        cached = catalog_cache.get(product_id_str)
+        if cached is not None:
+            products[product_id_str] = cached
+        else:
+            missing.append(product_id_str)
+
+    if missing:
+        for product_id_str, db_product in (await get_products_by_id_strs(db, missing)).items():
+            products[product_id_str] = catalog_cache.put(db_product)
+    return products
+
+async def get_products_by_id_strs(db: AsyncSession, product_id_strs: Iterable[str]) -> Dict[str, models.Product]:
+    """Fetches several products (with their suppliers) by public string ID in one query."""
+    result = await db.execute(
+        select(models.Product)
+        .options(joinedload(models.Product.supplier))
+        .filter(models.Product.product_id_str.in_(set(product_id_strs)))
+    )
+    return {product.product_id_str: product for product in result.scalars().all()}
+
+
+
+async def get_cached_user(db: AsyncSession, walmart_id: str) -> Optional[CachedUser]:
+    """Async version of `crud.get_cached_user`."""
+    return (await get_cached_users(db, [walmart_id])).get(walmart_id)
+
+async def get_cached_users(db: AsyncSession, walmart_ids: Iterable[str]) -> Dict[str, CachedUser]:
+    """
+    Batch read-through lookup of user snapshots by Walmart customer ID:
+    every cache miss is loaded, for just the cached columns, with one shared query.
+    """
+    users = {}
+    missing = []
+    for walmart_id in set(walmart_ids):
+        cached = user_cache.get(walmart_id)
+        if cached is not None:
+            users[walmart_id] = cached
+        else:
+            missing.append(walmart_id)
+
+    if missing:
+        generation = user_cache.generation
+        result = await db.execute(select(*USER_COLUMNS).filter(models.User.walmart_customer_id.in_(missing)))
+        for row in result.all():
+            user = user_cache.put(row, generation)
+            users[user.walmart_customer_id] = user
+    return users
+
+async def get_user_points(db: AsyncSession) -> List[Tuple[int, int]]:
+    """(user ID, points) of every user, to build the leaderboard."""
+    result = await db.execute(select(models.User.id, models.User.points))
+    return result.tuples().all()
+
+
+
+async def get_last_authentic_scan(db: AsyncSession, product_id: int) -> Optional[models.Scan]:
+    """Fetches the most recent authentic scan for a product, if there is one."""
+    result = await db.execute(
+        select(models.Scan).filter(
+            models.Scan.product_id == product_id,
+            models.Scan.is_authentic == True
+        ).order_by(models.Scan.timestamp.desc()).limit(1)
+    )
+    return result.scalars().first()
+
+async def get_last_authentic_scans(db: AsyncSession, product_ids: Iterable[int]) -> Dict[int, models.Scan]:
+    """
+    Fetches the most recent authentic scan for each of several products
+    in a single query, keyed by product ID.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+
+    ranked = select(
+        models.Scan.id.label("scan_id"),
+        func.row_number().over(
+            partition_by=models.Scan.product_id,
+            order_by=models.Scan.timestamp.desc()
+        ).label("rank")
+    ).filter(
+        models.Scan.product_id.in_(product_ids),
+        models.Scan.is_authentic == True
+    ).subquery()
+
+    result = await db.execute(
+        select(models.Scan).join(ranked, models.Scan.id == ranked.c.scan_id).filter(ranked.c.rank == 1)
+    )
+    return {scan.product_id: scan for scan in result.scalars().all()}
+
+async def increment_product_scan_stats(db: AsyncSession, increments: Dict[int, Tuple[int, int]]) -> None:
+    """Adds `(total, authentic)` scans to each product's counters, without committing."""
+    if increments:
+        await db.execute(product_scan_stats_increment(db.bind.dialect.name, increments))
+
+def _epoch_minute(db: AsyncSession, column):
+    """SQL expression for the minutes since the Unix epoch of a (UTC) timestamp column."""
+    if db.bind.dialect.name == "sqlite":
+        return cast(func.strftime('%s', column), Integer) // 60
+    return cast(func.floor(func.extract('epoch', column) / 60), Integer)
+
+async def get_kpi_scan_counts(db: AsyncSession, since: datetime, until: datetime) -> List[Tuple[int, int, int]]:
+    """Counts the scans and anomalous scans recorded from `since` until (excluding) `until`, per minute."""
+    minute = _epoch_minute(db, models.Scan.timestamp).label("minute")
+    result = await db.execute(
+        select(
+            minute,
+            func.count(models.Scan.id),
+            func.sum(case((models.Scan.is_authentic == False, 1), else_=0))
+        ).filter(models.Scan.timestamp >= since, models.Scan.timestamp < until).group_by(minute)
+    )
+    return [(int(m), scans, anomalies or 0) for m, scans, anomalies in result.all()]
+
+
+
+async def get_alerts(db: AsyncSession, status: Optional[str], skip: int, limit: int, after: Optional[Tuple[datetime, int]] = None) -> List[models.Alert]:
+    """
+    Get a paginated list of alerts (with product and supplier), filterable by status, sorted by newest.
+    `after` is a keyset cursor: the (timestamp, id) of the last alert of the previous page.
+    """
+    query = select(models.Alert).options(
+        selectinload(models.Alert.product).selectinload(models.Product.supplier)
+    )
+    if status:
+        query = query.filter(models.Alert.status == status)
+    if after is not None:
+        query = query.filter(alerts_after(after))
+    result = await db.execute(
+        query.order_by(models.Alert.timestamp.desc(), models.Alert.id.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+async def get_alert_schemas(db: AsyncSession, status: Optional[str], skip: int, limit: int, after: Optional[Tuple[datetime, int]] = None) -> List[schemas.Alert]:
+    """Same page as `get_alerts`, serialized with its products and suppliers from a single joined query."""
+    query = serializers.alert_rows()
+    if status:
+        query = query.filter(models.Alert.status == status)
+    if after is not None:
+        query = query.filter(alerts_after(after))
+    result = await db.execute(
+        query.order_by(models.Alert.timestamp.desc(), models.Alert.id.desc()).offset(skip).limit(limit)
+    )
+    return [serializers.alert_from_row(row) for row in result.all()]
+
+async def update_alert_status(db: AsyncSession, alert_id: int, status_update: schemas.AlertStatusUpdate) -> Optional[models.Alert]:
+    """Updates the status and notes of a specific alert."""
+    result = await db.execute(
+        select(models.Alert)
+        .options(selectinload(models.Alert.product).selectinload(models.Product.supplier))
+        .filter(models.Alert.id == alert_id)
+    )
+    db_alert = result.scalars().first()
+    if db_alert:
+        db_alert.status = status_update.new_status
+        if status_update.notes is not None:
+            db_alert.notes = status_update.notes
+        await db.commit()
+    return db_alert
+
+async def get_kpi_alerts(db: AsyncSession, since: datetime, until: datetime) -> List[Tuple[int, str, float, float]]:
+    """Lists the minute, product name and triggering scan location of every alert raised from `since` until (excluding) `until`."""
+    result = await db.execute(
+        select(
+            _epoch_minute(db, models.Alert.timestamp),
+            models.Product.name,
+            models.Scan.latitude,
+            models.Scan.longitude
+        )
+        .join(models.Product, models.Alert.product_id == models.Product.id)
+        .join(models.Scan, models.Alert.scan_id == models.Scan.id)
+        .filter(models.Alert.timestamp >= since, models.Alert.timestamp < until)
+    )
+    return [(int(m), name, latitude, longitude) for m, name, latitude, longitude in result.all()]
+
+
+
+async def get_provenance_for_product(db: AsyncSession, product_id: int) -> List[models.ProvenanceEntry]:
+    """Fetches the full journey for a product from the ProvenanceEntry table."""
+    result = await db.execute(
+        select(models.ProvenanceEntry)
+        .filter(models.ProvenanceEntry.product_id == product_id)
+        .order_by(models.ProvenanceEntry.timestamp.asc())
+    )
+    return result.scalars().all()
+
+async def get_provenance_for_products(db: AsyncSession, product_ids: Iterable[int]) -> Dict[int, List[models.ProvenanceEntry]]:
+    """Fetches the journeys of several products in one query, keyed by product ID."""
+    journeys = {product_id: [] for product_id in product_ids}
+    if not journeys:
+        return journeys
+
+    result = await db.execute(
+        select(models.ProvenanceEntry)
+        .filter(models.ProvenanceEntry.product_id.in_(journeys.keys()))
+        .order_by(models.ProvenanceEntry.timestamp.asc())
+    )
+    for entry in result.scalars().all():
+        journeys[entry.product_id].append(entry)
+    return journeys
+
+async def get_cached_provenance(db: AsyncSession, product_id: int) -> List[schemas.ProvenanceEntry]:
+    """Read-through lookup of a product's journey in the provenance cache."""
+    journey = provenance_cache.get(product_id)
+    if journey is not None:
+        return journey
+
+    version = provenance_cache.version(product_id)
+    journey = [schemas.ProvenanceEntry.model_validate(entry) for entry in await get_provenance_for_product(db, product_id)]
+    provenance_cache.put(product_id, version, journey)
+    return journey
+
+async def get_cached_provenances(db: AsyncSession, product_ids: Iterable[int]) -> Dict[int, List[schemas.ProvenanceEntry]]:
+    """Batch read-through lookup: every cache miss is loaded with one shared query."""
+    journeys = {}
+    missing = {}
+    for product_id in set(product_ids):
+        journey = provenance_cache.get(product_id)
+        if journey is not None:
+            journeys[product_id] = journey
+        else:
+            missing[product_id] = provenance_cache.version(product_id)
+
+    if missing:
+        for product_id, entries in (await get_provenance_for_products(db, missing.keys())).items():
+            journey = [schemas.ProvenanceEntry.model_validate(entry) for entry in entries]
+            provenance_cache.put(product_id, missing[product_id], journey)
+            journeys[product_id] = journey
+    return journeys
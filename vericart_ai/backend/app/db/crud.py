@@ -1,9 +1,17 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import event, func, case, select, delete, insert, literal, true, tuple_, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
 
-from . import models
+from . import models, serializers
 from app.core import schemas
+from app.core.badge_cache import CachedBadge, badge_cache
+from app.core.catalog_cache import CachedProduct, catalog_cache
+from app.core.leaderboard import leaderboard
+from app.core.metrics_cache import metrics_cache
+from app.core.provenance_cache import provenance_cache
+from app.core.user_cache import USER_COLUMNS, CachedUser, user_cache
 
 
 
@@ -15,10 +23,31 @@ def get_product_by_id_str(db: Session, product_id_str: str) -> Optional[models.P
     """Fetches a product from the database by its public string ID (e.g., SKU/GTIN)."""
     return db.query(models.Product).filter(models.Product.product_id_str == product_id_str).first()
 
+def get_cached_product(db: Session, product_id_str: str) -> Optional[CachedProduct]:
+    """
+    Read-through lookup of a product snapshot (with its supplier) in the catalog cache.
+    Only falls back to the database on a cache miss.
+    """
+    cached = catalog_cache.get(product_id_str)
+    if cached is not None:
+        return cached
+
+    db_product = db.query(models.Product).options(
+        joinedload(models.Product.supplier)
+    ).filter(models.Product.product_id_str == product_id_str).first()
+    return catalog_cache.put(db_product) if db_product else None
+
 def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[models.Product]:
     """Fetches a paginated list of all products."""
     return db.query(models.Product).order_by(models.Product.name).offset(skip).limit(limit).all()
 
+def get_product_schemas(db: Session, skip: int = 0, limit: int = 100) -> List[schemas.Product]:
+    """A page of products with their suppliers, serialized in one query."""
+    rows = db.execute(
+        serializers.product_rows().order_by(models.Product.name, models.Product.id).offset(skip).limit(limit)
+    ).all()
+    return [serializers.product_from_row(row) for row in rows]
+
 def create_product(db: Session, product: schemas.ProductCreate) -> models.Product:
     '''"""Creates a new product record from a Pydantic schema."""
     # Use .model_dump() for Pydantic v2, or .dict() for v1
@@ -42,27 +71,68 @@ def create_product(db: Session, product: schemas.ProductCreate) -> models.Produc
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    catalog_cache.invalidate_product(db_product.product_id_str)
     return db_product
 
 def get_product_verification_stats(db: Session, product_id: int) -> dict:
     """
-    Calculates the total scans and authentic scans for a given product ID
-    in a single, efficient database query.
+    Reads the total scans and authentic scans for a given product ID from its
+    maintained counters row: a primary-key lookup, however long the scan history.
     """
     
-    stats = db.query(
-        func.count(models.Scan.id).label("total_scans"),
-        func.sum(
-            case((models.Scan.is_authentic == True, 1), else_=0)
-        ).label("authentic_scans")
-    ).filter(models.Scan.product_id == product_id).one()
+    stats = db.get(models.ProductScanStats, product_id)
 
     
     return {
-        "total_scans": stats.total_scans or 0,
-        "authentic_scans": stats.authentic_scans or 0
+        "total_scans": stats.total_scans if stats else 0,
+        "authentic_scans": stats.authentic_scans if stats else 0
     }
 
+def product_scan_stats_increment(dialect_name: str, increments: Dict[int, Tuple[int, int]]):
+    """
+    Builds an upsert adding `(total, authentic)` scans to each product's counters.
+    It is executed inside the scan's own transaction, so counters and scans commit together.
+    """
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    table = models.ProductScanStats.__table__
+    stmt = dialect_insert(table).values([
+        {"product_id": product_id, "total_scans": total, "authentic_scans": authentic}
+        for product_id, (total, authentic) in increments.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.product_id],
+        set_={
+            "total_scans": table.c.total_scans + stmt.excluded.total_scans,
+            "authentic_scans": table.c.authentic_scans + stmt.excluded.authentic_scans,
+        }
+    )
+
+def rebuild_product_scan_stats(db: Session) -> int:
+    """
+    Reconciliation: recomputes every product's counters from the `scans` table
+    in one statement. Returns the number of products with scans.
+
+    The recounted values are upserted over the live counters rather than
+    replacing the table, so scans committed meanwhile (which upsert the same
+    rows) can neither be counted twice nor make the rebuild fail on a duplicate
+    key. At worst such a scan is left out until the next reconciliation.
+    """
+    recount = select(
+        models.Scan.product_id,
+        func.count(models.Scan.id),
+        func.sum(case((models.Scan.is_authentic == True, 1), else_=0))
+    ).where(true()).group_by(models.Scan.product_id)  # WHERE: SQLite's upsert-after-SELECT parsing needs one
+
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    table = models.ProductScanStats.__table__
+    stmt = dialect_insert(table).from_select(["product_id", "total_scans", "authentic_scans"], recount)
+    result = db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.product_id],
+        set_={"total_scans": stmt.excluded.total_scans, "authentic_scans": stmt.excluded.authentic_scans}
+    ))
+    db.commit()
+    return result.rowcount
+
 
 
 
@@ -78,12 +148,18 @@ def get_suppliers(db: Session, skip: int = 0, limit: int = 100) -> List[models.S
     """Fetches a paginated list of all suppliers."""
     return db.query(models.Supplier).order_by(models.Supplier.name).offset(skip).limit(limit).all()
 
+def get_supplier_schemas(db: Session, skip: int = 0, limit: int = 100) -> List[schemas.Supplier]:
+    """A page of suppliers, serialized in one query."""
+    rows = db.execute(serializers.supplier_rows().order_by(models.Supplier.name).offset(skip).limit(limit)).all()
+    return [serializers.supplier_from_row(row) for row in rows]
+
 def create_supplier(db: Session, supplier: schemas.SupplierCreate) -> models.Supplier:
     """Creates a new supplier record."""
     db_supplier = models.Supplier(**supplier.model_dump())
     db.add(db_supplier)
     db.commit()
     db.refresh(db_supplier)
+    catalog_cache.invalidate_supplier(db_supplier.id)
     return db_supplier
 
 
@@ -92,10 +168,72 @@ def get_user_by_walmart_id(db: Session, walmart_id: str) -> Optional[models.User
     """Fetches a user by their unique Walmart customer ID."""
     return db.query(models.User).filter(models.User.walmart_customer_id == walmart_id).first()
 
+def get_cached_user(db: Session, walmart_id: str) -> Optional[CachedUser]:
+    """
+    Read-through lookup of a user snapshot in the user cache.
+    Only falls back to the database (for just the cached columns) on a cache miss.
+    """
+    cached = user_cache.get(walmart_id)
+    if cached is not None:
+        return cached
+
+    generation = user_cache.generation
+    row = db.execute(select(*USER_COLUMNS).filter(models.User.walmart_customer_id == walmart_id)).first()
+    return user_cache.put(row, generation) if row else None
+
+
+def mark_users_written(db: Session, walmart_ids: List[str]) -> None:
+    """
+    Records that the users' rows were changed in this session's transaction:
+    their cached snapshots are dropped everywhere once it commits.
+    """
+    db.info.setdefault("written_users", set()).update(walmart_ids)
+
+
+def queue_leaderboard_update(db: Session, scores: List[Tuple[int, int]]) -> None:
+    """
+    Records users' new point totals from this session's transaction: the
+    leaderboard (of every worker) is only updated once it commits.
+    """
+    queued = db.info.setdefault("leaderboard_scores", {})
+    for user_id, points in scores:
+        queued[user_id] = max(points, queued.get(user_id, points))
+
+
+def mark_provenance_written(db: Session, product_ids: List[int]) -> None:
+    """
+    Records that the products' journeys were changed in this session's
+    transaction: their cached provenance is outdated everywhere once it commits.
+    """
+    db.info.setdefault("written_provenance", set()).update(product_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_writes(session: Session):
+    written_users = session.info.pop("written_users", None)
+    if written_users:
+        user_cache.users_written(written_users)
+    leaderboard_scores = session.info.pop("leaderboard_scores", None)
+    if leaderboard_scores:
+        leaderboard.set_points_many(list(leaderboard_scores.items()))
+    written_provenance = session.info.pop("written_provenance", None)
+    if written_provenance:
+        provenance_cache.products_written(written_provenance)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_uncommitted_writes(session: Session):
+    session.info.pop("written_users", None)
+    session.info.pop("leaderboard_scores", None)
+    session.info.pop("written_provenance", None)
+
+
 def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     """Creates a new user record."""
     db_user = models.User(**user.model_dump())
     db.add(db_user)
+    db.flush()
+    queue_leaderboard_update(db, [(db_user.id, db_user.points)])
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -125,12 +263,21 @@ def create_alert(db: Session, alert: schemas.AlertCreate, scan: models.Scan) ->
     db.add(db_alert)
     return db_alert
 
-def get_alerts(db: Session, status: Optional[str], skip: int, limit: int) -> List[models.Alert]:
-    """Get a paginated list of alerts, filterable by status, sorted by newest."""
+def get_alerts(db: Session, status: Optional[str], skip: int, limit: int, after: Optional[Tuple[datetime, int]] = None) -> List[models.Alert]:
+    """
+    Get a paginated list of alerts, filterable by status, sorted by newest.
+    `after` is a keyset cursor: the (timestamp, id) of the last alert of the previous page.
+    """
     query = db.query(models.Alert)
     if status:
         query = query.filter(models.Alert.status == status)
-    return query.order_by(models.Alert.timestamp.desc()).offset(skip).limit(limit).all()
+    if after is not None:
+        query = query.filter(alerts_after(after))
+    return query.order_by(models.Alert.timestamp.desc(), models.Alert.id.desc()).offset(skip).limit(limit).all()
+
+def alerts_after(cursor: Tuple[datetime, int]):
+    """Keyset condition selecting the alerts that come after `cursor` in newest-first order."""
+    return tuple_(models.Alert.timestamp, models.Alert.id) < tuple_(*cursor)
 
 def update_alert_status(db: Session, alert_id: int, status_update: schemas.AlertStatusUpdate) -> Optional[models.Alert]:
     """Updates the status and notes of a specific alert."""
@@ -159,6 +306,31 @@ def get_provenance_for_product(db: Session, product_id_str: str) -> List[models.
         models.ProvenanceEntry.product_id == product.id
     ).order_by(models.ProvenanceEntry.timestamp.asc()).all()
 
+def get_cached_provenance(db: Session, product_id: int) -> List[schemas.ProvenanceEntry]:
+    """Read-through lookup of a product's journey (by internal ID) in the provenance cache."""
+    journey = provenance_cache.get(product_id)
+    if journey is not None:
+        return journey
+
+    version = provenance_cache.version(product_id)
+    journey = [
+        schemas.ProvenanceEntry.model_validate(entry)
+        for entry in db.query(models.ProvenanceEntry).filter(
+            models.ProvenanceEntry.product_id == product_id
+        ).order_by(models.ProvenanceEntry.timestamp.asc()).all()
+    ]
+    provenance_cache.put(product_id, version, journey)
+    return journey
+
+def create_provenance_entry(db: Session, product_id: int, entry: schemas.ProvenanceEntryCreate) -> models.ProvenanceEntry:
+    """Records a new step in a product's journey and outdates its cached provenance."""
+    db_entry = models.ProvenanceEntry(product_id=product_id, **entry.model_dump(exclude_none=True))
+    db.add(db_entry)
+    mark_provenance_written(db, [product_id])
+    db.commit()
+    db.refresh(db_entry)
+    return db_entry
+
 def get_dashboard_stats(db: Session) -> dict:
     """Calculates aggregate statistics for the dashboard summary."""
     total_alerts = db.query(func.count(models.Alert.id)).scalar() or 0
@@ -198,28 +370,72 @@ def create_alert_schema(db_alert: models.Alert) -> schemas.Alert:
 
 
 
-def create_point_transaction(db: Session, user: models.User, scan: models.Scan, points_to_award: int) -> models.PointTransaction:
+def create_point_transaction(db: Session, user: CachedUser, scan: models.Scan, points_to_award: int) -> CachedUser:
     """
     Creates a new point transaction record linked to a user and a specific scan.
-    This also updates the user's total points count.
+    This also increments the user's total points and rewarded scan count in the
+    database (a single UPDATE, without loading the user). Once committed, the
+    user's leaderboard position is updated (O(log n); the leaderboard is rebuilt
+    from the database at startup) and their cached snapshot is dropped.
+
+    Returns the user's snapshot with the new counters, which the badge rules are
+    evaluated against.
     
     NOTE: This function does NOT commit the session. The calling service is
     responsible for the commit to ensure the entire operation (e.g., scan + points)
     is transactional.
     """
-    
-    db_point_transaction = models.PointTransaction(
-        owner=user,
-        scan=scan,
-        points_awarded=points_to_award
-    )
-    db.add(db_point_transaction)
-    
-    
-    user.points += points_to_award
-    db.add(user) 
-    
-    return db_point_transaction
+    return create_point_transactions(db, [(user, scan)], points_to_award)[user.id]
+
+
+def create_point_transactions(db: Session, rewards: List[Tuple[CachedUser, models.Scan]], points_to_award: int) -> Dict[int, CachedUser]:
+    """
+    Batch version of `create_point_transaction` for (user, scan) pairs: the point
+    transactions are inserted together and every user's counters are incremented
+    by their number of scans with one UPDATE, however many users there are.
+
+    Returns the users' snapshots with the new counters, keyed by user ID.
+
+    NOTE: Does NOT commit the session either.
+    """
+    if not rewards:
+        return {}
+    increments: Dict[int, Tuple[int, int]] = {}
+    for user, scan in rewards:
+        db.add(models.PointTransaction(user_id=user.id, scan=scan, points_awarded=points_to_award))
+        points, scans = increments.get(user.id, (0, 0))
+        increments[user.id] = (points + points_to_award, scans + 1)
+    return increment_user_counters(db, increments)
+
+
+def increment_user_counters(db: Session, increments: Dict[int, Tuple[int, int]]) -> Dict[int, CachedUser]:
+    """
+    Adds (points, rewarded scans) to each user's counters with one atomic
+    UPDATE ... RETURNING, so concurrent writers of the same user never lose an
+    increment. Once committed, the users' leaderboard positions are updated and
+    their cached snapshots dropped.
+
+    Returns the users' snapshots with the new counters, keyed by user ID.
+
+    NOTE: Does NOT commit the session.
+    """
+    if not increments:
+        return {}
+    points_added = case({user_id: points for user_id, (points, _) in increments.items()}, value=models.User.id)
+    scans_added = case({user_id: scans for user_id, (_, scans) in increments.items()}, value=models.User.id)
+    users = {
+        row.id: CachedUser(*row)
+        for row in db.execute(
+            update(models.User)
+            .where(models.User.id.in_(increments))
+            .values(points=models.User.points + points_added, scan_count=models.User.scan_count + scans_added)
+            .returning(*USER_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+    }
+    queue_leaderboard_update(db, [(user.id, user.points) for user in users.values()])
+    mark_users_written(db, [user.walmart_customer_id for user in users.values()])
+    return users
 
 
 def create_badge(db: Session, badge_data: schemas.Badge) -> models.Badge:
@@ -230,6 +446,7 @@ def create_badge(db: Session, badge_data: schemas.Badge) -> models.Badge:
     db.add(db_badge)
     db.commit()
     db.refresh(db_badge)
+    badge_cache.clear()
     return db_badge
 
 
@@ -238,29 +455,102 @@ def get_badge_by_name(db: Session, name: str) -> Optional[models.Badge]:
     return db.query(models.Badge).filter(models.Badge.name == name).first()
 
 
-def award_badge_to_user(db: Session, user: models.User, badge: models.Badge) -> Optional[models.UserBadge]:
+def get_cached_badges(db: Session) -> Dict[str, CachedBadge]:
+    """
+    The master badge definitions keyed by name, read through the badge cache.
+    The whole table is loaded in one query on a cache miss.
+    """
+    cached = badge_cache.get()
+    if cached is not None:
+        return cached
+
+    rows = db.execute(select(models.Badge.id, models.Badge.name)).all()
+    return badge_cache.put({name: CachedBadge(id=badge_id, name=name) for badge_id, name in rows})
+
+
+def get_user_badge_ids(db: Session, user_id: int) -> Set[int]:
+    """IDs of the master badges a user has already earned, in one query."""
+    rows = db.execute(select(models.UserBadge.badge_id).filter(models.UserBadge.user_id == user_id))
+    return set(rows.scalars())
+
+
+def award_badge_to_user(db: Session, user: CachedUser, badge_id: int) -> models.UserBadge:
     """
     Awards a badge to a user by creating a UserBadge entry.
-    Checks if the user already has the badge to prevent duplicates.
+    The caller checks the user's earned badges (see `get_user_badge_ids`) first,
+    so no duplicate is created.
 
     NOTE: Does NOT commit the session, to be handled by the calling service.
     """
-    
-    existing_user_badge = db.query(models.UserBadge).filter(
-        models.UserBadge.user_id == user.id,
-        models.UserBadge.badge_id == badge.id
-    ).first()
-
-    if existing_user_badge:
-        return None 
-
-    
-    db_user_badge = models.UserBadge(user=user, badge=badge)
+    db_user_badge = models.UserBadge(user_id=user.id, badge_id=badge_id)
     db.add(db_user_badge)
     
     return db_user_badge
 
 
+def get_user_badge_ids_by_user(db: Session, user_ids: List[int]) -> Dict[int, Set[int]]:
+    """`get_user_badge_ids` for several users in one query."""
+    earned = {user_id: set() for user_id in user_ids}
+    rows = db.execute(
+        select(models.UserBadge.user_id, models.UserBadge.badge_id).filter(models.UserBadge.user_id.in_(earned))
+    )
+    for user_id, badge_id in rows:
+        earned[user_id].add(badge_id)
+    return earned
+
+
+def create_reward_intent(db: Session, user: CachedUser, scan: models.Scan, points: int) -> models.RewardIntent:
+    """
+    Records that a scan earned `points`, to be applied later by `apply_reward_intents`.
+    Only an insert: the user's row is not touched.
+
+    NOTE: Does NOT commit the session; it belongs in the scan's transaction.
+    """
+    db_intent = models.RewardIntent(user_id=user.id, scan=scan, points=points)
+    db.add(db_intent)
+    return db_intent
+
+
+def claim_reward_intents(db: Session, limit: int) -> List[models.RewardIntent]:
+    """
+    The oldest pending reward intents, locked until the transaction ends.
+    Intents locked by another worker are skipped rather than waited for (PostgreSQL).
+    """
+    return db.query(models.RewardIntent).order_by(models.RewardIntent.id).limit(limit).with_for_update(skip_locked=True).all()
+
+
+def apply_reward_intents(db: Session, intents: List[models.RewardIntent]) -> Dict[int, CachedUser]:
+    """
+    Turns reward intents into point transactions with one bulk insert, adds them
+    to their users' points and scan counts (`increment_user_counters`, one UPDATE
+    for all users), and deletes the intents.
+
+    Concurrent appliers claim disjoint intents, but those can belong to the same
+    users: the user rows are locked in ID order first, so two appliers wait for
+    each other instead of deadlocking.
+
+    Returns the users' snapshots with their new counters, keyed by user ID.
+
+    NOTE: Does NOT commit the session. The calling service checks badges and commits.
+    """
+    if not intents:
+        return {}
+    db.execute(insert(models.PointTransaction), [
+        {"user_id": intent.user_id, "source_scan_id": intent.scan_id, "points_awarded": intent.points}
+        for intent in intents
+    ])
+    increments: Dict[int, Tuple[int, int]] = {}
+    for intent in intents:
+        points, scans = increments.get(intent.user_id, (0, 0))
+        increments[intent.user_id] = (points + intent.points, scans + 1)
+    db.execute(
+        select(models.User.id).where(models.User.id.in_(increments)).order_by(models.User.id).with_for_update()
+    ).all()
+    users = increment_user_counters(db, increments)
+    db.execute(delete(models.RewardIntent).where(models.RewardIntent.id.in_([intent.id for intent in intents])))
+    return users
+
+
 def create_educational_content(db: Session, content: schemas.EducationalContentCreate) -> models.EducationalContent:
     """
     Creates a new educational content article in the database.
@@ -306,4 +596,180 @@ def create_or_update_metric_snapshot(db: Session, data: dict):
     db.add(snapshot)
     db.commit()
     db.refresh(snapshot)
+    metrics_cache.snapshots_written([snapshot.snapshot_date])
     return snapshot
+
+
+def get_daily_activity_counts(db: Session, start_date: date, end_date: date) -> Dict[date, Tuple[int, int, int]]:
+    """
+    Counts the alerts, scans and authentic scans of every day in [start_date, end_date]
+    in a single grouped query. Days without any activity are left out.
+    """
+    start, end = start_date, end_date + timedelta(days=1)
+    activity = union_all(
+        select(
+            func.date(models.Scan.timestamp).label("day"),
+            literal(0).label("alerts"),
+            literal(1).label("scans"),
+            case((models.Scan.is_authentic == True, 1), else_=0).label("authentic")
+        ).filter(models.Scan.timestamp >= start, models.Scan.timestamp < end),
+        select(
+            func.date(models.Alert.timestamp).label("day"),
+            literal(1).label("alerts"),
+            literal(0).label("scans"),
+            literal(0).label("authentic")
+        ).filter(models.Alert.timestamp >= start, models.Alert.timestamp < end)
+    ).subquery()
+
+    rows = db.execute(
+        select(activity.c.day, func.sum(activity.c.alerts), func.sum(activity.c.scans), func.sum(activity.c.authentic))
+        .group_by(activity.c.day)
+    ).all()
+    # SQLite returns the day as an ISO string, PostgreSQL as a date.
+    return {
+        (date.fromisoformat(day) if isinstance(day, str) else day): (int(alerts), int(scans), int(authentic))
+        for day, alerts, scans, authentic in rows
+    }
+
+def upsert_metric_snapshots(db: Session, snapshots: List[dict]) -> int:
+    """
+    Creates or replaces the business metric snapshots of many dates with a single
+    INSERT .. ON CONFLICT statement and one commit. Returns the number of snapshots written.
+    """
+    if not snapshots:
+        return 0
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    table = models.BusinessMetricSnapshot.__table__
+    stmt = dialect_insert(table).values(snapshots)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.snapshot_date],
+        set_={
+            **{column: stmt.excluded[column] for column in snapshots[0] if column != "snapshot_date"},
+            "updated_at": func.now()
+        }
+    ))
+    db.commit()
+    metrics_cache.snapshots_written(snapshot["snapshot_date"] for snapshot in snapshots)
+    return len(snapshots)
+
+
+# --- Scan rollups ---
+
+ROLLUP_COLUMNS = ("resolution", "bucket_start", "dimension", "key", "scans", "authentic_scans", "alerts")
+
+def truncate_timestamp(dialect_name: str, resolution: str, column):
+    """SQL expression truncating a timestamp column to the start of its UTC minute, hour or day."""
+    if dialect_name == "postgresql":
+        return func.date_trunc(resolution, func.timezone("UTC", column))
+    formats = {"minute": "%Y-%m-%d %H:%M:00", "hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+    return func.strftime(formats[resolution], column)
+
+def parse_bucket(value) -> datetime:
+    """Normalizes a truncated timestamp (an ISO string on SQLite, a naive datetime on PostgreSQL) to aware UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def get_scan_counts_by_bucket(db: Session, resolution: str, start: datetime, end: datetime) -> list:
+    """
+    Counts scans, authentic scans and alerts in [start, end) per time bucket and product, in one grouped query.
+    Rows are (bucket, product_id_str, category, supplier_id, scans, authentic_scans, alerts).
+    """
+    bucket = truncate_timestamp(db.bind.dialect.name, resolution, models.Scan.timestamp).label("bucket")
+    rows = db.execute(
+        select(
+            bucket,
+            models.Product.product_id_str,
+            models.Product.category,
+            models.Product.supplier_id,
+            func.count(models.Scan.id),
+            func.sum(case((models.Scan.is_authentic == True, 1), else_=0)),
+            func.count(models.Alert.id)
+        )
+        .join(models.Product, models.Scan.product_id == models.Product.id)
+        .outerjoin(models.Alert, models.Alert.scan_id == models.Scan.id)
+        .filter(models.Scan.timestamp >= start, models.Scan.timestamp < end)
+        .group_by(bucket, models.Product.product_id_str, models.Product.category, models.Product.supplier_id)
+    ).all()
+    return [(parse_bucket(row[0]), *row[1:]) for row in rows]
+
+def get_rollup_sums_by_bucket(db: Session, source_resolution: str, target_resolution: str, start: datetime, end: datetime) -> list:
+    """
+    Re-aggregates the finer `source_resolution` rollups in [start, end) into `target_resolution` buckets.
+    Rows are (bucket, dimension, key, scans, authentic_scans, alerts).
+    """
+    rollup = models.ScanRollup
+    bucket = truncate_timestamp(db.bind.dialect.name, target_resolution, rollup.bucket_start).label("bucket")
+    rows = db.execute(
+        select(bucket, rollup.dimension, rollup.key, func.sum(rollup.scans), func.sum(rollup.authentic_scans), func.sum(rollup.alerts))
+        .filter(rollup.resolution == source_resolution, rollup.bucket_start >= start, rollup.bucket_start < end)
+        .group_by(bucket, rollup.dimension, rollup.key)
+    ).all()
+    return [(parse_bucket(row[0]), *row[1:]) for row in rows]
+
+def upsert_scan_rollups(db: Session, rows: List[tuple], batch_size: int = 1000) -> None:
+    """
+    Writes rollup rows (in `ROLLUP_COLUMNS` order), replacing the counts of existing buckets.
+    Does not commit, so that a whole rollup run is applied atomically.
+    """
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    table = models.ScanRollup.__table__
+    for offset in range(0, len(rows), batch_size):
+        stmt = dialect_insert(table).values([dict(zip(ROLLUP_COLUMNS, row)) for row in rows[offset:offset + batch_size]])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.resolution, table.c.dimension, table.c.key, table.c.bucket_start],
+            set_={column: stmt.excluded[column] for column in ("scans", "authentic_scans", "alerts")}
+        ))
+
+def get_latest_rollup_bucket(db: Session, resolution: str) -> Optional[datetime]:
+    latest = db.execute(
+        select(func.max(models.ScanRollup.bucket_start)).filter(models.ScanRollup.resolution == resolution)
+    ).scalar()
+    return parse_bucket(latest) if latest is not None else None
+
+def get_rollup_watermark(db: Session, name: str) -> Optional[datetime]:
+    """The end of the range the `name` rollup job has processed, or None before its first run."""
+    processed_until = db.execute(
+        select(models.RollupWatermark.processed_until).filter(models.RollupWatermark.name == name)
+    ).scalar()
+    return parse_bucket(processed_until) if processed_until is not None else None
+
+def set_rollup_watermark(db: Session, name: str, processed_until: datetime) -> None:
+    """Records how far the `name` rollup job has processed, without committing."""
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(models.RollupWatermark.__table__).values(name=name, processed_until=processed_until)
+    db.execute(stmt.on_conflict_do_update(index_elements=["name"], set_={"processed_until": stmt.excluded.processed_until}))
+
+def delete_scan_rollups_before(db: Session, resolution: str, before: datetime) -> int:
+    """Drops the rollups of one resolution older than `before`, without committing."""
+    result = db.execute(
+        delete(models.ScanRollup).filter(models.ScanRollup.resolution == resolution, models.ScanRollup.bucket_start < before)
+    )
+    return result.rowcount
+
+def get_scan_rollups(db: Session, resolution: str, dimension: str, key: str, start: datetime, end: datetime) -> List[models.ScanRollup]:
+    """Fetches one series of rollups in [start, end), oldest first."""
+    return db.query(models.ScanRollup).filter(
+        models.ScanRollup.resolution == resolution,
+        models.ScanRollup.dimension == dimension,
+        models.ScanRollup.key == key,
+        models.ScanRollup.bucket_start >= start,
+        models.ScanRollup.bucket_start < end
+    ).order_by(models.ScanRollup.bucket_start.asc()).all()
+
+def get_scan_rollup_breakdown(db: Session, resolution: str, dimension: str, start: datetime, end: datetime, limit: int) -> list:
+    """Totals the rollups of every key of a dimension over [start, end), most alerts first."""
+    rollup = models.ScanRollup
+    total_alerts = func.sum(rollup.alerts)
+    return db.execute(
+        select(rollup.key, func.sum(rollup.scans), func.sum(rollup.authentic_scans), total_alerts)
+        .filter(
+            rollup.resolution == resolution,
+            rollup.dimension == dimension,
+            rollup.bucket_start >= start,
+            rollup.bucket_start < end
+        )
+        .group_by(rollup.key)
+        .order_by(total_alerts.desc(), func.sum(rollup.scans).desc())
+        .limit(limit)
+    ).all()
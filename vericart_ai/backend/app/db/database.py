@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.core.config import settings
@@ -22,3 +24,34 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async drivers for the sync URLs in DATABASE_URL, e.g. postgresql+psycopg2 -> postgresql+asyncpg.
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def to_async_url(database_url: str) -> str:
+    """Derives the async-driver form of a database URL."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.get_driver_name() != ASYNC_DRIVERS[backend]:
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url.render_as_string(hide_password=False)
+
+
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+)
+
+
+# expire_on_commit=False: attributes of committed objects stay readable without a
+# lazy refresh, which an AsyncSession cannot do implicitly.
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
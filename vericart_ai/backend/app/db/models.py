@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, func, Date, JSON
+    Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, func, Date, JSON, UniqueConstraint, Index
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -40,7 +40,8 @@ class Product(Base):
 class Scan(Base):
     __tablename__ = "scans"
     id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # Indexed for the time-range reads of the rollup job and the analytics backfills.
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     user_id = Column(String, index=True, nullable=True)
@@ -54,8 +55,45 @@ class Scan(Base):
     triggered_alert = relationship("Alert", back_populates="triggering_scan", uselist=False, cascade="all, delete-orphan")
     point_transaction = relationship("PointTransaction", back_populates="scan", uselist=False, cascade="all, delete-orphan")
 
+class ProductScanStats(Base):
+    """Running scan counters per product, maintained alongside every scan insert."""
+    __tablename__ = "product_scan_stats"
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    total_scans = Column(Integer, default=0, nullable=False)
+    authentic_scans = Column(Integer, default=0, nullable=False)
+
+class ScanRollup(Base):
+    """
+    Pre-aggregated scan, authentic scan and alert counts per time bucket, at minute,
+    hour or day resolution, for all products together ("all") or broken down by
+    product, category or supplier. Maintained by `rollup_service`.
+    """
+    __tablename__ = "scan_rollups"
+    __table_args__ = (
+        UniqueConstraint("resolution", "dimension", "key", "bucket_start", name="uq_scan_rollups_bucket"),
+    )
+    id = Column(Integer, primary_key=True)
+    resolution = Column(String, nullable=False) # "minute", "hour" or "day"
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    dimension = Column(String, nullable=False) # "all", "product", "category" or "supplier"
+    key = Column(String, nullable=False, default="") # product_id_str, category or supplier ID; "" for "all"
+    scans = Column(Integer, default=0, nullable=False)
+    authentic_scans = Column(Integer, default=0, nullable=False)
+    alerts = Column(Integer, default=0, nullable=False)
+
+class RollupWatermark(Base):
+    """How far a rollup job has processed the raw scans: everything before `processed_until` is rolled up."""
+    __tablename__ = "rollup_watermarks"
+    name = Column(String, primary_key=True)
+    processed_until = Column(DateTime(timezone=True), nullable=False)
+
 class Alert(Base):
     __tablename__ = "alerts"
+    # Match the alerts feed's keyset pagination, newest first, with and without a status filter.
+    __table_args__ = (
+        Index("ix_alerts_status_timestamp_id", "status", "timestamp", "id"),
+        Index("ix_alerts_timestamp_id", "timestamp", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     alert_type = Column(String, nullable=False)
@@ -78,6 +116,8 @@ class User(Base):
     walmart_customer_id = Column(String, unique=True, index=True, nullable=False)
     role = Column(String, default="customer")
     points = Column(Integer, default=0, nullable=False)
+    # Number of rewarded (authentic) scans, i.e. of point transactions; kept in step by crud.create_point_transaction.
+    scan_count = Column(Integer, default=0, server_default="0", nullable=False)
     
     point_transactions = relationship("PointTransaction", back_populates="owner", cascade="all, delete-orphan")
     badges = relationship("UserBadge", back_populates="user", cascade="all, delete-orphan")
@@ -108,6 +148,23 @@ class PointTransaction(Base):
     scan = relationship("Scan")
 
 
+class RewardIntent(Base):
+    """
+    A reward owed for an authentic scan, recorded in the scan's transaction when
+    rewards are deferred (REWARDS_MODE="deferred"). `gamification_service`
+    turns intents into point transactions and badges in batches, then deletes them.
+    """
+    __tablename__ = "reward_intents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    scan_id = Column(Integer, ForeignKey("scans.id"), unique=True, nullable=False)
+    points = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    scan = relationship("Scan")
+
+
 class Badge(Base):
     __tablename__ = "badges"
 
@@ -159,5 +216,8 @@ class BusinessMetricSnapshot(Base):
 
     # A flexible field to store raw data used for the calculations
     raw_data = Column(JSON)
+
+    # When the snapshot was last written; the /analytics/metrics Last-Modified.
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     
@@ -0,0 +1,68 @@
+from sqlalchemy import Select, select
+
+from . import models
+from app.core import schemas
+
+# Bulk serialization for the list endpoints: every page is read with a single
+# joined SELECT of plain columns, and the Pydantic models are built straight from
+# the row tuples, so no ORM object (and no lazy load) is involved.
+
+SUPPLIER_COLUMNS = (models.Supplier.id, models.Supplier.name, models.Supplier.location, models.Supplier.risk_score)
+PRODUCT_COLUMNS = (models.Product.product_id_str, models.Product.name, models.Product.category)
+ALERT_COLUMNS = (
+    models.Alert.id, models.Alert.timestamp, models.Alert.alert_type,
+    models.Alert.message, models.Alert.risk_score, models.Alert.status
+)
+
+
+def _supplier_from_columns(supplier_id, name, location, risk_score):
+    if supplier_id is None:
+        return None
+    return schemas.Supplier(id=supplier_id, name=name, location=location, risk_score=risk_score)
+
+
+def supplier_rows() -> Select:
+    return select(*SUPPLIER_COLUMNS)
+
+
+def supplier_from_row(row) -> schemas.Supplier:
+    return _supplier_from_columns(*row)
+
+
+def product_rows() -> Select:
+    """Products with their supplier, as one row each."""
+    return select(*PRODUCT_COLUMNS, *SUPPLIER_COLUMNS).outerjoin(
+        models.Supplier, models.Product.supplier_id == models.Supplier.id
+    )
+
+
+def product_from_row(row) -> schemas.Product:
+    product_id_str, name, category = row[:3]
+    return schemas.Product(
+        id=product_id_str,
+        name=name,
+        category=category,
+        supplier=_supplier_from_columns(*row[3:7])
+    )
+
+
+def alert_rows() -> Select:
+    """Alerts with their product and its supplier, as one row each."""
+    return (
+        select(*ALERT_COLUMNS, *PRODUCT_COLUMNS, *SUPPLIER_COLUMNS)
+        .join(models.Product, models.Alert.product_id == models.Product.id)
+        .outerjoin(models.Supplier, models.Product.supplier_id == models.Supplier.id)
+    )
+
+
+def alert_from_row(row) -> schemas.Alert:
+    alert_id, timestamp, alert_type, message, risk_score, status = row[:6]
+    return schemas.Alert(
+        id=alert_id,
+        timestamp=timestamp,
+        alert_type=alert_type,
+        message=message,
+        risk_score=risk_score,
+        status=status,
+        product=product_from_row(row[6:])
+    )
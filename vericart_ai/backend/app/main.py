@@ -1,23 +1,77 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import logging
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 
-from app.api.routers import scans, dashboard, products, users, suppliers, educational, analytics
+from app.api.routers import scans, dashboard, products, users, suppliers, educational, analytics, gamification
 from app.core.config import settings
+from app.core.badge_cache import badge_cache
+from app.core.catalog_cache import catalog_cache
+from app.core.image_cache import image_result_cache
+from app.core.kpi_engine import WINDOW_MINUTES, kpi_engine
+from app.core.leaderboard import leaderboard
+from app.core.message_bus import message_bus
+from app.core.metrics_cache import metrics_cache
+from app.core.provenance_cache import provenance_cache
+from app.core.user_cache import user_cache
+from app.core.model_handler import inference_batcher
 from app.core.websocket_manager import manager
-from app.db import models, database
-from app.db.database import engine
+from app.db import models, database, async_crud
+from app.services import gamification_service
+from app.services.vision_service import vision_service
+from app.db.database import engine, AsyncSessionLocal
+
+
+async def load_kpi_window(until: datetime):
+    """
+    Bootstraps the in-memory KPI window with the scans and alerts of the last 24 hours
+    before `until`; those that come later are received over the message bus.
+    """
+    since = until - timedelta(minutes=WINDOW_MINUTES)
+    async with AsyncSessionLocal() as db:
+        scan_counts = await async_crud.get_kpi_scan_counts(db, since=since, until=until)
+        alerts = await async_crud.get_kpi_alerts(db, since=since, until=until)
+    kpi_engine.load(scan_counts, alerts)
+
+
+async def load_leaderboard():
+    """Rebuilds the leaderboard from every user's points."""
+    async with AsyncSessionLocal() as db:
+        scores = await async_crud.get_user_points(db)
+    await asyncio.to_thread(leaderboard.load, scores)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     
     logger.info("Starting up VeriCart AI API...")
+    # Every token issued or checked is signed with it: refuse to boot rather than fail each request.
+    if not settings.JWT_SECRET_KEY:
+        raise RuntimeError("JWT_SECRET_KEY is not configured; set it to sign the users' access tokens.")
+    # The bus is started first, so nothing other workers commit during the loads
+    # is missed. The KPI window adds up what it loads, so it only loads what was
+    # recorded before the subscription; later scans arrive as bus messages. The
+    # leaderboard keeps each user's higher total, so updates received while it
+    # loads are merged, not lost.
+    await message_bus.start()
+    await load_kpi_window(until=datetime.now(timezone.utc))
+    await load_leaderboard()
+    kpi_push = asyncio.create_task(kpi_engine.push_periodically(manager, settings.KPI_PUSH_INTERVAL_SECONDS))
+    background_tasks = [kpi_push]
+    if settings.REWARDS_MODE == "deferred" and settings.REWARDS_WORKER == "local":
+        background_tasks.append(asyncio.create_task(
+            gamification_service.apply_rewards_periodically(settings.REWARDS_FLUSH_INTERVAL_SECONDS)
+        ))
     
     yield
     
     logger.info("Shutting down VeriCart AI API...")
+    for task in background_tasks:
+        task.cancel()
+    vision_service.close()
+    await message_bus.stop()
 
 
 models.Base.metadata.create_all(bind=engine, checkfirst=True)
@@ -42,6 +96,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -53,6 +108,7 @@ app.include_router(users.router)
 app.include_router(suppliers.router)
 app.include_router(educational.router)
 app.include_router(analytics.router)
+app.include_router(gamification.router)
 
 
 
@@ -78,4 +134,41 @@ async def websocket_endpoint(websocket: WebSocket):
 async def root():
     """ A simple health check endpoint to confirm the API is running. """
     return {"message": "VeriCart AI API is running!"}
+
+
+@app.get("/metrics/inference", tags=["General"])
+async def inference_metrics():
+    """ Queue depth and batch size metrics of the fraud model's inference batcher. """
+    return inference_batcher.stats()
+
+
+@app.get("/metrics/vision", tags=["General"])
+async def vision_metrics():
+    """ Batch size and per-stage latency metrics of the image verification service. """
+    return vision_service.stats()
+
+
+@app.get("/metrics/websocket", tags=["General"])
+async def websocket_metrics():
+    """ Connection and outbound queue metrics of this worker's dashboard WebSockets. """
+    return manager.stats()
+
+
+@app.get("/metrics/bus", tags=["General"])
+async def message_bus_metrics():
+    """ Per-channel delivery counts and publish-to-delivery latency in this worker. """
+    return message_bus.stats()
+
+
+@app.get("/metrics/cache", tags=["General"])
+async def cache_metrics():
+    """ Size, hit/miss and eviction counters of this worker's in-memory caches. """
+    return {
+        "product_catalog": catalog_cache.stats(),
+        "provenance": provenance_cache.stats(),
+        "analytics_metrics": metrics_cache.stats(),
+        "badges": badge_cache.stats(),
+        "users": user_cache.stats(),
+        "image_results": image_result_cache.stats(),
+    }
     
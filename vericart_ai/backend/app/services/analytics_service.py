@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
 from datetime import date, timedelta
+from typing import List
+from celery import group
 from app.db import crud, models, database
 from app.core.celery_app import celery
 
@@ -7,31 +9,34 @@ from app.core.celery_app import celery
 AVERAGE_PRODUCT_VALUE = 50.0 
 AVERAGE_RETURN_HANDLING_COST = 15.0 
 
+# Days recomputed by a single backfill task.
+BACKFILL_CHUNK_DAYS = 31
+
 def calculate_metrics_for_day(db: Session, target_date: date):
     """Calculates all business metrics for a given day."""
-    start_datetime = target_date
-    end_datetime = start_datetime + timedelta(days=1)
+    return calculate_metrics_for_range(db, target_date, target_date)[0]
 
-    
-    anomaly_alerts_count = db.query(models.Alert).filter(
-        models.Alert.timestamp >= start_datetime,
-        models.Alert.timestamp < end_datetime
-    ).count()
+
+def calculate_metrics_for_range(db: Session, start_date: date, end_date: date) -> List[dict]:
+    """
+    Calculates the business metrics of every day in [start_date, end_date], in date order,
+    from a single grouped query over the scans and alerts of the whole range.
+    """
+    counts = crud.get_daily_activity_counts(db, start_date, end_date)
+    days = (end_date - start_date).days + 1
+    return [
+        _build_metrics(day, *counts.get(day, (0, 0, 0)))
+        for day in (start_date + timedelta(days=offset) for offset in range(days))
+    ]
+
+
+def _build_metrics(target_date: date, anomaly_alerts_count: int, total_scans: int, authentic_scans: int) -> dict:
     losses_prevented = anomaly_alerts_count * AVERAGE_PRODUCT_VALUE
 
     
     returns_reduction_index = anomaly_alerts_count * AVERAGE_RETURN_HANDLING_COST
 
     
-    total_scans = db.query(models.Scan).filter(
-        models.Scan.timestamp >= start_datetime,
-        models.Scan.timestamp < end_datetime
-    ).count()
-    authentic_scans = db.query(models.Scan).filter(
-        models.Scan.timestamp >= start_datetime,
-        models.Scan.timestamp < end_datetime,
-        models.Scan.is_authentic == True
-    ).count()
     trust_score = (authentic_scans / total_scans) * 100 if total_scans > 0 else 100.0
 
    
@@ -50,6 +55,55 @@ def calculate_metrics_for_day(db: Session, target_date: date):
     return metrics
 
 
+@celery.task
+def run_product_scan_stats_reconciliation():
+    """Celery task to rebuild the per-product scan counters from the scans table."""
+    print("Celery Worker: Reconciling product scan counters...")
+    db = database.SessionLocal()
+    try:
+        products_counted = crud.rebuild_product_scan_stats(db)
+        print(f"Successfully rebuilt scan counters for {products_counted} products")
+    finally:
+        db.close()
+
+
+def backfill_metrics(db: Session, start_date: date, end_date: date) -> int:
+    """Recomputes and bulk upserts the snapshots of every day in [start_date, end_date]."""
+    return crud.upsert_metric_snapshots(db, calculate_metrics_for_range(db, start_date, end_date))
+
+
+def split_date_range(start_date: date, end_date: date, chunk_days: int = BACKFILL_CHUNK_DAYS):
+    """Yields consecutive (start, end) date ranges of at most `chunk_days` days covering [start_date, end_date]."""
+    while start_date <= end_date:
+        chunk_end = min(start_date + timedelta(days=chunk_days - 1), end_date)
+        yield start_date, chunk_end
+        start_date = chunk_end + timedelta(days=1)
+
+
+@celery.task
+def run_metrics_backfill_chunk(start_date: str, end_date: str):
+    """Celery task recomputing the metric snapshots of one chunk of a backfill (ISO dates, inclusive)."""
+    db = database.SessionLocal()
+    try:
+        written = backfill_metrics(db, date.fromisoformat(start_date), date.fromisoformat(end_date))
+        print(f"Successfully backfilled metrics from {start_date} to {end_date} ({written} days)")
+        return written
+    finally:
+        db.close()
+
+
+@celery.task
+def run_metrics_backfill(start_date: str, end_date: str, chunk_days: int = BACKFILL_CHUNK_DAYS):
+    """
+    Celery task recomputing the metric snapshots of a date range (ISO dates, inclusive).
+    The range is split into chunks that are recomputed in parallel by the workers.
+    """
+    chunks = list(split_date_range(date.fromisoformat(start_date), date.fromisoformat(end_date), chunk_days))
+    print(f"Celery Worker: Backfilling metrics from {start_date} to {end_date} in {len(chunks)} chunks...")
+    group(run_metrics_backfill_chunk.s(start.isoformat(), end.isoformat()) for start, end in chunks).apply_async()
+    return len(chunks)
+
+
 @celery.task
 def run_daily_metrics_calculation():
     """Celery task to calculate and save the previous day's metrics."""
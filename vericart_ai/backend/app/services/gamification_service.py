@@ -1,10 +1,18 @@
 # backend/app/services/gamification_service.py
 
+import asyncio
+import logging
+
 from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Callable, Any
+from typing import Optional, List, Dict, Callable, Any, Set, Tuple
 
-from app.db import crud, models
+from app.db import crud, models, database
 from app.core import schemas
+from app.core.celery_app import celery
+from app.core.config import settings
+from app.core.user_cache import CachedUser
+
+logger = logging.getLogger(__name__)
 
 # ===================================================================
 # Configuration Constants
@@ -17,16 +25,19 @@ POINTS_PER_AUTHENTIC_SCAN = 10
 # Badge Eligibility Logic
 # This data-driven approach makes adding new badges easy. You just
 # need to add a new checker function and an entry to this list.
+# Checkers only read the user's maintained counters (`scan_count`,
+# `points`), never their history, so they cost no queries.
 # ===================================================================
 
 def _check_for_first_scan_badge(user: models.User, **kwargs) -> bool:
-    """Checks if the user has made exactly one scan."""
-    # We check len of point_transactions as it's the definitive record of rewarded scans.
-    return len(user.point_transactions) == 1
+    """Checks if the user has made at least one scan."""
+    # scan_count counts the point transactions, the definitive record of rewarded scans.
+    # A deferred batch can take a user past their first scan at once, hence not `== 1`.
+    return user.scan_count >= 1
 
 def _check_for_ten_scans_badge(user: models.User, **kwargs) -> bool:
     """Checks if the user has made 10 or more scans."""
-    return len(user.point_transactions) >= 10
+    return user.scan_count >= 10
 
 def _check_for_super_scanner_badge(user: models.User, **kwargs) -> bool:
     """Checks if the user has reached 500 total points."""
@@ -53,33 +64,35 @@ BADGE_DEFINITIONS: List[Dict[str, Any]] = [
 # Main Service Functions
 # ===================================================================
 
-def _check_and_grant_badges(db: Session, user: models.User):
+def _check_and_grant_badges(db: Session, user: models.User, earned_badge_ids: Optional[Set[int]] = None):
     """
     Internal helper to iterate through badge rules and award any that are earned.
-    This is designed to be efficient by minimizing DB queries.
+    Costs at most one query (the user's earned badges, only when a rule passes
+    and they were not preloaded) plus one insert per new badge, however long
+    the user's history is.
     """
-    # Get a set of badge names the user has already earned for quick lookups.
-    earned_badge_names = {user_badge.badge.name for user_badge in user.badges}
-
-    for badge_def in BADGE_DEFINITIONS:
-        badge_name = badge_def["name"]
-        
-        # Optimization: If user already has this badge, skip all checks.
-        if badge_name in earned_badge_names:
-            continue
-
-        # Run the specific checker function for this badge.
-        if badge_def["checker"](user=user):
-            # If eligible, fetch the master badge from the DB.
-            badge_to_award = crud.get_badge_by_name(db, name=badge_name)
-            
-            # Award the badge if it exists in the database.
-            if badge_to_award:
-                crud.award_badge_to_user(db, user=user, badge=badge_to_award)
-                # Note: The commit is handled by the calling function.
-
-
-def process_scan_for_rewards(db: Session, user: models.User, scan: models.Scan) -> Optional[schemas.ScanReward]:
+    # Run the checker functions first: they only read the user's counters.
+    eligible = [badge_def["name"] for badge_def in BADGE_DEFINITIONS if badge_def["checker"](user=user)]
+    if not eligible:
+        return
+
+    # Master badges come from the in-memory badge cache.
+    master_badges = crud.get_cached_badges(db)
+    # Get the set of badge IDs the user has already earned for quick lookups.
+    if earned_badge_ids is None:
+        earned_badge_ids = crud.get_user_badge_ids(db, user_id=user.id)
+
+    for badge_name in eligible:
+        badge_to_award = master_badges.get(badge_name)
+
+        # Award the badge if it exists in the database and the user doesn't have it yet.
+        if badge_to_award and badge_to_award.id not in earned_badge_ids:
+            crud.award_badge_to_user(db, user=user, badge_id=badge_to_award.id)
+            earned_badge_ids.add(badge_to_award.id)
+            # Note: The commit is handled by the calling function.
+
+
+def process_scan_for_rewards(db: Session, user: CachedUser, scan: models.Scan) -> Optional[schemas.ScanReward]:
     """
     The main entry point for the gamification service.
     
@@ -92,7 +105,7 @@ def process_scan_for_rewards(db: Session, user: models.User, scan: models.Scan)
     within the same transaction as the scan creation to ensure atomicity.
     """
     # Step 1: Award points for the current scan.
-    crud.create_point_transaction(
+    user = crud.create_point_transaction(
         db=db,
         user=user,
         scan=scan,
@@ -100,14 +113,113 @@ def process_scan_for_rewards(db: Session, user: models.User, scan: models.Scan)
     )
     
     # Step 2: Check for any new badges the user may have earned.
-    # The user object is now updated with the new points and transaction count in the session.
+    # The returned snapshot carries the user's new points and scan count.
     _check_and_grant_badges(db=db, user=user)
     
     # Step 3: Prepare the reward information for the API response.
+    return _build_scan_reward()
+
+
+def process_scans_for_rewards(db: Session, rewards: List[Tuple[CachedUser, models.Scan]]) -> List[schemas.ScanReward]:
+    """
+    Batch version of `process_scan_for_rewards` for (user, scan) pairs, as for a
+    burst of NFC scans: one counter update for all the users and one query for
+    their earned badges, then the badge checks against each user's final counters.
+    Returns one reward per pair.
+
+    IMPORTANT: This function does NOT commit the session either.
+    """
+    if not rewards:
+        return []
+    users = crud.create_point_transactions(db, rewards, points_to_award=POINTS_PER_AUTHENTIC_SCAN)
+    earned_badge_ids = crud.get_user_badge_ids_by_user(db, list(users))
+    for user in users.values():
+        _check_and_grant_badges(db=db, user=user, earned_badge_ids=earned_badge_ids[user.id])
+    return [_build_scan_reward() for _ in rewards]
+
+
+def _build_scan_reward() -> schemas.ScanReward:
     reward_message = f"Authenticity confirmed! You earned {POINTS_PER_AUTHENTIC_SCAN} points."
-    reward = schemas.ScanReward(
+    return schemas.ScanReward(
         points_awarded=POINTS_PER_AUTHENTIC_SCAN,
         message=reward_message
     )
-    
-    return reward
\ No newline at end of file
+
+
+# ===================================================================
+# Deferred Rewards (REWARDS_MODE="deferred")
+# The scan's transaction only records a reward intent; points and
+# badges are applied in batches, off the response path, so hot users
+# are not row-locked by every one of their scans.
+# ===================================================================
+
+def defer_scan_rewards(db: Session, user: CachedUser, scan: models.Scan) -> schemas.ScanReward:
+    """
+    Deferred counterpart of `process_scan_for_rewards`: records a reward intent
+    and returns the provisional reward for the API response. The points and
+    badges are applied later by `apply_pending_rewards`.
+
+    IMPORTANT: This function does NOT commit the session either.
+    """
+    crud.create_reward_intent(db, user=user, scan=scan, points=POINTS_PER_AUTHENTIC_SCAN)
+    return _build_scan_reward()
+
+
+def defer_scans_rewards(db: Session, rewards: List[Tuple[CachedUser, models.Scan]]) -> List[schemas.ScanReward]:
+    """Batch version of `defer_scan_rewards` for (user, scan) pairs."""
+    return [defer_scan_rewards(db, user=user, scan=scan) for user, scan in rewards]
+
+
+def apply_pending_rewards(db: Session, batch_size: int) -> int:
+    """
+    Applies up to `batch_size` pending reward intents in one transaction: one
+    ledger insert and one atomic counter update for all their users, then the badge checks against
+    the users' final counters with their earned badges preloaded.
+    Returns the number of intents applied.
+    """
+    intents = crud.claim_reward_intents(db, limit=batch_size)
+    if not intents:
+        db.rollback()
+        return 0
+
+    users = crud.apply_reward_intents(db, intents)
+    earned_badge_ids = crud.get_user_badge_ids_by_user(db, list(users))
+    for user in users.values():
+        _check_and_grant_badges(db=db, user=user, earned_badge_ids=earned_badge_ids[user.id])
+    db.commit()
+    return len(intents)
+
+
+def apply_all_pending_rewards(batch_size: int = settings.REWARDS_BATCH_SIZE) -> int:
+    """Applies every pending reward intent, `batch_size` at a time. Returns the number applied."""
+    db = database.SessionLocal()
+    try:
+        applied = 0
+        while True:
+            count = apply_pending_rewards(db, batch_size)
+            applied += count
+            if count < batch_size:
+                return applied
+    finally:
+        db.close()
+
+
+@celery.task
+def run_deferred_rewards():
+    """Celery task applying the pending reward intents (REWARDS_WORKER="celery")."""
+    applied = apply_all_pending_rewards()
+    if applied:
+        print(f"Celery Worker: Applied {applied} deferred rewards")
+
+
+async def apply_rewards_periodically(interval_seconds: float):
+    """
+    In-process stand-in for the Celery task (REWARDS_WORKER="local"), for tests and
+    single-process deployments: applies the pending rewards every `interval_seconds`.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(apply_all_pending_rewards)
+        except Exception as e:
+            logger.error(f"Failed to apply deferred rewards: {e!r}")
\ No newline at end of file
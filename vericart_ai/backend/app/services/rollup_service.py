@@ -0,0 +1,142 @@
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from celery import group
+from app.db import crud, database
+from app.core.celery_app import celery
+from app.core.config import settings
+from app.services.analytics_service import BACKFILL_CHUNK_DAYS, split_date_range
+
+
+RESOLUTIONS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+DIMENSIONS = ("all", "product", "category", "supplier")
+# Name of the incremental job's watermark in `rollup_watermarks`.
+MINUTE_ROLLUP_WATERMARK = "scan_rollups:minute"
+
+
+def floor_to(moment: datetime, resolution: str) -> datetime:
+    """Start of the UTC minute, hour or day containing `moment`."""
+    moment = moment.astimezone(timezone.utc)
+    if resolution == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if resolution == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_from_scans(db: Session, resolution: str, start: datetime, end: datetime) -> int:
+    """
+    Recomputes the `resolution` rollups of [start, end) from the raw scans, for every dimension.
+    `start` and `end` must be bucket boundaries. Returns the number of rollup rows written.
+    """
+    totals: Dict[Tuple[datetime, str, str], List[int]] = defaultdict(lambda: [0, 0, 0])
+    for bucket, product_id_str, category, supplier_id, scans, authentic, alerts in crud.get_scan_counts_by_bucket(db, resolution, start, end):
+        for dimension, key in (("all", ""), ("product", product_id_str), ("category", category or ""), ("supplier", str(supplier_id))):
+            counts = totals[(bucket, dimension, key)]
+            counts[0] += scans
+            counts[1] += authentic or 0
+            counts[2] += alerts
+
+    rows = [(resolution, bucket, dimension, key, *counts) for (bucket, dimension, key), counts in totals.items()]
+    crud.upsert_scan_rollups(db, rows)
+    return len(rows)
+
+
+def rollup_from_rollups(db: Session, source_resolution: str, target_resolution: str, start: datetime, end: datetime) -> int:
+    """Recomputes the `target_resolution` rollups of [start, end) by summing the finer `source_resolution` ones."""
+    rows = [
+        (target_resolution, bucket, dimension, key, scans, authentic, alerts)
+        for bucket, dimension, key, scans, authentic, alerts
+        in crud.get_rollup_sums_by_bucket(db, source_resolution, target_resolution, start, end)
+    ]
+    crud.upsert_scan_rollups(db, rows)
+    return len(rows)
+
+
+def update_rollups(db: Session, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    Incremental run: rolls the minutes closed since the last run up from the scans, then
+    re-sums the hours and days they belong to from the finer rollups, and prunes the minute
+    and hour rollups past their retention. Everything is committed at once.
+
+    Minutes are only rolled up ROLLUP_LAG_SECONDS after they end, so that scans committed
+    late still land in their bucket. Where the previous run stopped is kept as a watermark,
+    so quiet minutes are not re-read. Returns the [start, end) range of minutes processed.
+    """
+    now = now or datetime.now(timezone.utc)
+    end = floor_to(now - timedelta(seconds=settings.ROLLUP_LAG_SECONDS), "minute")
+    minute_retention = timedelta(days=settings.ROLLUP_MINUTE_RETENTION_DAYS)
+    # Before the first run with a watermark, rollups written earlier tell how far scans were processed.
+    processed_until = crud.get_rollup_watermark(db, MINUTE_ROLLUP_WATERMARK) or crud.get_latest_rollup_bucket(db, "minute")
+    # The last processed minute is redone as well: it may have been rolled up before its last scans committed.
+    start = processed_until - timedelta(minutes=1) if processed_until else end - timedelta(minutes=1)
+    start = max(start, end - minute_retention)
+
+    if start < end:
+        rollup_from_scans(db, "minute", start, end)
+        rollup_from_rollups(db, "minute", "hour", floor_to(start, "hour"), end)
+        rollup_from_rollups(db, "hour", "day", floor_to(start, "day"), end)
+    if processed_until is None or end > processed_until:
+        crud.set_rollup_watermark(db, MINUTE_ROLLUP_WATERMARK, end)
+
+    crud.delete_scan_rollups_before(db, "minute", floor_to(now - minute_retention, "minute"))
+    crud.delete_scan_rollups_before(db, "hour", floor_to(now - timedelta(days=settings.ROLLUP_HOUR_RETENTION_DAYS), "hour"))
+    db.commit()
+    return start, end
+
+
+def rebuild_rollups(db: Session, start_date: date, end_date: date) -> int:
+    """
+    Backfill: recomputes the day rollups of every day in [start_date, end_date] from the raw
+    scans, plus the hour and minute rollups of the days still within their retention.
+    """
+    start = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+    end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    today = floor_to(datetime.now(timezone.utc), "day")
+    written = rollup_from_scans(db, "day", start, end)
+    for resolution, retention_days in (("hour", settings.ROLLUP_HOUR_RETENTION_DAYS), ("minute", settings.ROLLUP_MINUTE_RETENTION_DAYS)):
+        resolution_start = max(start, today - timedelta(days=retention_days))
+        if resolution_start < end:
+            written += rollup_from_scans(db, resolution, resolution_start, end)
+    db.commit()
+    return written
+
+
+@celery.task
+def run_scan_rollups():
+    """Celery task rolling up the scans of the minutes closed since the previous run."""
+    db = database.SessionLocal()
+    try:
+        start, end = update_rollups(db)
+        print(f"Successfully rolled up scans from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}")
+    finally:
+        db.close()
+
+
+@celery.task
+def run_scan_rollup_backfill_chunk(start_date: str, end_date: str):
+    """Celery task rebuilding the rollups of one chunk of a backfill (ISO dates, inclusive)."""
+    db = database.SessionLocal()
+    try:
+        written = rebuild_rollups(db, date.fromisoformat(start_date), date.fromisoformat(end_date))
+        print(f"Successfully rebuilt scan rollups from {start_date} to {end_date} ({written} rows)")
+        return written
+    finally:
+        db.close()
+
+
+@celery.task
+def run_scan_rollup_backfill(start_date: str, end_date: str, chunk_days: int = BACKFILL_CHUNK_DAYS):
+    """
+    Celery task rebuilding the scan rollups of a date range (ISO dates, inclusive), e.g. to
+    populate them from existing history. Chunks are rebuilt in parallel by the workers.
+    """
+    chunks = list(split_date_range(date.fromisoformat(start_date), date.fromisoformat(end_date), chunk_days))
+    print(f"Celery Worker: Rebuilding scan rollups from {start_date} to {end_date} in {len(chunks)} chunks...")
+    group(run_scan_rollup_backfill_chunk.s(start.isoformat(), end.isoformat()) for start, end in chunks).apply_async()
+    return len(chunks)
@@ -87,38 +87,54 @@ def process_new_scan(db: Session, request_data: schemas.VerificationRequest):
     return new_scan, alert'''
 # backend/app/services/scan_processor.py
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
 from haversine import haversine, Unit
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import logging
 import asyncio
 import json
-from app.db import models, crud
+from app.db import models, crud, async_crud
 from app.core import schemas
-from app.core.model_handler import model_handler
-from app.core.websocket_manager import manager
+from app.core.config import settings
+from app.core.kpi_engine import kpi_engine
+from app.core.model_handler import inference_batcher, model_handler
+from app.core.product_state import ProductState, product_state_store
+from app.core.user_cache import CachedUser
+from app.core.websocket_manager import encode_frame, manager
 from app.services import gamification_service
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371.0088 # Same mean radius as the `haversine` package
+
+
+def _haversine_km(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Element-wise great-circle distance in kilometers between two sets of coordinates."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
 class ScanProcessor:
     """
     A service class encapsulating all business logic for processing a product scan.
     This structure is more scalable and testable than a standalone function.
+
+    It works on an AsyncSession so that no query or commit blocks the event loop;
+    the synchronous gamification service is run through `AsyncSession.run_sync`.
     """
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def _engineer_features(self, request_data: schemas.NFCVerificationRequest, product_id: str) -> dict:
+    async def _engineer_features(self, request_data: schemas.NFCVerificationRequest, product_id: int) -> dict:
         """Helper method to create features for the ML model."""
-        previous_scan = self.db.query(models.Scan).filter(
-            models.Scan.product_id == product_id,
-            models.Scan.is_authentic == True
-        ).order_by(models.Scan.timestamp.desc()).first()
+        previous_scan = await product_state_store.get(self.db, product_id=product_id)
 
         scan_order = (previous_scan.scan_order + 1) if previous_scan else 1
         features = {'latitude': request_data.latitude,
-        'longitude': request_data.longitude,'time_diff_seconds': 0, 'distance_km': 0, 'speed_kmh': 0}
+        'longitude': request_data.longitude,'time_diff_seconds': 0, 'distance_km': 0, 'speed_kmh': 0,
+        'scan_order': scan_order}
 
         if previous_scan:
             time_diff = (datetime.now(timezone.utc) - previous_scan.timestamp).total_seconds()
@@ -134,48 +150,16 @@ class ScanProcessor:
         
         return features
 
-    async def process_scan(self, request_data: schemas.NFCVerificationRequest) -> dict:
+    async def process_scan(self, request_data: schemas.NFCVerificationRequest, include_provenance: bool = False) -> dict:
         """
         Asynchronously processes a scan, runs it through the AI, updates the DB,
         and broadcasts alerts if necessary.
+        The product's journey is only attached to authentic results when `include_provenance` is set.
         """
-        def create_product_schema(db_product: models.Product) -> schemas.Product:
-    # First, handle the nested supplier object correctly
-                supplier_schema = None
-                if db_product.supplier:
-                    # Use from_orm for the non-conflicted Supplier model
-                    supplier_schema = schemas.Supplier.from_orm(db_product.supplier)
-                
-                # Now, manually and explicitly build the Product schema
-                return schemas.Product(
-                    id=db_product.product_id_str,  # Source: the string ID from the DB
-                    name=db_product.name,
-                    category=db_product.category,
-                    supplier=supplier_schema
-                )
-        def create_alert_schema(db_alert: models.Alert) -> schemas.Alert:
-                """Manually and explicitly builds a Pydantic Alert from a DB model."""
-    # 1. Manually handle the conflicted nested 'product' object by calling our helper.
-                product_schema = create_product_schema(db_alert.product)
-                
-                # 2. Manually build the top-level Alert schema.
-                return schemas.Alert(
-                    id=db_alert.id,
-                    timestamp=db_alert.timestamp,
-                    alert_type=db_alert.alert_type,
-                    message=db_alert.message,
-                    risk_score=db_alert.risk_score,
-                    status=db_alert.status,
-                    product=product_schema  # Use the safely-built product schema
-                )
         # product = self.db.query(models.Product).filter(
             # models.Product.product_id_str == request_data.product_id
         # ).first()
-        product = self.db.query(models.Product).options(
-            joinedload(models.Product.supplier)
-        ).filter(
-            models.Product.product_id_str == request_data.product_id
-        ).first()
+        product = await async_crud.get_cached_product(self.db, product_id_str=request_data.product_id)
 
         if not product:
             logger.warning(f"Scan attempt for non-existent product ID: {request_data.product_id}")
@@ -185,13 +169,13 @@ class ScanProcessor:
         # NOTE: Your NFCVerificationRequest has user_id as an int, but your User model uses a string walmart_customer_id.
         # We will assume the request should contain the string ID for this to work with your existing `crud.get_user_by_walmart_id`.
         if request_data.user_id:
-            user = crud.get_user_by_walmart_id(self.db, walmart_id=request_data.user_id)
+            user = await async_crud.get_cached_user(self.db, walmart_id=request_data.user_id)
             if not user:
                 logger.warning(f"Scan processed for a user ID that does not exist: {request_data.user_id}")
 
         # 1. Engineer features and get AI prediction
-        features = self._engineer_features(request_data, product.id)
-        is_anomaly = model_handler.predict_anomaly(features)
+        features = await self._engineer_features(request_data, product.id)
+        is_anomaly = await inference_batcher.predict_anomaly(features)
         
         # 2. Create the new Scan record
         new_scan = models.Scan(
@@ -199,19 +183,19 @@ class ScanProcessor:
             latitude=request_data.latitude,
             longitude=request_data.longitude,
             is_authentic=(not is_anomaly), # Set authenticity based on prediction
+            scan_order=features['scan_order'],
+            timestamp=datetime.now(timezone.utc),
             user_id=user.walmart_customer_id if user else None
             # user_id can be added here if available in request_data
         )
         self.db.add(new_scan)
+        # Keep the product's verification counters in step with its scans, in the same transaction.
+        await async_crud.increment_product_scan_stats(self.db, {product.id: (1, 0 if is_anomaly else 1)})
         
         
         # 3. If it's an anomaly, create a corresponding Alert
         if is_anomaly:
-            speed = features.get('speed_kmh', 0)
-            alert_type = "Velocity" if speed > 900 else "Geographic"
-            
-            # More robust risk scoring
-            risk_score = min(99, int((speed / 1200) * 100)) if speed > 100 else 20
+            alert_type, risk_score = self._classify_anomaly(features.get('speed_kmh', 0))
             
             new_alert = models.Alert(
                 product_id=product.id,
@@ -219,25 +203,20 @@ class ScanProcessor:
                 message=f"{alert_type} anomaly detected for {product.name}.",
                 risk_score=risk_score,
                 status="new",
+                timestamp=new_scan.timestamp,
                 triggering_scan=new_scan # This creates the relationship
             )
             self.db.add(new_alert)
             
             # Use a single, transactional commit for all DB changes
-            self.db.commit()
-            self.db.refresh(new_alert) # Refresh to get the ID and defaults
+            await self.db.commit()
+            kpi_engine.publish(scans=1, alerts=[(product.name, new_scan.latitude, new_scan.longitude)])
             
             # 4. Broadcast the new alert to all connected dashboard clients
-            # alert_schema = schemas.Alert.from_orm(new_alert)
-            live_alert = self.db.query(models.Alert).options(
-        joinedload(models.Alert.product).joinedload(models.Product.supplier)
-    ).filter(models.Alert.id == new_alert.id).one()
-            safe_alert_schema = create_alert_schema(live_alert)
-            alert_json_string = safe_alert_schema.model_dump_json(by_alias=True)
-            alert_dict = json.loads(alert_json_string)
-            
-            await manager.broadcast({"type": "new_alert", "payload": alert_dict})
-            product_schema = create_product_schema(product)
+            product_schema = product.to_schema()
+            safe_alert_schema = self._build_alert_schema(new_alert, product_schema)
+            # Serialized once; the same frame is sent to every dashboard.
+            manager.publish(encode_frame("new_alert", safe_alert_schema.model_dump_json(by_alias=True)))
             
             logger.info(f"Anomaly detected and alert created: {new_alert.id}")
             return schemas.VerificationResponse(
@@ -252,14 +231,17 @@ class ScanProcessor:
             if user:
                 # If the scan is authentic and performed by a known user, process rewards.
                 # This happens BEFORE the commit to ensure it's part of the transaction.
-                reward = gamification_service.process_scan_for_rewards(
-                    db=self.db, user=user, scan=new_scan
-                )
+                reward = await self._reward_scan(user, new_scan)
             # Commit the legitimate scan
-            self.db.commit()
-            provenance_entries = crud.get_provenance_for_product(self.db, product_id_str=product.product_id_str)
+            await self.db.commit()
+            kpi_engine.publish(scans=1, alerts=[])
+            # It is now the reference point for this product's next scan.
+            product_state_store.scans_committed({product.id: product_state_store.state_from_scan(new_scan)})
+            provenance_entries = []
+            if include_provenance:
+                provenance_entries = await async_crud.get_cached_provenance(self.db, product_id=product.id)
             logger.info(f"Legitimate scan processed for product ID: {product.product_id_str}")
-            product_schema = create_product_schema(product)
+            product_schema = product.to_schema()
 
             return schemas.VerificationResponse(
         status="Verified Authentic",
@@ -270,4 +252,222 @@ class ScanProcessor:
     )
 # SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
             # return {"status": "Verified Authentic", "message": "Product authenticity confirmed.", "product": product, "provenance": provenance_entries}
-        
\ No newline at end of file
+
+    def _engineer_batch_features(self, requests: List[schemas.NFCVerificationRequest], previous_states: List[Optional[ProductState]], scanned_at: datetime) -> List[dict]:
+        """
+        Vectorized version of `_engineer_features` for a whole batch of scans.
+        Every scan is compared with the given previous state of its product.
+        """
+        n = len(requests)
+        latitudes = np.fromiter((r.latitude for r in requests), dtype=np.float64, count=n)
+        longitudes = np.fromiter((r.longitude for r in requests), dtype=np.float64, count=n)
+        has_previous = np.fromiter((s is not None for s in previous_states), dtype=bool, count=n)
+        prev_latitudes = np.fromiter((s.latitude if s else 0.0 for s in previous_states), dtype=np.float64, count=n)
+        prev_longitudes = np.fromiter((s.longitude if s else 0.0 for s in previous_states), dtype=np.float64, count=n)
+        time_diffs = np.fromiter(
+            ((scanned_at - s.timestamp).total_seconds() if s else 0.0 for s in previous_states),
+            dtype=np.float64, count=n
+        )
+
+        distances = _haversine_km(prev_latitudes, prev_longitudes, latitudes, longitudes)
+        # Mirrors the single-scan path: a non-positive time difference means an "instant" jump.
+        with np.errstate(divide='ignore'):
+            time_diff_hours = np.where(time_diffs > 0, time_diffs / 3600.0, np.inf)
+            speeds = distances / time_diff_hours
+
+        time_diffs = np.where(has_previous, time_diffs, 0.0)
+        distances = np.where(has_previous, distances, 0.0)
+        speeds = np.where(has_previous, speeds, 0.0)
+
+        return [
+            {
+                'latitude': requests[i].latitude,
+                'longitude': requests[i].longitude,
+                'time_diff_seconds': float(time_diffs[i]),
+                'distance_km': float(distances[i]),
+                'speed_kmh': float(speeds[i]),
+                'scan_order': (previous_states[i].scan_order + 1) if previous_states[i] else 1
+            }
+            for i in range(n)
+        ]
+
+    async def _reward_scan(self, user: CachedUser, scan: models.Scan) -> schemas.ScanReward:
+        """
+        Rewards an authentic scan within the scan's transaction: inline, or only as a
+        reward intent applied later when REWARDS_MODE is "deferred".
+        """
+        if settings.REWARDS_MODE == "deferred":
+            reward_scan = gamification_service.defer_scan_rewards
+        else:
+            reward_scan = gamification_service.process_scan_for_rewards
+        return await self.db.run_sync(lambda session: reward_scan(db=session, user=user, scan=scan))
+
+    async def _reward_scans(self, rewards: List[Tuple[CachedUser, models.Scan]]) -> List[schemas.ScanReward]:
+        """Batch version of `_reward_scan` for (user, scan) pairs, in a single pass over the session."""
+        if settings.REWARDS_MODE == "deferred":
+            reward_scans = gamification_service.defer_scans_rewards
+        else:
+            reward_scans = gamification_service.process_scans_for_rewards
+        return await self.db.run_sync(lambda session: reward_scans(db=session, rewards=rewards))
+
+    @staticmethod
+    def _build_alert_schema(db_alert: models.Alert, product_schema: schemas.Product) -> schemas.Alert:
+        """Builds the Pydantic Alert for a new alert without touching its (unloaded) product relationship."""
+        return schemas.Alert(
+            id=db_alert.id,
+            timestamp=db_alert.timestamp,
+            alert_type=db_alert.alert_type,
+            message=db_alert.message,
+            risk_score=db_alert.risk_score,
+            status=db_alert.status,
+            product=product_schema
+        )
+
+    @staticmethod
+    def _classify_anomaly(speed: float):
+        """Returns the alert type and risk score for an anomalous scan."""
+        alert_type = "Velocity" if speed > 900 else "Geographic"
+        risk_score = min(99, int((speed / 1200) * 100)) if speed > 100 else 20
+        return alert_type, risk_score
+
+    async def process_scan_batch(self, requests: List[schemas.NFCVerificationRequest], include_provenance: bool = False) -> List[schemas.VerificationResponse]:
+        """
+        Processes a burst of scans with a fixed number of queries (plus one insert per
+        newly earned badge), returning one response per request, in request order.
+
+        Scans of the same product within one batch are chained in request order, as
+        if they had been sent one by one: each is compared with the product's last
+        authentic scan before it, which may be an earlier scan of the batch. The model
+        is called once per round of scans (a round holding each product's k-th scan
+        of the batch), so just once unless a product is scanned several times.
+        """
+        if not requests:
+            return []
+
+        products = await async_crud.get_cached_products(self.db, [r.product_id for r in requests])
+        users = await async_crud.get_cached_users(self.db, [r.user_id for r in requests if r.user_id])
+
+        responses: List[Optional[schemas.VerificationResponse]] = [None] * len(requests)
+        known = []
+        for index, request_data in enumerate(requests):
+            if request_data.product_id in products:
+                known.append(index)
+            else:
+                logger.warning(f"Scan attempt for non-existent product ID: {request_data.product_id}")
+                responses[index] = schemas.VerificationResponse(
+                    status="Verification Failed", message="Product ID not found.", product=None
+                )
+
+        if not known:
+            return responses
+
+        scanned_at = datetime.now(timezone.utc)
+        known_requests = [requests[i] for i in known]
+        known_products = [products[r.product_id] for r in known_requests]
+        states = await product_state_store.get_many(self.db, [p.id for p in known_products])
+
+        rounds: List[List[int]] = []
+        scans_per_product: Dict[int, int] = {}
+        for position, product in enumerate(known_products):
+            round_index = scans_per_product.get(product.id, 0)
+            scans_per_product[product.id] = round_index + 1
+            if round_index == len(rounds):
+                rounds.append([])
+            rounds[round_index].append(position)
+
+        features: List[dict] = [None] * len(known)
+        anomalies: List[bool] = [None] * len(known)
+        for positions in rounds:
+            round_features = self._engineer_batch_features(
+                [known_requests[p] for p in positions], [states[known_products[p].id] for p in positions], scanned_at
+            )
+            for position, scan_features, is_anomaly in zip(positions, round_features, model_handler.predict_anomalies(round_features)):
+                features[position] = scan_features
+                anomalies[position] = is_anomaly
+                if not is_anomaly:
+                    # The reference point of the product's next scan in the batch.
+                    states[known_products[position].id] = ProductState(
+                        scan_features['latitude'], scan_features['longitude'], scanned_at, scan_features['scan_order']
+                    )
+
+        new_alerts = []
+        authentic = []
+        to_reward = []
+        for index, request_data, product, scan_features, is_anomaly in zip(known, known_requests, known_products, features, anomalies):
+            user = users.get(request_data.user_id) if request_data.user_id else None
+            new_scan = models.Scan(
+                product_id=product.id,
+                latitude=request_data.latitude,
+                longitude=request_data.longitude,
+                is_authentic=(not is_anomaly),
+                scan_order=scan_features['scan_order'],
+                timestamp=scanned_at,
+                user_id=user.walmart_customer_id if user else None
+            )
+            self.db.add(new_scan)
+
+            if is_anomaly:
+                alert_type, risk_score = self._classify_anomaly(scan_features['speed_kmh'])
+                new_alert = models.Alert(
+                    product_id=product.id,
+                    alert_type=alert_type,
+                    message=f"{alert_type} anomaly detected for {product.name}.",
+                    risk_score=risk_score,
+                    status="new",
+                    timestamp=scanned_at,
+                    triggering_scan=new_scan
+                )
+                self.db.add(new_alert)
+                new_alerts.append((index, product, new_alert))
+            else:
+                if user:
+                    to_reward.append((index, user, new_scan))
+                authentic.append((index, product, product_state_store.state_from_scan(new_scan)))
+
+        rewards = dict(zip(
+            [index for index, _, _ in to_reward],
+            await self._reward_scans([(user, new_scan) for _, user, new_scan in to_reward])
+        ))
+
+        scan_stats = {}
+        for product, is_anomaly in zip(known_products, anomalies):
+            total, authentic_count = scan_stats.get(product.id, (0, 0))
+            scan_stats[product.id] = (total + 1, authentic_count + (0 if is_anomaly else 1))
+        await async_crud.increment_product_scan_stats(self.db, scan_stats)
+
+        # A single commit inserts every scan and alert of the batch, with the counters, and assigns the alert IDs.
+        await self.db.commit()
+        kpi_engine.publish(scans=len(known), alerts=[
+            (product.name, requests[index].latitude, requests[index].longitude) for index, product, _ in new_alerts
+        ])
+        alert_schemas = [
+            (index, product, self._build_alert_schema(new_alert, product.to_schema()))
+            for index, product, new_alert in new_alerts
+        ]
+
+        # Later scans of the same product in the batch overwrite earlier ones, as they would sequentially.
+        product_state_store.scans_committed({product.id: new_state for _, product, new_state in authentic})
+
+        for index, product, alert_schema in alert_schemas:
+            manager.publish(encode_frame("new_alert", alert_schema.model_dump_json(by_alias=True)))
+            responses[index] = schemas.VerificationResponse(
+                status="Verification Failed",
+                message=alert_schema.message,
+                product=alert_schema.product,
+                provenance=[]
+            )
+
+        journeys = {}
+        if include_provenance:
+            journeys = await async_crud.get_cached_provenances(self.db, [product.id for _, product, _ in authentic])
+        for index, product, _ in authentic:
+            responses[index] = schemas.VerificationResponse(
+                status="Verified Authentic",
+                message="Product authenticity confirmed.",
+                product=product.to_schema(),
+                provenance=journeys.get(product.id, []),
+                reward=rewards.get(index)
+            )
+
+        logger.info(f"Batch of {len(requests)} scans processed: {len(alert_schemas)} alerts, {len(authentic)} authentic")
+        return responses
@@ -1,70 +1,236 @@
 # backend/app/services/vision_service.py
 
 import io
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
 import numpy as np
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 from fastapi import UploadFile, HTTPException, status
-from app.core.model_handler import model_handler
+from app.core.config import settings
+from app.core.image_cache import ImageResultCache, image_digest, image_result_cache, perceptual_hash
+from app.core.model_handler import ModelHandler, model_handler
+
+logger = logging.getLogger(__name__)
 
 # Configuration constants for the vision model
 IMAGE_SIZE = (224, 224)  # The input size your model expects
 CONFIDENCE_THRESHOLD = 0.85 # Minimum confidence to consider a match
 
-class VisionService:
+
+def preprocess_image(image_bytes: bytes) -> np.ndarray:
     """
-    Handles all logic for product verification via image recognition.
+    Takes raw image bytes, decodes, resizes, and normalizes them for the model.
+    Returns a (224, 224, 3) float32 array. CPU-bound: runs in the preprocessing pool.
     """
+    image = Image.open(io.BytesIO(image_bytes))
+    # JPEG draft mode: the decoder scales the image down by 1/2, 1/4 or 1/8 while
+    # decoding, to the smallest scale still at least IMAGE_SIZE. A no-op for other formats.
+    image.draft("RGB", IMAGE_SIZE)
+    # Resize to the target size required by the model
+    image = image.convert("RGB").resize(IMAGE_SIZE)
+    # Normalize pixel values to the [0, 1] range
+    return np.asarray(image, dtype=np.float32) / 255.0
+
+
+class _LatencyStats:
+    """Count, mean, max and recent 95th percentile of one latency, in milliseconds."""
+    WINDOW = 1000
+
     def __init__(self):
-        self.vision_model = model_handler.vision_model()
-        self.class_names = model_handler.vision_class_names()
-        if not self.vision_model or not self.class_names:
-            raise RuntimeError("Vision model or class names not loaded properly.")
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._recent = deque(maxlen=self.WINDOW)
 
-    def _preprocess_image(self, image_bytes: bytes) -> np.ndarray:
-        """
-        Takes raw image bytes, opens, resizes, and normalizes them for the model.
-        """
-        # Open the image from in-memory bytes
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        # Resize to the target size required by the model
-        image = image.resize(IMAGE_SIZE)
-        # Convert image to a numpy array
-        image_array = np.asarray(image)
-        # Normalize pixel values to the [0, 1] range
-        image_array = image_array / 255.0
-        # Add a batch dimension (e.g., from (224, 224, 3) to (1, 224, 224, 3))
-        return np.expand_dims(image_array, axis=0)
-
-    def _postprocess_prediction(self, prediction: np.ndarray) -> dict:
+    def record(self, latency_ms: float):
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+        self._recent.append(latency_ms)
+
+    def as_dict(self) -> dict:
+        return {
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p95_ms": round(float(np.percentile(self._recent, 95)), 3) if self._recent else 0.0,
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class VisionService:
+    """
+    Long-lived image verification service, created once per worker.
+
+    Images are decoded and resized in a thread pool (PIL releases the GIL), so the
+    event loop never does CPU-bound work. Preprocessed images from concurrent
+    requests are collected into one batch of up to `max_batch_size` images, or
+    whatever arrived within `max_wait_ms` of the first one, and classified with a
+    single forward pass on a dedicated inference thread. While a forward pass
+    runs, the next batch keeps filling up and is sent as soon as it ends. As in `InferenceBatcher`, each request awaits its own future.
+    """
+    def __init__(self, handler: ModelHandler, result_cache: ImageResultCache,
+                 max_wait_ms: float, max_batch_size: int, preprocess_workers: int):
+        self.vision_model = handler.vision_model
+        self.class_names = handler.vision_class_names
+        self.result_cache = result_cache
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._preprocess_pool = ThreadPoolExecutor(max_workers=preprocess_workers, thread_name_prefix="vision-preprocess")
+        # One forward pass at a time: the model runtime parallelizes internally.
+        self._inference_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vision-inference")
+        self._pending: List[Tuple[np.ndarray, float, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._running_batches = set()
+        self.batches_run = 0
+        self.images_classified = 0
+        self.last_batch_size = 0
+        self.max_batch_size_seen = 0
+        self._latency = {stage: _LatencyStats() for stage in ("preprocess", "queue", "inference", "total")}
+
+    @property
+    def available(self) -> bool:
+        return self.vision_model is not None and bool(self.class_names)
+
+    def _postprocess_predictions(self, predictions: np.ndarray) -> List[dict]:
         """
-        Interprets the model's raw output to get the product ID and confidence.
+        Interprets the model's raw output for a whole batch to get each image's product ID and confidence.
         """
-        # Get the highest probability from the prediction array
-        confidence = np.max(prediction)
-        # Get the index of the highest probability
-        predicted_class_index = np.argmax(prediction)
+        confidences = predictions.max(axis=1)
+        predicted_class_indices = predictions.argmax(axis=1)
+        return [
+            {
+                "product_id": self.class_names[index] if confidence >= CONFIDENCE_THRESHOLD else None,
+                "confidence": float(confidence)
+            }
+            for confidence, index in zip(confidences, predicted_class_indices)
+        ]
+
+    async def classify(self, image_bytes: bytes) -> dict:
+        """Preprocesses one image in the pool, queues it for the next batch and waits for its result."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        image = await loop.run_in_executor(self._preprocess_pool, preprocess_image, image_bytes)
+        queued = time.perf_counter()
+        self._latency["preprocess"].record((queued - started) * 1000.0)
+
+        future = loop.create_future()
+        self._pending.append((image, queued, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        result = await future
+        self._latency["total"].record((time.perf_counter() - started) * 1000.0)
+        return result
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._running_batches and len(self._pending) < self.max_batch_size:
+            # The inference thread is busy: keep filling this batch until it is free.
+            return
+
+        batch = self._pending[:self.max_batch_size]
+        del self._pending[:self.max_batch_size]
+        if self._pending:
+            # Leftovers form the next batch straight away rather than waiting again.
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._running_batches.add(task)
+            task.add_done_callback(self._running_batches.discard)
 
-        if confidence < CONFIDENCE_THRESHOLD:
-            return {"product_id": None, "confidence": confidence}
+    async def _run_batch(self, batch: List[Tuple[np.ndarray, float, asyncio.Future]]) -> None:
+        started = time.perf_counter()
+        for _, queued, _ in batch:
+            self._latency["queue"].record((started - queued) * 1000.0)
+        try:
+            images = np.stack([image for image, _, _ in batch])
+            predictions = await asyncio.get_running_loop().run_in_executor(
+                self._inference_pool, self.vision_model.predict, images
+            )
+            results = self._postprocess_predictions(np.asarray(predictions))
+        except Exception as e:
+            logger.error(f"Vision batch of {len(batch)} images failed: {e!r}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._running_batches.discard(asyncio.current_task())
+            if self._pending and self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
 
-        # Map the index to the actual product ID (class name)
-        product_id = self.class_names[predicted_class_index]
-        return {"product_id": product_id, "confidence": float(confidence)}
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+        self._latency["inference"].record((time.perf_counter() - started) * 1000.0)
+        self.batches_run += 1
+        self.images_classified += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_size_seen = max(self.max_batch_size_seen, len(batch))
 
     async def verify_product_from_image(self, file: UploadFile) -> dict:
         """
         Orchestrates the image verification process.
         Returns a dictionary with the identified product_id and confidence score.
+        Images seen before, byte for byte or perceptually, are answered from the result cache.
         """
         image_bytes = await file.read()
-        
-        # 1. Preprocess the image for the model
-        processed_image = self._preprocess_image(image_bytes)
-        
-        # 2. Run prediction using the loaded model
-        prediction = self.vision_model.predict(processed_image)
-        
-        # 3. Interpret the results
-        result = self._postprocess_prediction(prediction[0]) # Get first item in batch
-        
-        return result
\ No newline at end of file
+        if not self.result_cache.enabled:
+            return await self._classify_upload(image_bytes)
+
+        digest = image_digest(image_bytes)
+        cached = self.result_cache.get_exact(digest)
+        if cached is not None:
+            return cached
+        try:
+            phash = await asyncio.get_running_loop().run_in_executor(self._preprocess_pool, perceptual_hash, image_bytes)
+        except (UnidentifiedImageError, OSError):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Could not decode the image.")
+        result = self.result_cache.get_similar(phash)
+        if result is None:
+            result = await self._classify_upload(image_bytes)
+        self.result_cache.put(digest, phash, result)
+        return result
+
+    async def _classify_upload(self, image_bytes: bytes) -> dict:
+        try:
+            return await self.classify(image_bytes)
+        except (UnidentifiedImageError, OSError):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Could not decode the image.")
+
+    def close(self) -> None:
+        self._preprocess_pool.shutdown(wait=False, cancel_futures=True)
+        self._inference_pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Batch size and per-stage latency metrics for monitoring."""
+        return {
+            "available": self.available,
+            "queue_depth": len(self._pending),
+            "batches_run": self.batches_run,
+            "images_classified": self.images_classified,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size_seen": self.max_batch_size_seen,
+            "mean_batch_size": round(self.images_classified / self.batches_run, 2) if self.batches_run else 0.0,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "latency": {stage: stats.as_dict() for stage, stats in self._latency.items()},
+        }
+
+
+vision_service = VisionService(
+    model_handler,
+    result_cache=image_result_cache,
+    max_wait_ms=settings.VISION_BATCH_MAX_WAIT_MS,
+    max_batch_size=settings.VISION_BATCH_MAX_SIZE,
+    preprocess_workers=settings.VISION_PREPROCESS_WORKERS
+)
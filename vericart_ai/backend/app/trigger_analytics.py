@@ -1,4 +1,6 @@
+import argparse
 import sys
+import time
 from pathlib import Path
 from datetime import date, timedelta
 
@@ -6,7 +8,11 @@ from datetime import date, timedelta
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import the specific task function from your analytics service
-from app.services.analytics_service import run_daily_metrics_calculation, calculate_metrics_for_day
+from app.services.analytics_service import (
+    BACKFILL_CHUNK_DAYS, backfill_metrics, calculate_metrics_for_day, run_daily_metrics_calculation,
+    run_metrics_backfill, split_date_range
+)
+from app.services.rollup_service import rebuild_rollups, run_scan_rollup_backfill
 from app.db import database, crud
 
 def run_test_for_today():
@@ -29,11 +35,41 @@ def run_test_for_today():
     finally:
         db.close()
 
+def run_backfill(start_date: date, end_date: date, chunk_days: int, rollups: bool = False):
+    """
+    Recomputes the metric snapshots (or the scan rollups) of every day in [start_date, end_date]
+    in this process, one grouped query and one bulk upsert per chunk.
+    """
+    backfill, what = (rebuild_rollups, "scan rollup rows") if rollups else (backfill_metrics, "daily snapshots")
+    print(f"--- Backfilling {what} from {start_date} to {end_date} ---")
+    started = time.perf_counter()
+    db = database.SessionLocal()
+    try:
+        written = sum(backfill(db, start, end) for start, end in split_date_range(start_date, end_date, chunk_days))
+    finally:
+        db.close()
+    print(f"Successfully saved {written} {what} in {time.perf_counter() - started:.2f}s")
+
 if __name__ == "__main__":
-    # You can also use this to trigger the actual Celery task if you want to test the full Celery path
-    # print("Sending task to Celery worker...")
-    # run_daily_metrics_calculation.delay()
-    # print("Task sent!")
-    
-    # For direct testing, we'll call the function directly.
-    run_test_for_today()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Recompute the daily business metric snapshots.")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to backfill (YYYY-MM-DD).")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="Last day to backfill, inclusive. Defaults to today.")
+    parser.add_argument("--chunk-days", type=int, default=BACKFILL_CHUNK_DAYS)
+    parser.add_argument("--celery", action="store_true", help="Send the backfill to the Celery workers instead of running it here.")
+    parser.add_argument("--rollups", action="store_true", help="Rebuild the scan rollups instead of the metric snapshots.")
+    args = parser.parse_args()
+
+    if args.start is None:
+        # You can also use this to trigger the actual Celery task if you want to test the full Celery path
+        # print("Sending task to Celery worker...")
+        # run_daily_metrics_calculation.delay()
+        # print("Task sent!")
+
+        # For direct testing, we'll call the function directly.
+        run_test_for_today()
+    elif args.celery:
+        task = run_scan_rollup_backfill if args.rollups else run_metrics_backfill
+        task.delay(args.start.isoformat(), args.end.isoformat(), args.chunk_days)
+        print(f"Backfill from {args.start} to {args.end} sent to the Celery workers.")
+    else:
+        run_backfill(args.start, args.end, args.chunk_days, rollups=args.rollups)
\ No newline at end of file
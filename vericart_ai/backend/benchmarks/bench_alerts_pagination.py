@@ -0,0 +1,123 @@
+"""
+Benchmark of deep pages of the alerts feed.
+
+Fills a throwaway SQLite database with alerts, then times fetching one deep page
+(page 1000 by default) of `crud.get_alerts`, unfiltered and filtered by status:
+  - before: OFFSET pagination without the composite (status, timestamp, id) indexes
+  - after:  keyset pagination (`after=<timestamp,id>`) with the indexes
+Offset pagination with the indexes is shown too, for reference.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_alerts_pagination.py [--alerts 200000] [--page 1000] [--page-size 100]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+DB_PATH = Path(tempfile.mkdtemp()) / "bench_alerts.db"
+
+# The app settings require these; the benchmark uses its own SQLite database.
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+
+from sqlalchemy import text
+
+from app.db import crud, database, models
+
+FEED_INDEXES = ("ix_alerts_status_timestamp_id", "ix_alerts_timestamp_id")
+STATUSES = ("new", "investigating", "resolved", "dismissed")
+
+
+def seed(alert_count: int) -> None:
+    models.Base.metadata.create_all(bind=database.engine)
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with database.engine.begin() as connection:
+        connection.execute(models.Supplier.__table__.insert(), [{"id": 1, "name": "Benchmark Supplier"}])
+        connection.execute(models.Product.__table__.insert(), [
+            {"id": 1, "product_id_str": "BENCH-1", "name": "Benchmark Product", "supplier_id": 1}
+        ])
+        # SQLite does not enforce foreign keys by default, so the triggering scans are not needed.
+        connection.execute(models.Alert.__table__.insert(), [
+            {
+                "id": i + 1,
+                "timestamp": start + timedelta(seconds=rng.uniform(0, 365 * 86400)),
+                "alert_type": "Velocity",
+                "message": "Benchmark alert",
+                "risk_score": 90.0,
+                "status": rng.choice(STATUSES),
+                "product_id": 1,
+                "scan_id": i + 1,
+            }
+            for i in range(alert_count)
+        ])
+
+
+def set_feed_indexes(enabled: bool) -> None:
+    with database.engine.begin() as connection:
+        for index in models.Alert.__table__.indexes:
+            if index.name in FEED_INDEXES:
+                if enabled:
+                    index.create(connection, checkfirst=True)
+                else:
+                    connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        connection.execute(text("ANALYZE"))
+
+
+def time_ms(fn, repeat: int = 5) -> float:
+    fn()  # warm-up
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--alerts", type=int, default=200000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.alerts} alerts into {DB_PATH} ...")
+    seed(args.alerts)
+    db = database.SessionLocal()
+
+    for status in (None, "new"):
+        label = f"status={status}" if status else "unfiltered"
+        query = db.query(models.Alert)
+        matching = (query.filter(models.Alert.status == status) if status else query).count()
+        # The filtered feed has fewer pages: use its deepest full page if it is shallower than --page.
+        page = min(args.page, matching // args.page_size)
+        if page < 2:
+            print(f"{label}: not enough alerts for a deep page, skipped.")
+            continue
+        skip = (page - 1) * args.page_size
+        previous_page = crud.get_alerts(db, status=status, skip=skip - args.page_size, limit=args.page_size)
+        cursor = (previous_page[-1].timestamp, previous_page[-1].id)
+        expected = [a.id for a in crud.get_alerts(db, status=status, skip=skip, limit=args.page_size)]
+
+        set_feed_indexes(False)
+        offset_before = time_ms(lambda: crud.get_alerts(db, status=status, skip=skip, limit=args.page_size))
+        set_feed_indexes(True)
+        offset_after = time_ms(lambda: crud.get_alerts(db, status=status, skip=skip, limit=args.page_size))
+        keyset_after = time_ms(lambda: crud.get_alerts(db, status=status, skip=0, limit=args.page_size, after=cursor))
+
+        if [a.id for a in crud.get_alerts(db, status=status, skip=0, limit=args.page_size, after=cursor)] != expected:
+            raise SystemExit(f"{label}: keyset page differs from the offset page.")
+        print(f"{label}, page {page}:")
+        print(f"  before  offset, no composite index: {offset_before:8.2f} ms")
+        print(f"          offset, with indexes:       {offset_after:8.2f} ms")
+        print(f"  after   keyset, with indexes:       {keyset_after:8.2f} ms")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of the encoding cost of broadcasting one alert to N dashboards.
+
+"per-client" reproduces the previous path: model_dump_json, json.loads back
+into a dict, then one json.dumps per connection (what send_json does).
+"serialize-once" is the current path: one model_dump_json wrapped into a
+text frame by encode_frame, with the same string sent to every connection.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_broadcast.py [--iterations 200]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The app settings require these; the benchmark never touches the DB or the API.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+
+from app.core import schemas
+from app.core.websocket_manager import encode_frame
+
+CONNECTION_COUNTS = (10, 100, 1000)
+
+
+def sample_alert() -> schemas.Alert:
+    return schemas.Alert(
+        id=12345,
+        timestamp=datetime.now(timezone.utc),
+        alert_type="Velocity",
+        message="Velocity anomaly detected for Great Value Whole Milk, 1 gal.",
+        risk_score=87.0,
+        status="new",
+        product=schemas.Product(
+            id="GTIN-00078742351865",
+            name="Great Value Whole Milk, 1 gal",
+            category="Dairy",
+            supplier=schemas.Supplier(id=7, name="Acme Dairy Co.", location="Bentonville, AR", risk_score=0.12),
+        ),
+    )
+
+
+def per_client(alert: schemas.Alert, connections: int):
+    alert_dict = json.loads(alert.model_dump_json(by_alias=True))
+    message = {"type": "new_alert", "payload": alert_dict}
+    return [json.dumps(message) for _ in range(connections)]
+
+
+def serialize_once(alert: schemas.Alert, connections: int):
+    frame = encode_frame("new_alert", alert.model_dump_json(by_alias=True))
+    return [frame] * connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    alert = sample_alert()
+    assert json.loads(per_client(alert, 1)[0]) == json.loads(serialize_once(alert, 1)[0])
+
+    print(f"{'connections':>11} {'per-client':>14} {'serialize-once':>16} {'speedup':>8}")
+    for connections in CONNECTION_COUNTS:
+        timings = []
+        for fn in (per_client, serialize_once):
+            seconds = min(timeit.repeat(lambda: fn(alert, connections), number=args.iterations, repeat=3))
+            timings.append(seconds / args.iterations * 1e6)
+        print(f"{connections:>11} {timings[0]:>11.1f} us {timings[1]:>13.1f} us {timings[0] / timings[1]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
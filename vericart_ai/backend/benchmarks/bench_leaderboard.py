@@ -0,0 +1,106 @@
+"""
+Benchmark of the points leaderboard.
+
+Fills a throwaway SQLite database with users, then compares:
+  - before: ranking with SQL on every call (COUNT of users with more points, and
+            ORDER BY points for a page), as a naive "top N users" endpoint would
+  - after:  the in-memory leaderboard (`MemoryLeaderboard`), loaded once from the
+            same rows and updated incrementally
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_leaderboard.py [--users 2000000] [--page 1000] [--page-size 10]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+DB_PATH = Path(tempfile.mkdtemp()) / "bench_leaderboard.db"
+
+# The app settings require these; the benchmark uses its own SQLite database.
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+
+from sqlalchemy import func, select
+
+from app.core.leaderboard import MemoryLeaderboard
+from app.core.message_bus import LocalMessageBus
+from app.db import database, models
+
+
+def seed(user_count: int) -> None:
+    models.Base.metadata.create_all(bind=database.engine)
+    rng = random.Random(42)
+    with database.engine.begin() as connection:
+        for start in range(0, user_count, 100000):
+            connection.execute(models.User.__table__.insert(), [
+                {"id": i + 1, "walmart_customer_id": f"U{i}", "role": "customer",
+                 "points": rng.randrange(0, 5000) * 10, "scan_count": 0}
+                for i in range(start, min(start + 100000, user_count))
+            ])
+
+
+def time_ms(fn, repeat: int = 5, number: int = 1) -> float:
+    fn()  # warm-up
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=2000000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.users} users into {DB_PATH} ...")
+    seed(args.users)
+    db = database.SessionLocal()
+    rng = random.Random(7)
+    points = db.execute(select(models.User.points).filter(models.User.id == args.users // 2)).scalar_one()
+    skip = (args.page - 1) * args.page_size
+
+    def sql_rank():
+        return db.execute(select(func.count()).filter(models.User.points > points)).scalar_one() + 1
+
+    def sql_page():
+        return db.execute(
+            select(models.User.id, models.User.points)
+            .order_by(models.User.points.desc(), models.User.id).offset(skip).limit(args.page_size)
+        ).all()
+
+    board = MemoryLeaderboard(LocalMessageBus())
+    started = time.perf_counter()
+    scores = db.execute(select(models.User.id, models.User.points)).tuples().all()
+    fetch_s = time.perf_counter() - started
+    board.load(scores)
+    load_s = time.perf_counter() - started - fetch_s
+
+    if board.rank_for_points(points) != sql_rank():
+        raise SystemExit("The in-memory rank differs from the SQL rank.")
+    if [(e.user_id, e.points) for e in board.page(skip, args.page_size)] != [tuple(row) for row in sql_page()]:
+        raise SystemExit("The in-memory page differs from the SQL page.")
+
+    def update():
+        board.apply([(rng.randrange(1, args.users + 1), rng.randrange(0, 5000) * 10)])
+
+    print(f"{args.users} users, page {args.page} of {args.page_size}:")
+    print(f"  before  SQL rank:               {time_ms(sql_rank):10.3f} ms")
+    print(f"          SQL page:               {time_ms(sql_page):10.3f} ms")
+    print(f"  after   startup: read users:    {fetch_s * 1000.0:10.1f} ms")
+    print(f"          startup: build:         {load_s * 1000.0:10.1f} ms")
+    print(f"          in-memory rank:         {time_ms(lambda: board.rank_for_points(points), number=1000):10.4f} ms")
+    print(f"          in-memory page:         {time_ms(lambda: board.page(skip, args.page_size), number=1000):10.4f} ms")
+    print(f"          in-memory update:       {time_ms(update, number=1000):10.4f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
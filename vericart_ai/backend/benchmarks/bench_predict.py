@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for fraud scoring.
+
+Compares the original pandas DataFrame path with the packed NumPy path used by
+`ModelHandler.predict_anomaly` and by `predict_anomalies` (which the inference
+batcher calls), after checking that all of them return the same prediction for
+a spread of normal and anomalous feature vectors.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_predict.py [--iterations 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The app settings require these; the benchmark never touches the DB or the API.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+os.environ.setdefault("MODEL_PATH", str(BACKEND_DIR / "ml" / "models" / "isolation_forest_v1.joblib"))
+
+from app.core.model_handler import model_handler
+
+
+def sample_features(rng: random.Random) -> dict:
+    distance = rng.choice([0.0, rng.uniform(0, 50), rng.uniform(1000, 12000)])
+    time_diff = rng.choice([0.0, rng.uniform(60, 3600), rng.uniform(86400, 86400 * 30)])
+    speed = distance / (time_diff / 3600.0) if time_diff > 0 else 0.0
+    return {
+        "latitude": rng.uniform(-60, 70),
+        "longitude": rng.uniform(-180, 180),
+        "time_diff_seconds": time_diff,
+        "distance_km": distance,
+        "speed_kmh": speed,
+    }
+
+
+def check_parity(samples) -> None:
+    mismatches = [
+        features for features in samples
+        if model_handler.predict_anomaly(features) != model_handler.predict_anomaly_dataframe(features)
+    ]
+    if mismatches:
+        raise SystemExit(f"Parity check FAILED for {len(mismatches)}/{len(samples)} samples, e.g. {mismatches[0]}")
+    if model_handler.predict_anomalies(samples) != [model_handler.predict_anomaly_dataframe(f) for f in samples]:
+        raise SystemExit("Parity check FAILED for the batch path.")
+    print(f"Parity check passed on {len(samples)} samples.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    samples = [sample_features(rng) for _ in range(500)]
+    check_parity(samples)
+
+    features = samples[0]
+    for name, fn in (("pandas DataFrame", model_handler.predict_anomaly_dataframe),
+                     ("NumPy fast path", model_handler.predict_anomaly)):
+        fn(features)  # warm-up
+        seconds = min(timeit.repeat(lambda: fn(features), number=args.iterations, repeat=3))
+        print(f"{name:>18}: {seconds / args.iterations * 1e6:8.1f} us/call")
+
+    batch = samples[:64]
+    model_handler.predict_anomalies(batch)  # warm-up
+    seconds = min(timeit.repeat(lambda: model_handler.predict_anomalies(batch), number=args.iterations // 10, repeat=3))
+    print(f"{'batch of 64':>18}: {seconds / (args.iterations // 10) / len(batch) * 1e6:8.1f} us/scan")
+
+
+if __name__ == "__main__":
+    main()
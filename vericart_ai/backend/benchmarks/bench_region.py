@@ -0,0 +1,75 @@
+"""
+Micro-benchmark for reverse geocoding scans to regions.
+
+Compares a brute-force haversine distance to every city, as the training
+notebook does with `cdist`, with the KD-tree of `RegionIndex`, after checking
+that both pick the same city for a spread of random points.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_region.py [--iterations 2000] [--batch 10000]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The app settings require these; the benchmark never touches the DB or the API.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+os.environ.setdefault("LOCATIONS_PATH", str(BACKEND_DIR / "data" / "locations.csv"))
+
+from app.core.region_index import region_index
+
+
+def brute_force_lookup(latitude: float, longitude: float, city_radians: np.ndarray) -> str:
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    a = (np.sin((city_radians[:, 0] - lat) / 2.0) ** 2
+         + np.cos(lat) * np.cos(city_radians[:, 0]) * np.sin((city_radians[:, 1] - lon) / 2.0) ** 2)
+    return region_index.regions[int(np.argmax(-a))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=10000)
+    args = parser.parse_args()
+
+    if not region_index.enabled:
+        raise SystemExit("The region index could not be built; check LOCATIONS_PATH.")
+    city_radians = np.radians(np.array(
+        [[float(row["latitude"]), float(row["longitude"])] for row in csv.DictReader(open(os.environ["LOCATIONS_PATH"]))]
+    ))
+
+    rng = random.Random(42)
+    points = [(rng.uniform(25, 49), rng.uniform(-125, -67)) for _ in range(1000)]
+    expected = [brute_force_lookup(lat, lon, city_radians) for lat, lon in points]
+    actual = region_index.lookup_many([p[0] for p in points], [p[1] for p in points])
+    mismatches = sum(e != a for e, a in zip(expected, actual))
+    if mismatches:
+        raise SystemExit(f"Parity check FAILED for {mismatches}/{len(points)} points.")
+    print(f"Parity check passed on {len(points)} points against {len(city_radians)} cities.")
+
+    latitude, longitude = points[0]
+    for name, fn in (("brute force", lambda: brute_force_lookup(latitude, longitude, city_radians)),
+                     ("KD-tree", lambda: region_index.lookup(latitude, longitude))):
+        fn()  # warm-up
+        seconds = min(timeit.repeat(fn, number=args.iterations, repeat=3))
+        print(f"{name:>12}: {seconds / args.iterations * 1e6:8.1f} us/lookup")
+
+    latitudes = np.array([rng.uniform(25, 49) for _ in range(args.batch)])
+    longitudes = np.array([rng.uniform(-125, -67) for _ in range(args.batch)])
+    seconds = min(timeit.repeat(lambda: region_index.lookup_many(latitudes, longitudes), number=1, repeat=3))
+    print(f"{'bulk':>12}: {seconds / args.batch * 1e6:8.1f} us/lookup ({args.batch} points per call)")
+
+
+if __name__ == "__main__":
+    main()
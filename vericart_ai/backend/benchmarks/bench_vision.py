@@ -0,0 +1,120 @@
+"""
+Benchmark of image verification under concurrent requests.
+
+Classifies a burst of concurrent camera-sized JPEGs with the CPU-only fake vision
+model, which simulates the cost of a forward pass (a fixed per-batch overhead plus
+a per-image cost):
+  - before: every request decodes and resizes its image on the event loop, at
+            full resolution, then runs a forward pass on a batch of one
+  - after:  the long-lived `VisionService`: JPEG draft-mode decoding in a thread
+            pool, and concurrent requests batched into one forward pass
+Decoding alone, with and without draft mode, is timed too.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_vision.py [--requests 64] [--width 1920] [--height 1080]
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+import timeit
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The app settings require these; no database is used.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+os.environ.setdefault("MODEL_PATH", str(BACKEND_DIR / "ml" / "models" / "isolation_forest_v1.joblib"))
+
+import numpy as np
+from PIL import Image
+
+from app.core.image_cache import ImageResultCache
+from app.core.model_handler import FakeVisionModel, model_handler
+from app.services.vision_service import IMAGE_SIZE, VisionService, preprocess_image
+
+CLASS_NAMES = [f"P{i}" for i in range(10)]
+BATCH_OVERHEAD_MS = 20.0
+PER_IMAGE_MS = 1.0
+
+
+def make_jpeg(width: int, height: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    # Smooth gradients plus noise, so the JPEG is neither trivial nor pure noise.
+    x = np.linspace(0, 255, width)[None, :, None]
+    y = np.linspace(0, 255, height)[:, None, None]
+    pixels = (x * 0.5 + y * 0.5 + rng.normal(0, 12, (height, width, 3))).clip(0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def legacy_preprocess(image_bytes: bytes) -> np.ndarray:
+    """The previous per-request preprocessing: full-resolution decode, float64, batch of one."""
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGB").resize(IMAGE_SIZE)
+    return np.expand_dims(np.asarray(image) / 255.0, axis=0)
+
+
+async def run_before(model: FakeVisionModel, images) -> list:
+    started = time.perf_counter()
+
+    async def one(image_bytes):
+        model.predict(legacy_preprocess(image_bytes))
+        return (time.perf_counter() - started) * 1000.0
+
+    # Nothing yields to the event loop: requests are effectively handled one after the other.
+    return await asyncio.gather(*(one(image) for image in images))
+
+
+async def run_after(service: VisionService, images) -> list:
+    started = time.perf_counter()
+
+    async def one(image_bytes):
+        await service.classify(image_bytes)
+        return (time.perf_counter() - started) * 1000.0
+
+    return await asyncio.gather(*(one(image) for image in images))
+
+
+# Latencies are measured from the start of the burst, as seen by the clients.
+def report(label: str, latencies: list, wall_s: float):
+    print(f"  {label:<7} {len(latencies) / wall_s:8.1f} images/s   "
+          f"p50 {np.percentile(latencies, 50):8.1f} ms   p95 {np.percentile(latencies, 95):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+
+    images = [make_jpeg(args.width, args.height, seed) for seed in range(8)]
+    burst = [images[i % len(images)] for i in range(args.requests)]
+
+    print(f"Decode + resize of one {args.width}x{args.height} JPEG to {IMAGE_SIZE}:")
+    full_ms = min(timeit.repeat(lambda: legacy_preprocess(images[0]), number=5, repeat=3)) / 5 * 1000.0
+    draft_ms = min(timeit.repeat(lambda: preprocess_image(images[0]), number=5, repeat=3)) / 5 * 1000.0
+    print(f"  full-resolution decode: {full_ms:8.2f} ms")
+    print(f"  draft-mode decode:      {draft_ms:8.2f} ms")
+
+    model = FakeVisionModel(len(CLASS_NAMES), batch_overhead_ms=BATCH_OVERHEAD_MS, per_image_ms=PER_IMAGE_MS)
+    model_handler.vision_model, model_handler.vision_class_names = model, CLASS_NAMES
+    service = VisionService(model_handler, ImageResultCache(max_size=0, max_distance=0), max_wait_ms=10.0, max_batch_size=16, preprocess_workers=4)
+
+    print(f"\n{args.requests} concurrent requests, forward pass = {BATCH_OVERHEAD_MS:.0f} ms + {PER_IMAGE_MS:.0f} ms per image:")
+    for label, run in (("before", lambda: run_before(model, burst)), ("after", lambda: run_after(service, burst))):
+        started = time.perf_counter()
+        latencies = asyncio.run(run())
+        report(label, latencies, time.perf_counter() - started)
+    print(f"  mean batch size after: {service.stats()['mean_batch_size']}")
+    service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark of the image classifier backends, as a gunicorn worker sees them.
+
+Each model is loaded in a fresh process, measuring:
+  - cold start: importing the runtime and loading the model, in a process that
+                already imported the app
+  - memory:     the growth of the resident set size from before the model was
+                loaded to after batches have run (Linux)
+  - latency:    per image, at batch size 1 and at the service's batch size
+Backends follow the file type: .h5 runs on TensorFlow ("keras"), .onnx on ONNX
+Runtime ("onnx", float32 or int8).
+
+Without trained models, --synthetic builds a MobileNet-sized convolutional
+classifier with random weights, in float32 and int8 (quantized as by
+ml/scripts/convert_vision_model.py), and benchmarks those.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_vision_backends.py ml/models/product_image_classifier.h5 \\
+        ml/models/product_image_classifier.onnx ml/models/product_image_classifier.int8.onnx
+    python benchmarks/bench_vision_backends.py --synthetic
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / "ml" / "scripts"))
+
+IMAGE_SHAPE = (224, 224, 3)
+NUM_CLASSES = 100
+# (output channels, stride) of each 3x3 convolution of the synthetic model.
+SYNTHETIC_LAYERS = [(32, 2), (64, 1), (128, 2), (128, 1), (256, 2), (256, 1), (512, 2), (512, 1), (1024, 2)]
+
+
+def build_synthetic_model(path: str) -> None:
+    import numpy as np
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    nodes = [helper.make_node("Transpose", ["image"], ["x0"], perm=[0, 3, 1, 2])]
+    weights = []
+    channels, name = IMAGE_SHAPE[2], "x0"
+    for i, (out_channels, stride) in enumerate(SYNTHETIC_LAYERS):
+        scale = np.sqrt(2.0 / (channels * 9))
+        weights.append(numpy_helper.from_array((rng.standard_normal((out_channels, channels, 3, 3)) * scale).astype(np.float32), f"w{i}"))
+        weights.append(numpy_helper.from_array(np.zeros(out_channels, dtype=np.float32), f"b{i}"))
+        nodes.append(helper.make_node("Conv", [name, f"w{i}", f"b{i}"], [f"c{i}"], pads=[1, 1, 1, 1], strides=[stride, stride]))
+        nodes.append(helper.make_node("Relu", [f"c{i}"], [f"x{i + 1}"]))
+        channels, name = out_channels, f"x{i + 1}"
+    weights.append(numpy_helper.from_array((rng.standard_normal((channels, NUM_CLASSES)) * 0.05).astype(np.float32), "fc_w"))
+    weights.append(numpy_helper.from_array(np.zeros(NUM_CLASSES, dtype=np.float32), "fc_b"))
+    nodes += [
+        helper.make_node("GlobalAveragePool", [name], ["pooled"]),
+        helper.make_node("Flatten", ["pooled"], ["features"]),
+        helper.make_node("Gemm", ["features", "fc_w", "fc_b"], ["logits"]),
+        helper.make_node("Softmax", ["logits"], ["scores"], axis=1),
+    ]
+    graph = helper.make_graph(
+        nodes, "synthetic_product_classifier",
+        [helper.make_tensor_value_info("image", TensorProto.FLOAT, ["batch", *IMAGE_SHAPE])],
+        [helper.make_tensor_value_info("scores", TensorProto.FLOAT, ["batch", NUM_CLASSES])],
+        initializer=weights
+    )
+    # IR version 8 is the one of opset 17, readable by every ONNX Runtime that supports it.
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8), path)
+
+
+def resident_mib() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def measure(path: str, batch_size: int) -> dict:
+    """Runs in the child process: loads one model and times it."""
+    import numpy as np
+
+    from app.core.model_handler import KerasVisionModel, OnnxVisionModel
+
+    resident_before = resident_mib()
+    started = time.perf_counter()
+    model = OnnxVisionModel(path) if path.endswith(".onnx") else KerasVisionModel(path)
+    cold_start_s = time.perf_counter() - started
+
+    rng = np.random.default_rng(1)
+    result = {"cold_start_s": cold_start_s}
+    for label, size in (("batch_1", 1), ("batch_n", batch_size)):
+        batch = rng.random((size, *IMAGE_SHAPE), dtype=np.float32)
+        model.predict(batch)  # warm-up
+        runs = max(3, 48 // size)
+        started = time.perf_counter()
+        for _ in range(runs):
+            model.predict(batch)
+        result[label] = (time.perf_counter() - started) / runs / size * 1000.0
+    result["memory_mib"] = resident_mib() - resident_before
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("models", nargs="*", help=".h5 or .onnx image classifiers")
+    parser.add_argument("--synthetic", action="store_true", help="benchmark a generated float32 and int8 model")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.batch_size)))
+        return
+
+    models = list(args.models)
+    work_dir = tempfile.mkdtemp()
+    if args.synthetic:
+        import numpy as np
+        from convert_vision_model import quantize
+
+        float_model, int8_model = str(Path(work_dir) / "synthetic.onnx"), str(Path(work_dir) / "synthetic.int8.onnx")
+        build_synthetic_model(float_model)
+        quantize(float_model, int8_model, np.random.default_rng(2).random((64, *IMAGE_SHAPE), dtype=np.float32))
+        models += [float_model, int8_model]
+    if not models:
+        parser.error("give model paths or --synthetic")
+
+    env = dict(os.environ, DATABASE_URL="sqlite://", API_KEY="benchmark", FRONTEND_URL="http://localhost",
+               MODEL_PATH=str(BACKEND_DIR / "ml" / "models" / "isolation_forest_v1.joblib"))
+    print(f"{'model':<40} {'size MiB':>9} {'cold start':>11} {'memory':>10} {'ms/img b=1':>11} {f'ms/img b={args.batch_size}':>12}")
+    for path in models:
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", path, "--batch-size", str(args.batch_size)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{Path(path).name:<40} {os.path.getsize(path) / 2**20:9.2f} {result['cold_start_s']:10.2f}s "
+              f"{result['memory_mib']:8.0f}Mi {result['batch_1']:11.2f} {result['batch_n']:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
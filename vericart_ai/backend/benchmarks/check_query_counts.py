@@ -0,0 +1,111 @@
+"""
+Query-count check for the paginated list endpoints.
+
+Fills a throwaway SQLite database, then counts the SQL statements each list
+endpoint issues for a small and a large page. The count must not depend on the
+page size (no N+1 lazy loading) and must stay within a fixed budget; the script
+exits non-zero otherwise, so it can gate CI.
+
+Usage (from the backend/ directory):
+    python benchmarks/check_query_counts.py
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+DB_PATH = Path(tempfile.mkdtemp()) / "check_query_counts.db"
+
+# The app settings require these; the check uses its own SQLite database.
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("API_KEY", "query-count-check")
+os.environ.setdefault("JWT_SECRET_KEY", "query-count-check")
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+os.environ.setdefault("MODEL_PATH", str(BACKEND_DIR / "ml" / "models" / "isolation_forest_v1.joblib"))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.db import database, models
+from app.main import app
+
+# (path, maximum number of statements per page)
+LIST_ENDPOINTS = (
+    ("/dashboard/alerts", 1),
+    ("/products/", 1),
+    ("/suppliers/", 1),
+)
+PAGE_SIZES = (5, 100)
+HEADERS = {"X-API-Key": os.environ["API_KEY"]}
+
+
+def seed(count: int = 150) -> None:
+    models.Base.metadata.create_all(bind=database.engine)
+    now = datetime.now(timezone.utc)
+    with database.engine.begin() as connection:
+        connection.execute(models.Supplier.__table__.insert(), [
+            {"id": i + 1, "name": f"Supplier {i:03d}", "location": "US", "risk_score": 0.0} for i in range(count)
+        ])
+        connection.execute(models.Product.__table__.insert(), [
+            {"id": i + 1, "product_id_str": f"P{i:04d}", "name": f"Product {i:03d}", "category": "c", "supplier_id": i + 1}
+            for i in range(count)
+        ])
+        connection.execute(models.Scan.__table__.insert(), [
+            {"id": i + 1, "product_id": i + 1, "latitude": 0.0, "longitude": 0.0, "is_authentic": False,
+             "timestamp": now - timedelta(minutes=i)}
+            for i in range(count)
+        ])
+        connection.execute(models.Alert.__table__.insert(), [
+            {"id": i + 1, "product_id": i + 1, "scan_id": i + 1, "alert_type": "Velocity", "message": "Check alert",
+             "risk_score": 90.0, "status": "new", "timestamp": now - timedelta(minutes=i)}
+            for i in range(count)
+        ])
+
+
+@contextmanager
+def count_statements():
+    """Counts the statements run on the sync and async engines inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = (database.engine, database.async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+
+
+def main():
+    seed()
+    failures = []
+    with TestClient(app) as client:
+        for path, budget in LIST_ENDPOINTS:
+            counts = []
+            for page_size in PAGE_SIZES:
+                with count_statements() as statements:
+                    response = client.get(path, params={"limit": page_size}, headers=HEADERS)
+                if response.status_code != 200 or len(response.json()) != page_size:
+                    failures.append(f"{path}?limit={page_size} returned {response.status_code}: {response.text[:200]}")
+                counts.append(len(statements))
+
+            status = "ok" if len(set(counts)) == 1 and max(counts) <= budget else "FAILED"
+            if status != "ok":
+                failures.append(f"{path}: {counts} statements for page sizes {PAGE_SIZES}, budget {budget}")
+            print(f"{path:<20} statements per page {dict(zip(PAGE_SIZES, counts))}  (budget {budget})  {status}")
+
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Converts the product image classifier for the "onnx" vision backend.
+
+The Keras model is exported to ONNX with tf2onnx, keeping its NHWC float32 input
+of [0, 1] pixels, so the service's preprocessing is unchanged. An int8 copy can
+be quantized from it:
+  - static, when calibration images are given: weights and activations in int8,
+    calibrated on real product photos (the better choice for convolutions)
+  - dynamic otherwise: int8 weights, activations quantized on the fly
+Both models are then compared with their source on the calibration images (or
+random images without them): top-1 agreement and the largest score difference.
+
+Needs onnx and onnxruntime, plus tensorflow-cpu and tf2onnx for a .h5 source.
+A .onnx source skips the export and is only quantized.
+
+Usage (from the backend/ directory):
+    python ml/scripts/convert_vision_model.py ml/models/product_image_classifier.h5 \\
+        --output ml/models/product_image_classifier.onnx \\
+        --int8-output ml/models/product_image_classifier.int8.onnx \\
+        --calibration-images data/calibration_images
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The app settings require these; only the image preprocessing is used.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("API_KEY", "convert")
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+os.environ.setdefault("MODEL_PATH", str(BACKEND_DIR / "ml" / "models" / "isolation_forest_v1.joblib"))
+os.environ.setdefault("VISION_MODEL_BACKEND", "fake")
+
+import numpy as np
+
+from app.core.model_handler import OnnxVisionModel
+from app.services.vision_service import IMAGE_SIZE, preprocess_image
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+BATCH_SIZE = 16
+
+
+def load_images(directory: Optional[str], count: int) -> np.ndarray:
+    """Up to `count` images of `directory`, preprocessed as the service does; random images without one."""
+    if directory is None:
+        return np.random.default_rng(0).random((count, *IMAGE_SIZE, 3), dtype=np.float32)
+    paths = sorted(path for path in Path(directory).iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)[:count]
+    if not paths:
+        raise SystemExit(f"No images found in {directory}.")
+    return np.stack([preprocess_image(path.read_bytes()) for path in paths])
+
+
+def batches(images: np.ndarray) -> Iterator[np.ndarray]:
+    for start in range(0, len(images), BATCH_SIZE):
+        yield images[start:start + BATCH_SIZE]
+
+
+def export_keras(source: str, output: str, opset: int) -> Callable[[np.ndarray], np.ndarray]:
+    """Exports the Keras model to ONNX and returns its predict function, for the comparison."""
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(source)
+    signature = (tf.TensorSpec((None, *IMAGE_SIZE, 3), tf.float32, name="image"),)
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=output)
+    return lambda batch: np.asarray(model.predict(batch, verbose=0))
+
+
+def quantize(source: str, output: str, calibration_images: Optional[np.ndarray]) -> None:
+    """Writes an int8 copy of an ONNX model: static with calibration images, dynamic without."""
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class ImageReader(CalibrationDataReader):
+        def __init__(self, input_name: str):
+            self.inputs = ({input_name: batch} for batch in batches(calibration_images))
+
+        def get_next(self):
+            return next(self.inputs, None)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Shape inference and graph optimization first, as recommended before quantization.
+        # Only the batch dimension is dynamic, so ONNX shape inference suffices (no sympy needed).
+        prepared = str(Path(work_dir) / "prepared.onnx")
+        quant_pre_process(source, prepared, skip_symbolic_shape=True)
+        if calibration_images is None:
+            quantize_dynamic(prepared, output, weight_type=QuantType.QInt8)
+        else:
+            input_name = OnnxVisionModel(source).input_name
+            quantize_static(
+                prepared, output, ImageReader(input_name),
+                quant_format=QuantFormat.QDQ, per_channel=True,
+                weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8
+            )
+
+
+def compare(label: str, reference: Callable[[np.ndarray], np.ndarray], model_path: str, images: np.ndarray) -> None:
+    candidate = OnnxVisionModel(model_path)
+    expected = np.concatenate([reference(batch) for batch in batches(images)])
+    actual = np.concatenate([candidate.predict(batch) for batch in batches(images)])
+    agreement = float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1)))
+    print(f"  {label:<16} top-1 agreement {agreement:7.2%}   max score difference {np.abs(expected - actual).max():.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("source", help="the Keras .h5 model, or an ONNX model to quantize")
+    parser.add_argument("--output", help="the ONNX model to write (for a .h5 source)")
+    parser.add_argument("--int8-output", help="also write an int8-quantized copy here")
+    parser.add_argument("--calibration-images", help="directory of product photos for static quantization and the comparison")
+    parser.add_argument("--calibration-count", type=int, default=200)
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    images = load_images(args.calibration_images, args.calibration_count)
+    print("Comparison with the source model:")
+    if args.source.endswith(".onnx"):
+        float_model = args.source
+        source_predict = OnnxVisionModel(float_model).predict
+    else:
+        if not args.output:
+            parser.error("--output is required to export a Keras model")
+        float_model = args.output
+        source_predict = export_keras(args.source, float_model, args.opset)
+        compare("onnx float32", source_predict, float_model, images)
+
+    if args.int8_output:
+        quantize(float_model, args.int8_output, images if args.calibration_images else None)
+        compare("onnx int8", source_predict, args.int8_output, images)
+
+    print("Model sizes:")
+    for path in filter(None, (args.source, args.output, args.int8_output)):
+        print(f"  {path:<60} {os.path.getsize(path) / 2**20:8.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()